@@ -2,15 +2,18 @@ from flask import Flask, request, jsonify
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import os
 from functools import wraps
 
 # Import our modules
 import auth
+import token_session
 from db import save_password, fetch_passwords_for_gui, delete_password
 from crypto_utils import generate_password
+from http_client import pool_stats
+from rate_limit_store import create_lockout_store, RATE_LIMIT_STORAGE_URL, RATE_LIMIT_STRATEGY
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for web frontend
@@ -20,7 +23,8 @@ limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["50 per minute"],
-    storage_uri="memory://"
+    storage_uri=RATE_LIMIT_STORAGE_URL,
+    strategy=RATE_LIMIT_STRATEGY
 )
 
 # Configure logging
@@ -33,8 +37,8 @@ logging.basicConfig(
     ]
 )
 
-# Track login attempts
-login_attempts = {}
+# Failed logins and lockouts, shared between workers when RATE_LIMIT_STORAGE_URL is Redis
+lockout_store = create_lockout_store(RATE_LIMIT_STORAGE_URL)
 
 def log_failed_attempt(email, ip):
     logging.warning(f"FAILED LOGIN | Email: {email} | IP: {ip}")
@@ -43,13 +47,7 @@ def log_security_event(event_type, email, ip, details=""):
     logging.info(f"SECURITY EVENT | Type: {event_type} | Email: {email} | IP: {ip} | Details: {details}")
 
 def is_locked_out(email):
-    entry = login_attempts.get(email)
-    if entry and 'locked_until' in entry:
-        if datetime.now() < entry['locked_until']:
-            return True, entry['locked_until']
-        else:
-            del login_attempts[email]
-    return False, None
+    return lockout_store.is_locked_out(email)
 
 def validate_request_data(required_fields):
     """Decorator to validate required fields in request JSON"""
@@ -115,32 +113,40 @@ def login_api():
         }), 423
 
     try:
-        uid = auth.login_with_rest_api(email, password)
+        result = auth.login_with_rest_api(email, password)
 
-        if isinstance(uid, dict) and uid.get('error') == 'unverified':
+        if isinstance(result, dict) and result.get('error') == 'unverified':
             log_failed_attempt(email, client_ip)
             return jsonify({
                 "status": "error",
                 "message": "Please verify your email before logging in. Check your inbox."
             }), 401
 
-        if uid:
+        if result:
+            uid = result['uid']
             # Clear failed attempts on successful login
-            login_attempts.pop(email, None)
+            lockout_store.reset(email)
             log_security_event("LOGIN_SUCCESS", email, client_ip, f"UID: {uid}")
-            return jsonify({"status": "success", "uid": uid}), 200
+            # Clients keep the tokens and refresh the ID token themselves
+            return jsonify({
+                "status": "success",
+                "uid": uid,
+                "id_token": result['id_token'],
+                "refresh_token": result['refresh_token'],
+                "expires_at": result['expires_at']
+            }), 200
         else:
             # Handle failed login
             log_failed_attempt(email, client_ip)
-            entry = login_attempts.get(email, {"count": 0})
-            entry["count"] += 1
-            entry["last"] = datetime.now()
-            if entry["count"] >= 5:
-                entry["locked_until"] = datetime.now() + timedelta(minutes=5)
-                log_security_event("ACCOUNT_LOCKED", email, client_ip, f"Locked until: {entry['locked_until']}")
-            login_attempts[email] = entry
+            locked_until = lockout_store.record_failure(email)
+            if locked_until:
+                log_security_event("ACCOUNT_LOCKED", email, client_ip, f"Locked until: {locked_until}")
             return jsonify({"status": "error", "message": "Invalid email or password"}), 401
             
+    except token_session.TokenServiceError as e:
+        # An outage is not a wrong password: no lockout failure is recorded
+        logging.error(f"Login unavailable for {email}: {str(e)}")
+        return jsonify({"status": "error", "message": "Authentication service unavailable. Please try again shortly."}), 503
     except Exception as e:
         logging.error(f"Login error for {email}: {str(e)}")
         return jsonify({"status": "error", "message": "Internal server error"}), 500
@@ -245,7 +251,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "http": pool_stats()
     }), 200
 
 @app.route('/ping', methods=['GET'])
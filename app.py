@@ -1,8 +1,9 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+from flask import (Flask, render_template, request, jsonify, session, redirect, url_for, flash,
+                   Response, stream_with_context)
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import os
 from functools import wraps
@@ -10,10 +11,18 @@ import secrets
 
 # Import our modules
 import auth
+import token_session
+from http_client import pool_stats
 from db import (save_password, fetch_passwords_for_gui, delete_password, 
                 get_vaults, create_vault, delete_vault, get_vault_passwords,
-                migrate_existing_passwords, get_or_create_default_vault)
+                get_vault_passwords_page, get_password_entry, migrate_existing_passwords,
+                get_or_create_default_vault, get_vault_deletion_status, search_passwords,
+                search_all_vaults, search_index_ready, SearchIndexBuilding,
+                DEFAULT_PAGE_SIZE, SEARCH_RESULT_LIMIT)
 from crypto_utils import generate_password
+from rate_limit_store import create_lockout_store, RATE_LIMIT_STORAGE_URL, RATE_LIMIT_STRATEGY
+from importer import import_stream, detect_format
+from vault_archive import export_vault_stream, import_archive, ARCHIVE_EXTENSION
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', secrets.token_hex(32))
@@ -24,7 +33,8 @@ limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=["100 per minute"],
-    storage_uri="memory://"
+    storage_uri=RATE_LIMIT_STORAGE_URL,
+    strategy=RATE_LIMIT_STRATEGY
 )
 
 # Configure logging
@@ -37,8 +47,8 @@ logging.basicConfig(
     ]
 )
 
-# Track login attempts
-login_attempts = {}
+# Failed logins and lockouts, shared between workers when RATE_LIMIT_STORAGE_URL is Redis
+lockout_store = create_lockout_store(RATE_LIMIT_STORAGE_URL)
 
 def log_failed_attempt(email, ip):
     logging.warning(f"FAILED LOGIN | Email: {email} | IP: {ip}")
@@ -47,13 +57,33 @@ def log_security_event(event_type, email, ip, details=""):
     logging.info(f"SECURITY EVENT | Type: {event_type} | Email: {email} | IP: {ip} | Details: {details}")
 
 def is_locked_out(email):
-    entry = login_attempts.get(email)
-    if entry and 'locked_until' in entry:
-        if datetime.now() < entry['locked_until']:
-            return True, entry['locked_until']
-        else:
-            del login_attempts[email]
-    return False, None
+    return lockout_store.is_locked_out(email)
+
+@app.before_request
+def load_token_session():
+    """Check the session's Firebase ID token before every request.
+
+    Verification is local against cached Google keys, and refreshes run in
+    the background, so an active session makes no auth network call here.
+    An invalid or revoked session is cleared, which the login checks reject.
+    When Google cannot be reached the session is kept and the request gets
+    a 503. Logout always goes through.
+    """
+    if 'user_id' not in session or request.endpoint == 'logout':
+        return
+    try:
+        tokens = token_session.open_session_tokens(session.get('tokens'), app.secret_key)
+        uid, current = token_session.current_tokens(tokens)
+        if uid != session['user_id']:
+            raise token_session.TokenError("Token does not belong to this session")
+        if current is not tokens:
+            session['tokens'] = token_session.seal_session_tokens(current, app.secret_key)
+    except token_session.TokenError as e:
+        logging.warning(f"Session ended for user {session.get('user_id')}: {e}")
+        session.clear()
+    except token_session.TokenServiceError as e:
+        logging.error(f"Could not check session for user {session.get('user_id')}: {e}")
+        return jsonify({"status": "error", "message": "Authentication service unavailable. Please try again shortly."}), 503
 
 def require_login(f):
     """Decorator to require login for routes"""
@@ -113,7 +143,12 @@ def vault():
 
 @app.route('/logout')
 def logout():
-    """Logout and clear session"""
+    """Logout, revoke the session's refresh token and clear session"""
+    if session.get('user_id') and session.get('tokens'):
+        try:
+            token_session.revoke(session['user_id'])
+        except Exception as e:
+            logging.warning(f"Refresh tokens not revoked for user {session['user_id']}: {e}")
     session.clear()
     flash('You have been logged out successfully', 'info')
     return redirect(url_for('login'))
@@ -165,32 +200,41 @@ def login_api():
         }), 423
 
     try:
-        uid = auth.login_with_rest_api(email, password)
+        result = auth.login_with_rest_api(email, password)
 
-        if uid:
+        if isinstance(result, dict) and result.get('error') == 'unverified':
+            log_failed_attempt(email, client_ip)
+            return jsonify({
+                "status": "error",
+                "message": "Please verify your email before logging in. Check your inbox."
+            }), 401
+
+        if result:
+            uid = result['uid']
             # Clear failed attempts on successful login
-            login_attempts.pop(email, None)
+            lockout_store.reset(email)
             log_security_event("LOGIN_SUCCESS", email, client_ip, f"UID: {uid}")
             
-            # Set session
+            # Set session; later requests verify the ID token locally
             session['user_id'] = uid
             session['email'] = email
+            # The refresh token is sealed: the cookie is signed, not encrypted
+            session['tokens'] = token_session.seal_session_tokens(
+                {k: result[k] for k in ('id_token', 'refresh_token', 'expires_at')}, app.secret_key)
             
             return jsonify({"status": "success", "uid": uid}), 200
         else:
             # Handle failed login
             log_failed_attempt(email, client_ip)
-            entry = login_attempts.get(email, {"count": 0})
-            entry["count"] += 1
-            entry["last"] = datetime.now()
-            
-            if entry["count"] >= 5:
-                entry["locked_until"] = datetime.now() + timedelta(minutes=5)
-                log_security_event("ACCOUNT_LOCKED", email, client_ip, f"Locked until: {entry['locked_until']}")
-            
-            login_attempts[email] = entry
+            locked_until = lockout_store.record_failure(email)
+            if locked_until:
+                log_security_event("ACCOUNT_LOCKED", email, client_ip, f"Locked until: {locked_until}")
             return jsonify({"status": "error", "message": "Invalid email or password"}), 401
             
+    except token_session.TokenServiceError as e:
+        # An outage is not a wrong password: no lockout failure is recorded
+        logging.error(f"Login unavailable for {email}: {str(e)}")
+        return jsonify({"status": "error", "message": "Authentication service unavailable. Please try again shortly."}), 503
     except Exception as e:
         logging.error(f"Login error for {email}: {str(e)}")
         return jsonify({"status": "error", "message": "Internal server error"}), 500
@@ -309,7 +353,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "2.0.0"
+        "version": "2.0.0",
+        "http": pool_stats()
     }), 200
 
 @app.route('/api/ping', methods=['GET'])
@@ -370,37 +415,172 @@ def delete_vault_api(vault_id):
     user_id = session['user_id']
     client_ip = request.remote_addr
 
+    # Large vaults can be deleted in the background and polled for progress
+    background = request.args.get('background', '').lower() in ('1', 'true', 'yes')
+
     try:
-        delete_vault(user_id, vault_id)
+        job = delete_vault(user_id, vault_id, background=background)
         log_security_event("VAULT_DELETED", f"user_id:{user_id}", client_ip, f"Vault ID: {vault_id}")
-        return jsonify({"status": "success", "message": "Vault deleted successfully"}), 200
+        if background:
+            return jsonify({"status": "success", "message": "Vault deletion started", "job": job}), 202
+        return jsonify({"status": "success", "message": "Vault deleted successfully", "job": job}), 200
     except ValueError as ve:
         return jsonify({"status": "error", "message": str(ve)}), 400
     except Exception as e:
         logging.error(f"Delete vault error for user {user_id}: {str(e)}")
         return jsonify({"status": "error", "message": "Failed to delete vault"}), 500
 
-@app.route('/api/vaults/<vault_id>/passwords', methods=['GET'])
+def search_index_building():
+    """503 while a user's search index is first built in the background"""
+    response = jsonify({"status": "error", "message": "Search is being prepared for your vaults. Please try again shortly."})
+    response.headers["Retry-After"] = "10"
+    return response, 503
+
+@app.route('/api/search', methods=['GET'])
+@limiter.limit("60 per minute")
+def search_api():
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    user_id = session['user_id']
+    query = request.args.get('q', '').strip()
+    vault_id = request.args.get('vault_id') or None
+
+    if not query:
+        return jsonify({"status": "error", "message": "Search query is required"}), 400
+
+    try:
+        limit = int(request.args.get('limit', SEARCH_RESULT_LIMIT))
+        results = search_passwords(user_id, query, vault_id, limit)
+        return jsonify({"status": "success", "results": results}), 200
+    except SearchIndexBuilding:
+        return search_index_building()
+    except ValueError as ve:
+        return jsonify({"status": "error", "message": str(ve)}), 400
+    except Exception as e:
+        logging.error(f"Search error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Search failed"}), 500
+
+@app.route('/api/search/stream', methods=['GET'])
 @limiter.limit("30 per minute")
+def search_stream_api():
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    user_id = session['user_id']
+    query = request.args.get('q', '').strip()
+
+    if not query:
+        return jsonify({"status": "error", "message": "Search query is required"}), 400
+    try:
+        limit = int(request.args.get('limit', SEARCH_RESULT_LIMIT))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid limit"}), 400
+    try:
+        if not search_index_ready(user_id):
+            return search_index_building()
+    except Exception as e:
+        logging.error(f"Search error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Search failed"}), 500
+
+    def generate():
+        # One JSON object per line (NDJSON): a "vault" line as each vault
+        # answers, then a "done" line, so the browser can render early results
+        searched = 0
+        try:
+            for chunk in search_all_vaults(user_id, query, limit):
+                searched += 1
+                if "error" in chunk:
+                    logging.error(f"Search error for user {user_id} in vault {chunk['vault_id']}: {chunk['error']}")
+                    chunk["error"] = "Search failed"
+                yield app.json.dumps(dict(chunk, type="vault")) + "\n"
+            yield app.json.dumps({"type": "done", "vaults": searched}) + "\n"
+        except Exception as e:
+            logging.error(f"Search error for user {user_id}: {str(e)}")
+            yield app.json.dumps({"type": "error", "message": "Search failed"}) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/vaults/<vault_id>/deletion', methods=['GET'])
+@limiter.limit("60 per minute")
+def vault_deletion_status_api(vault_id):
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    user_id = session['user_id']
+
+    try:
+        job = get_vault_deletion_status(user_id, vault_id)
+        if job is None:
+            return jsonify({"status": "error", "message": "No deletion in progress"}), 404
+        return jsonify({"status": "success", "job": job}), 200
+    except Exception as e:
+        logging.error(f"Vault deletion status error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Failed to get deletion status"}), 500
+
+@app.route('/api/vaults/<vault_id>/passwords', methods=['GET'])
+@limiter.limit("120 per minute")  # paged clients fetch several pages per vault
 def get_vault_passwords_api(vault_id):
     if 'user_id' not in session:
         return jsonify({"status": "error", "message": "Not authenticated"}), 401
         
     user_id = session['user_id']
     master_password = request.args.get('master_password')
+    metadata_only = request.args.get('metadata_only', '').lower() in ('1', 'true', 'yes')
     client_ip = request.remote_addr
     
-    if not master_password:
+    # Metadata-only listings decrypt nothing, so they don't need the master password
+    if not master_password and not metadata_only:
         return jsonify({"status": "error", "message": "Master password required"}), 400
 
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
     try:
-        passwords = get_vault_passwords(user_id, vault_id, master_password)
-        log_security_event("VAULT_PASSWORDS_FETCHED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}, Count: {len(passwords)}")
+        # Paginated listing when the client asks for a page size
+        if limit or cursor:
+            page = get_vault_passwords_page(user_id, vault_id, master_password, limit or DEFAULT_PAGE_SIZE, cursor, metadata_only)
+            passwords = page["passwords"]
+            log_security_event("VAULT_PASSWORDS_FETCHED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}, Count: {len(passwords)}, Paged: yes, Metadata only: {metadata_only}")
+            return jsonify({"status": "success", "passwords": passwords, "next_cursor": page["next_cursor"]}), 200
+
+        passwords = get_vault_passwords(user_id, vault_id, master_password, metadata_only)
+        log_security_event("VAULT_PASSWORDS_FETCHED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}, Count: {len(passwords)}, Metadata only: {metadata_only}")
         return jsonify({"status": "success", "passwords": passwords}), 200
+    except ValueError as ve:
+        return jsonify({"status": "error", "message": str(ve)}), 400
     except Exception as e:
         logging.error(f"Get vault passwords error for user {user_id}: {str(e)}")
         return jsonify({"status": "error", "message": "Failed to fetch vault passwords"}), 500
 
+@app.route('/api/vaults/<vault_id>/passwords/<platform>/reveal', methods=['POST'])
+@limiter.limit("60 per minute")
+@validate_request_data(['master_password'])
+def reveal_vault_password_api(vault_id, platform):
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    data = request.get_json()
+    user_id = session['user_id']
+    master_password = data.get("master_password")
+    client_ip = request.remote_addr
+
+    try:
+        entry = get_password_entry(user_id, vault_id, platform, master_password)
+        if entry is None:
+            return jsonify({"status": "error", "message": "Password not found"}), 404
+        if entry.get("error"):
+            return jsonify({"status": "error", "message": entry["error"]}), 403
+        log_security_event("VAULT_PASSWORD_REVEALED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}, Platform: {platform}")
+        return jsonify({"status": "success", "password": entry}), 200
+    except Exception as e:
+        logging.error(f"Reveal vault password error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Failed to reveal password"}), 500
+
 @app.route('/api/vaults/<vault_id>/passwords', methods=['POST'])
 @limiter.limit("10 per minute")
 @validate_request_data(['platform', 'username', 'password', 'master_password'])
@@ -426,6 +606,66 @@ def save_vault_password_api(vault_id):
         logging.error(f"Save vault password error for user {user_id}: {str(e)}")
         return jsonify({"status": "error", "message": "Failed to save password"}), 500
 
+@app.route('/api/vaults/<vault_id>/import', methods=['POST'])
+@limiter.limit("5 per minute")
+def import_vault_passwords_api(vault_id):
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    user_id = session['user_id']
+    upload = request.files.get('file')
+    master_password = request.form.get('master_password')
+    client_ip = request.remote_addr
+
+    if not upload or not master_password:
+        return jsonify({"status": "error", "message": "Missing required fields: file, master_password"}), 400
+
+    try:
+        # The upload is parsed as a stream and committed in batches
+        if request.form.get('format') == 'archive' or (upload.filename or '').endswith(ARCHIVE_EXTENSION):
+            result = import_archive(user_id, upload.stream, master_password, vault_id, request.form.get('passphrase'))
+        else:
+            fmt = request.form.get('format') or detect_format(upload.filename)
+            result = import_stream(user_id, upload.stream, fmt, master_password, vault_id)
+        log_security_event("VAULT_PASSWORDS_IMPORTED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}, Imported: {result['imported']}, Skipped: {result['skipped']}")
+        return jsonify({"status": "success", **result, "message": f"Imported {result['imported']} passwords"}), 200
+    except ValueError as ve:
+        return jsonify({"status": "error", "message": str(ve)}), 400
+    except Exception as e:
+        logging.error(f"Import passwords error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Failed to import passwords"}), 500
+
+@app.route('/api/vaults/<vault_id>/export', methods=['POST'])
+@limiter.limit("5 per minute")
+@validate_request_data(['master_password'])
+def export_vault_api(vault_id):
+    if 'user_id' not in session:
+        return jsonify({"status": "error", "message": "Not authenticated"}), 401
+
+    data = request.get_json()
+    user_id = session['user_id']
+    master_password = data.get("master_password")
+    passphrase = data.get("passphrase")
+    client_ip = request.remote_addr
+
+    try:
+        lines = export_vault_stream(user_id, vault_id, master_password, passphrase)
+    except ValueError as ve:
+        return jsonify({"status": "error", "message": str(ve)}), 400
+    except Exception as e:
+        logging.error(f"Export error for user {user_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Failed to export vault"}), 500
+
+    log_security_event("VAULT_EXPORTED", f"user_id:{user_id}", client_ip, f"Vault: {vault_id}")
+    # Chunks are encrypted and sent as they are produced; the archive's final
+    # marker lets the importer reject a download that was cut short or that
+    # ended in an error chunk.
+    return Response(
+        stream_with_context(lines),
+        mimetype="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="vault-{vault_id}{ARCHIVE_EXTENSION}"'}
+    )
+
 @app.route('/api/vaults/<vault_id>/passwords/<platform>', methods=['DELETE'])
 @limiter.limit("10 per minute")
 def delete_vault_password_api(vault_id, platform):
@@ -1,23 +1,14 @@
-import firebase_admin
-from firebase_admin import auth, credentials
-import smtplib
-from email.message import EmailMessage
 import time
-import requests
 from dotenv import load_dotenv
 import os
 import re  # for password strength check
 
 load_dotenv()
 
-# Initialize Firebase Admin SDK
-if not firebase_admin._apps:
-    cred = credentials.Certificate("firebase_config.json")
-    firebase_admin.initialize_app(cred)
+import token_session
+from firebase_client import auth
+from mail_queue import send_mail
 
-# Email sender details
-SENDER_EMAIL = os.getenv("SENDER_EMAIL")
-APP_PASSWORD = os.getenv("APP_PASSWORD")
 FIREBASE_API_KEY = os.getenv("FIREBASE_API_KEY")
 
 
@@ -37,22 +28,17 @@ def is_strong_password(password):
 
 
 def send_email_verification(email, link):
-    msg = EmailMessage()
-    msg['Subject'] = 'Verify Your Email for Password Manager'
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = email
-    msg.set_content(f"Click the link below to verify your email:\n\n{link}")
-
-    print(f"[i] Attempting to send verification email to {email}...")
+    """Queue the verification email; mail_queue delivers it in the background."""
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.login(SENDER_EMAIL, APP_PASSWORD)
-            smtp.send_message(msg)
-        print(f"[✓] Verification email sent to {email}")
-    except smtplib.SMTPAuthenticationError:
-        print("[!] SMTP Authentication failed: Check app password or email settings.")
+        send_mail(
+            email,
+            'Verify Your Email for Password Manager',
+            f"Click the link below to verify your email:\n\n{link}",
+        )
+        print(f"[✓] Verification email queued for {email}")
     except Exception as e:
-        print(f"[!] Failed to send email: {e}")
+        print(f"[!] Failed to queue verification email: {e}")
+        raise e
 
 
 def signup(email, password):
@@ -88,49 +74,44 @@ def signup(email, password):
 
 
 def login(email, password):
+    """Sign in and return the user's UID, or None."""
     try:
-        user = auth.get_user_by_email(email)
-        if not user.email_verified:
-            print("[!] Login failed: Email not verified. Please verify your email first.")
-            return None
-        print(f"[✓] Login successful: {user.uid}")
-        return user.uid
-    except auth.UserNotFoundError:
-        print("[!] Login failed: User not found")
-        return None
-    except Exception as e:
-        print(f"[!] Login failed: {e}")
+        result = login_with_rest_api(email, password)
+    except token_session.TokenServiceError:
+        print("[!] Login failed: the sign-in service is unavailable. Please try again shortly.")
         return None
+    if isinstance(result, dict) and result.get("uid"):
+        return result["uid"]
+    if isinstance(result, dict) and result.get("error") == "unverified":
+        print("[!] Login failed: Email not verified. Please verify your email first.")
+    return None
 
 
 def login_with_rest_api(email, password):
-    if not FIREBASE_API_KEY:
-        print("[!] Firebase API key not found in environment variables")
-        return login(email, password)
-
-    FIREBASE_REST_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_API_KEY}"
-    payload = {
-        "email": email,
-        "password": password,
-        "returnSecureToken": True
-    }
+    """Verify email and password with Firebase and start a token session.
 
+    Returns the token session from token_session.sign_in (uid, ID and refresh
+    tokens), {'error': 'unverified'} if the email is not verified, or None
+    if sign-in failed. There is no fallback: a failed password check is a
+    failed login. token_session.TokenServiceError is raised when Google
+    could not be reached, so an outage is not mistaken for a bad password.
+    """
     try:
-        response = requests.post(FIREBASE_REST_URL, json=payload, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            if not data.get('emailVerified', False):
-                print("[!] REST API login failed: Email not verified")
-                return {'error': 'unverified'}
-            print(f"[✓] Logged in as UID: {data['localId']}")
-            return data['localId']
-        else:
-            print("[!] REST API login failed, trying fallback method...")
-            return login(email, password)
+        tokens = token_session.sign_in(email, password)
+        if not tokens["email_verified"]:
+            print("[!] REST API login failed: Email not verified")
+            return {'error': 'unverified'}
+        print(f"[✓] Logged in as UID: {tokens['uid']}")
+        return tokens
+    except token_session.TokenError as e:
+        print(f"[!] REST API login failed: {e}")
+        return None
+    except token_session.TokenServiceError as e:
+        print(f"[!] REST API login failed: {e}")
+        raise e
     except Exception as e:
         print(f"[!] REST API login failed: {e}")
-        print("[i] Trying fallback login method...")
-        return login(email, password)
+        return None
 
 
 def resend_verification_email(email):
@@ -0,0 +1,301 @@
+# benchmark.py
+import argparse
+import base64
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+# Benchmarks for the crypto hot paths and the vault listing API.
+#
+#   python benchmark.py --suite crypto
+#   python benchmark.py --suite startup
+#   FIRESTORE_EMULATOR_HOST=localhost:8080 python benchmark.py --suite api --sizes 100 1000
+#   python benchmark.py --output results.json --compare baseline.json
+#
+# The api suite seeds throwaway vaults, so it only runs against the Firestore
+# emulator (firebase emulators:start --only firestore), never a live project.
+# The startup suite imports entry points in fresh interpreters and fails when
+# one exceeds its import-time budget.
+
+SUITES = ("crypto", "api", "startup")
+DEFAULT_SIZES = (100, 1000, 5000)
+REGRESSION_THRESHOLD = 0.2  # fractional slowdown of mean_ms that counts as a regression
+BENCH_MASTER_PASSWORD = "benchmark-master-password"
+
+# Cumulative import time (python -X importtime) allowed per entry point.
+# Neither may import firebase_admin or google.cloud.firestore at import time.
+IMPORT_BUDGETS_MS = {"cli": 350, "app": 750}
+
+
+def _timed(fn, iterations: int, warmup: int = 1):
+    """Run fn repeatedly and return latency statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": iterations,
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "min_ms": round(samples[0], 4),
+        "ops_per_sec": round(1000 / mean, 2) if mean else None,
+    }
+
+
+def _result(name: str, stats: dict, **params):
+    result = {"name": name, "params": params, **stats}
+    print(f"[✓] {name} {params or ''}: mean {stats['mean_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms")
+    return result
+
+
+# ===== CRYPTO SUITE =====
+
+def bench_crypto(quick: bool = False):
+    from crypto_utils import (derive_key, derive_vault_key, encrypt, decrypt, decrypt_many, encrypt_many,
+                              entry_aad, generate_password, generate_salt, keyring, DEFAULT_KDF)
+
+    scale = 0.1 if quick else 1
+    runs = lambda n: max(3, int(n * scale))
+    salt = generate_salt()
+    salt_bytes = base64.b64decode(salt)
+    aad = entry_aad("bench-vault", "bench-entry")
+    plain = "correct horse battery staple"
+    results = []
+
+    results.append(_result("crypto.derive_key", _timed(lambda: derive_key(BENCH_MASTER_PASSWORD, salt_bytes), runs(10)), kdf="legacy"))
+    results.append(_result("crypto.derive_vault_key", _timed(lambda: derive_vault_key(BENCH_MASTER_PASSWORD, salt_bytes, DEFAULT_KDF), runs(10)), kdf=DEFAULT_KDF))
+
+    # Vault envelopes: the key is derived once and then served by the keyring
+    keyring.get_or_derive(BENCH_MASTER_PASSWORD, salt_bytes, DEFAULT_KDF)
+    blob = encrypt(plain, BENCH_MASTER_PASSWORD, salt, aad)
+    results.append(_result("crypto.encrypt", _timed(lambda: encrypt(plain, BENCH_MASTER_PASSWORD, salt, aad), runs(5000)), kdf=DEFAULT_KDF))
+    results.append(_result("crypto.decrypt", _timed(lambda: decrypt(blob, BENCH_MASTER_PASSWORD, salt, aad), runs(5000)), kdf=DEFAULT_KDF))
+
+    # Legacy per-entry-salt blobs pay a full KDF run on every decrypt
+    legacy_blob = encrypt(plain, BENCH_MASTER_PASSWORD)
+    results.append(_result("crypto.decrypt", _timed(lambda: decrypt(legacy_blob, BENCH_MASTER_PASSWORD), runs(10)), kdf="legacy"))
+
+    for count in (100, 1000):
+        aads = [entry_aad("bench-vault", f"entry-{i}") for i in range(count)]
+        blobs = encrypt_many([plain] * count, BENCH_MASTER_PASSWORD, salt, aads=aads)
+        results.append(_result("crypto.encrypt_many", _timed(lambda: encrypt_many([plain] * count, BENCH_MASTER_PASSWORD, salt, aads=aads), runs(20)), count=count))
+        results.append(_result("crypto.decrypt_many", _timed(lambda: decrypt_many(blobs, BENCH_MASTER_PASSWORD, salt, aads=aads), runs(20)), count=count))
+
+    results.append(_result("crypto.generate_password", _timed(lambda: generate_password(16), runs(20000)), length=16))
+    return results
+
+
+# ===== API SUITE =====
+
+def _connect_emulator():
+    """Initialise the Firebase client against the emulator (anonymous credentials without firebase_config.json)."""
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        raise RuntimeError("The api suite needs FIRESTORE_EMULATOR_HOST set to a running Firestore emulator")
+    os.environ.setdefault("GCLOUD_PROJECT", "passager-benchmark")
+    import firebase_client
+    firebase_client.get_db()
+
+
+def bench_api(sizes, quick: bool = False):
+    _connect_emulator()
+    import app as web
+
+    # The benchmark would otherwise trip the per-minute limits it is measuring through
+    web.limiter.enabled = False
+    client = web.app.test_client()
+    user_id = f"bench-{uuid.uuid4().hex[:12]}"
+    # The emulator run has no Firebase Auth sign-in, so the session carries
+    # placeholder tokens and the per-request token check accepts them
+    tokens = {"id_token": "benchmark", "refresh_token": "benchmark", "expires_at": time.time() + 86400}
+    current_tokens = web.token_session.current_tokens
+    web.token_session.current_tokens = lambda session_tokens: (user_id, session_tokens)
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["tokens"] = web.token_session.seal_session_tokens(tokens, web.app.secret_key)
+
+    try:
+        return _bench_vault_sizes(client, user_id, sizes, quick)
+    finally:
+        web.token_session.current_tokens = current_tokens
+
+
+def _bench_vault_sizes(client, user_id, sizes, quick: bool):
+    from db import create_vault, delete_vault, save_passwords_bulk, vault_cache
+
+    results = []
+    for size in sizes:
+        vault_id = create_vault(user_id, f"Benchmark {size}")
+        try:
+            entries = [{
+                "platform": f"service-{i:06d}",
+                "username": f"user{i}@example.com",
+                "password": f"pw-{i}-{uuid.uuid4().hex}",
+                "url": f"https://service-{i}.example.com",
+                "notes": ""
+            } for i in range(size)]
+            started = time.perf_counter()
+            save_passwords_bulk(user_id, entries, BENCH_MASTER_PASSWORD, vault_id)
+            seed_ms = (time.perf_counter() - started) * 1000
+            print(f"[✓] Seeded {size} passwords in {seed_ms:.0f} ms")
+
+            base = f"/api/vaults/{vault_id}/passwords"
+
+            def get(url):
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f"GET {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+            def cold(url):
+                # Every request reads through to Firestore
+                if vault_cache is not None:
+                    vault_cache.clear()
+                get(url)
+
+            full_runs = max(3, (2 if quick else 10) * 1000 // max(size, 1))
+            page_runs = 5 if quick else 30
+            results.append(_result("api.list_page_metadata", _timed(lambda: get(f"{base}?metadata_only=1&limit=50"), page_runs), vault_size=size))
+            results.append(_result("api.list_page_decrypted", _timed(lambda: get(f"{base}?master_password={BENCH_MASTER_PASSWORD}&limit=50"), page_runs), vault_size=size))
+            results.append(_result("api.list_all_decrypted", _timed(lambda: cold(f"{base}?master_password={BENCH_MASTER_PASSWORD}"), full_runs), vault_size=size, cache="cold"))
+            results.append(_result("api.list_all_decrypted", _timed(lambda: get(f"{base}?master_password={BENCH_MASTER_PASSWORD}"), full_runs), vault_size=size, cache="warm"))
+        finally:
+            delete_vault(user_id, vault_id)
+    return results
+
+
+# ===== STARTUP SUITE =====
+
+def _import_time_ms(module: str) -> float:
+    """Cumulative import time of module in a fresh interpreter, from -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1:]}")
+    for line in reversed(proc.stderr.splitlines()):
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"No importtime line for {module}")
+
+
+def bench_startup(quick: bool = False):
+    results = []
+    over_budget = []
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        samples = sorted(_import_time_ms(module) for _ in range(3 if quick else 10))
+        mean = statistics.fmean(samples)
+        stats = {
+            "iterations": len(samples),
+            "mean_ms": round(mean, 4),
+            "p50_ms": round(samples[len(samples) // 2], 4),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+            "min_ms": round(samples[0], 4),
+            "ops_per_sec": None,
+        }
+        results.append(_result("startup.import", stats, module=module, budget_ms=budget))
+        # The median keeps one slow, cold-cache start from failing the run
+        if stats["p50_ms"] > budget:
+            over_budget.append(module)
+            print(f"[!] import {module} takes {stats['p50_ms']:.0f} ms, over its {budget} ms budget")
+    return results, over_budget
+
+
+# ===== REPORTING =====
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    from crypto_utils import DEFAULT_KDF, DECRYPT_WORKERS
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "kdf": DEFAULT_KDF,
+        "decrypt_workers": DECRYPT_WORKERS,
+    }
+
+
+def _key(result: dict):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare_results(results, baseline: dict, threshold: float = REGRESSION_THRESHOLD):
+    """Return the results whose mean latency grew by more than threshold over the baseline."""
+    previous = {_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(_key(result))
+        if not before or not before.get("mean_ms"):
+            continue
+        change = result["mean_ms"] / before["mean_ms"] - 1
+        if change > threshold:
+            regressions.append({"name": result["name"], "params": result["params"], "baseline_ms": before["mean_ms"],
+                                "mean_ms": result["mean_ms"], "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crypto_utils, the vault listing API and import time.")
+    parser.add_argument("--suite", choices=SUITES, action="append", help="suite to run; repeat for several (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="vault sizes for the api suite")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke run")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"slowdown counted as a regression (default: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args()
+
+    suites = args.suite or list(SUITES)
+    if not args.suite and not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        print("[!] FIRESTORE_EMULATOR_HOST not set, skipping the api suite")
+        suites.remove("api")
+
+    results = []
+    over_budget = []
+    if "crypto" in suites:
+        results += bench_crypto(args.quick)
+    if "api" in suites:
+        results += bench_api(args.sizes, args.quick)
+    if "startup" in suites:
+        startup_results, over_budget = bench_startup(args.quick)
+        results += startup_results
+
+    report = {"metadata": _metadata(), "results": results}
+    if over_budget:
+        report["over_import_budget"] = over_budget
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+        for regression in regressions:
+            print(f"[!] Regression in {regression['name']} {regression['params']}: "
+                  f"{regression['baseline_ms']:.3f} -> {regression['mean_ms']:.3f} ms (+{regression['change']:.0%})")
+        if not regressions:
+            print("[✓] No regressions against the baseline")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[✓] Results written to {args.output}")
+    if regressions or over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
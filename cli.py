@@ -2,6 +2,8 @@
 from auth import signup, login
 from db import save_password, fetch_passwords, delete_password
 from crypto_utils import generate_password
+from importer import import_file
+from vault_archive import export_vault_to_file, import_archive_file, ARCHIVE_EXTENSION
 
 def main():
     print("🟢 Welcome to CLI Password Manager")
@@ -13,7 +15,7 @@ def main():
     if action == 's':
         user_id = signup(email, password)
     else:
-        user_id = login(email)
+        user_id = login(email, password)
 
     if not user_id:
         print("[!] Exiting due to login/signup failure.")
@@ -27,7 +29,10 @@ def main():
         print("2. View all saved passwords")
         print("3. Delete a password")
         print("4. Generate strong password")
-        print("5. Exit")
+        print("5. Import passwords from CSV/JSON export")
+        print("6. Export vault to encrypted archive")
+        print("7. Import encrypted archive")
+        print("8. Exit")
 
         choice = input("Enter choice: ")
 
@@ -54,6 +59,37 @@ def main():
             print(f"[Suggested Password]: {pw}")
 
         elif choice == "5":
+            path = input("Path to export file (.csv, .json or .jsonl): ").strip()
+            try:
+                result = import_file(
+                    user_id, path, master_password,
+                    progress=lambda imported, skipped: print(f"  … {imported} imported, {skipped} skipped")
+                )
+                print(f"[✓] Import finished: {result['imported']} imported, {result['skipped']} skipped")
+            except Exception as e:
+                print(f"[!] Import failed: {e}")
+
+        elif choice == "6":
+            vault_id = input("Vault ID to export (leave blank for default): ").strip() or "default"
+            path = input(f"Save archive as (e.g. passwords{ARCHIVE_EXTENSION}): ").strip() or f"passwords{ARCHIVE_EXTENSION}"
+            try:
+                count = export_vault_to_file(user_id, vault_id, master_password, path)
+                print(f"[✓] Exported {count} passwords. The archive is encrypted with your master password.")
+            except Exception as e:
+                print(f"[!] Export failed: {e}")
+
+        elif choice == "7":
+            path = input(f"Path to archive ({ARCHIVE_EXTENSION}): ").strip()
+            try:
+                result = import_archive_file(
+                    user_id, path, master_password,
+                    progress=lambda imported, skipped: print(f"  … {imported} imported")
+                )
+                print(f"[✓] Import finished: {result['imported']} imported")
+            except Exception as e:
+                print(f"[!] Import failed: {e}")
+
+        elif choice == "8":
             print("👋 Exiting. Stay secure!")
             break
 
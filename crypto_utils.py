@@ -1,31 +1,267 @@
 import os
 import base64
+import hashlib
+import hmac
 import random
 import string
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding, hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 
 # === ENCRYPTION / DECRYPTION SECTION ===
 
 def derive_key(password: str, salt: bytes) -> bytes:
-    """Derive a secure AES key from master password and salt using PBKDF2."""
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=100_000,
-        backend=default_backend()
-    )
-    return kdf.derive(password.encode())
-
-def encrypt(plain_text: str, password: str) -> str:
-    """Encrypt text using AES-CBC with a key derived from the password."""
+    """Derive the AES key of a legacy per-entry-salt blob (PBKDF2, 100,000 iterations)."""
+    return derive_vault_key(password, salt, LEGACY_KDF)
+
+
+# Envelope format: "v3:<kdf>:<base64(nonce + ciphertext + tag)>", AES-256-GCM
+# authenticated over associated data naming the vault and entry (entry_aad), so
+# a blob tampered with or copied onto another entry fails to decrypt. The KDF
+# salt is not stored in the blob; it lives on the vault document so every entry
+# in a vault shares one derived data-encryption key.
+# Older formats stay readable and are rewritten as v3 when next saved:
+#   "v2:<kdf>:<base64(iv + ciphertext)>"  AES-CBC, vault key, unauthenticated
+#   base64(salt + iv + ciphertext)        AES-CBC, per-entry salt (no prefix)
+ENVELOPE_VERSION = "v3"
+CBC_ENVELOPE_VERSION = "v2"
+GCM_NONCE_SIZE = 12
+
+# KDF specs name the function and its cost, and are recorded in every envelope
+# and archive header, so data stays readable after the default changes:
+#   pbkdf2-sha256.i<iterations>
+#   scrypt.n<cost>.r<block size>.p<parallelism>
+#   argon2id.t<passes>.m<memory KiB>.p<lanes>   (needs argon2-cffi)
+# Run kdf_benchmark.py to pick costs for a host, then set VAULT_KDF.
+LEGACY_KDF = "pbkdf2-sha256.i100000"
+DEFAULT_KDF = os.getenv("VAULT_KDF", "scrypt.n32768.r8.p1")
+
+# Accepted parameter ranges, so a crafted archive header cannot ask for
+# unbounded work or memory
+KDF_PARAMS = {
+    "pbkdf2-sha256": {"i": (10_000, 10_000_000)},
+    "scrypt": {"n": (2 ** 10, 2 ** 20), "r": (1, 32), "p": (1, 16)},
+    "argon2id": {"t": (1, 20), "m": (8 * 1024, 1024 * 1024), "p": (1, 16)},
+}
+KDF_MAX_WORK_BYTES = 4 * 1024 ** 3  # memory times passes
+KDF_TARGET_MS = 250
+
+KEYRING_TTL = int(os.getenv("KEYRING_TTL", "900"))  # seconds
+KEYRING_MAX_KEYS = int(os.getenv("KEYRING_MAX_KEYS", "256"))
+
+# Bulk decryption pool: "thread" (default, the KDF and AES calls release the
+# GIL) or "process" for interpreters where they do not.
+DECRYPT_EXECUTOR = os.getenv("DECRYPT_EXECUTOR", "thread")
+DECRYPT_WORKERS = int(os.getenv("DECRYPT_WORKERS", str(os.cpu_count() or 1)))
+DECRYPT_INLINE_THRESHOLD = 8  # below this many blobs a pool costs more than it saves
+
+
+class KeyRing:
+    """In-process cache of derived data-encryption keys with TTL and LRU eviction."""
+
+    def __init__(self, ttl: int = KEYRING_TTL, max_keys: int = KEYRING_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        # Slots are keyed by an HMAC under a per-process secret so the cache
+        # never holds a plain fast hash of the master password.
+        self._secret = os.urandom(32)
+
+    def _slot(self, password: str, salt: bytes, kdf: str) -> bytes:
+        return hmac.new(self._secret, kdf.encode() + b"\0" + salt + password.encode(), hashlib.sha256).digest()
+
+    def get(self, password: str, salt: bytes, kdf: str = DEFAULT_KDF):
+        """Return the cached key for these inputs, or None if missing/expired."""
+        slot = self._slot(password, salt, kdf)
+        with self._lock:
+            entry = self._keys.get(slot)
+            if entry is None:
+                return None
+            key, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._keys[slot]
+                return None
+            self._keys.move_to_end(slot)
+            return key
+
+    def put(self, password: str, salt: bytes, key: bytes, kdf: str = DEFAULT_KDF):
+        slot = self._slot(password, salt, kdf)
+        with self._lock:
+            self._keys[slot] = (key, time.monotonic() + self.ttl)
+            self._keys.move_to_end(slot)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+    def get_or_derive(self, password: str, salt: bytes, kdf: str = DEFAULT_KDF) -> bytes:
+        """Return the data-encryption key, running the KDF only on a cache miss."""
+        key = self.get(password, salt, kdf)
+        if key is None:
+            key = derive_vault_key(password, salt, kdf)
+            self.put(password, salt, key, kdf)
+        return key
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            for slot in [s for s, (_, exp) in self._keys.items() if now >= exp]:
+                del self._keys[slot]
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+
+keyring = KeyRing()
+
+
+def generate_salt() -> str:
+    """Generate a fresh vault KDF salt, base64-encoded for storage in Firestore."""
+    return base64.b64encode(os.urandom(16)).decode()
+
+
+def parse_kdf(kdf: str):
+    """Split a KDF spec into its name and integer parameters, checking both."""
+    name, _, rest = kdf.partition(".")
+    if name not in KDF_PARAMS:
+        raise ValueError(f"Unsupported KDF: {kdf}")
+    try:
+        params = {part[0]: int(part[1:]) for part in rest.split(".") if part}
+    except ValueError:
+        raise ValueError(f"Malformed KDF spec: {kdf}")
+
+    if set(params) != set(KDF_PARAMS[name]):
+        raise ValueError(f"Malformed KDF spec: {kdf}")
+    for param, (low, high) in KDF_PARAMS[name].items():
+        if not low <= params[param] <= high:
+            raise ValueError(f"KDF parameter {param} out of range in {kdf}")
+    if name == "scrypt" and params["n"] & (params["n"] - 1):
+        raise ValueError(f"scrypt cost must be a power of two: {kdf}")
+    # Each parameter may be in range while their product is not
+    if name == "scrypt" and 128 * params["n"] * params["r"] * params["p"] > KDF_MAX_WORK_BYTES:
+        raise ValueError(f"KDF cost too high: {kdf}")
+    if name == "argon2id" and 1024 * params["m"] * params["t"] > KDF_MAX_WORK_BYTES:
+        raise ValueError(f"KDF cost too high: {kdf}")
+    if name == "argon2id" and params["m"] < 8 * params["p"]:
+        raise ValueError(f"argon2id memory too small for its lanes: {kdf}")
+    return name, params
+
+
+def format_kdf(name: str, **params) -> str:
+    return ".".join([name] + [f"{param}{params[param]}" for param in KDF_PARAMS[name]])
+
+
+def derive_vault_key(password: str, salt: bytes, kdf: str = DEFAULT_KDF) -> bytes:
+    """Derive a vault data-encryption key for the given KDF spec."""
+    name, params = parse_kdf(kdf)
+    if name == "pbkdf2-sha256":
+        return PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            iterations=params["i"],
+            backend=default_backend()
+        ).derive(password.encode())
+    if name == "scrypt":
+        return Scrypt(salt=salt, length=32, n=params["n"], r=params["r"], p=params["p"],
+                      backend=default_backend()).derive(password.encode())
+
+    # Optional dependency, only needed once an argon2id spec is in use
+    from argon2.low_level import hash_secret_raw, Type
+    return hash_secret_raw(password.encode(), salt, time_cost=params["t"], memory_cost=params["m"],
+                           parallelism=params["p"], hash_len=32, type=Type.ID)
+
+
+def needs_rehash(encrypted_text: str) -> bool:
+    """True for blobs not in the current envelope under the current DEFAULT_KDF.
+
+    That covers legacy per-entry-salt blobs, CBC envelopes and envelopes from
+    an older KDF or cost; re-encrypting them moves a vault onto the current ones.
+    """
+    return not encrypted_text.startswith(ENVELOPE_VERSION + ":") or envelope_kdf(encrypted_text) != DEFAULT_KDF
+
+
+def entry_aad(vault_id: str, entry_id: str) -> bytes:
+    """Associated data binding an envelope to the vault and entry it was written for."""
+    return f"{vault_id}\0{entry_id}".encode()
+
+
+def benchmark_kdf(kdf: str, rounds: int = 3) -> float:
+    """Best of rounds wall-clock seconds for one key derivation with this spec."""
     salt = os.urandom(16)
-    key = derive_key(password, salt)
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        derive_vault_key("benchmark", salt, kdf)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_kdf(name: str, target_ms: int = KDF_TARGET_MS, rounds: int = 3):
+    """Find the costliest spec of the named KDF that derives a key within target_ms on this host.
+
+    Returns (spec, seconds). The cost never drops below the low end of
+    KDF_PARAMS, even if that is slower than the target.
+    """
+    target = target_ms / 1000
+
+    if name == "pbkdf2-sha256":
+        # PBKDF2 time is linear in the iteration count: measure once and scale
+        low, high = KDF_PARAMS[name]["i"]
+        elapsed = benchmark_kdf(LEGACY_KDF, rounds)
+        iterations = int(100_000 * target / elapsed) // 10_000 * 10_000
+        spec = format_kdf(name, i=max(low, min(high, iterations)))
+        return spec, benchmark_kdf(spec, rounds)
+
+    if name == "scrypt":
+        make = lambda cost: format_kdf(name, n=cost, r=8, p=1)
+    elif name == "argon2id":
+        lanes = min(4, os.cpu_count() or 1)
+        make = lambda cost: format_kdf(name, t=3, m=cost, p=lanes)
+    else:
+        raise ValueError(f"Unsupported KDF: {name}")
+
+    # Memory-hard costs are doubled until the next step would overshoot
+    param = "n" if name == "scrypt" else "m"
+    cost, high = KDF_PARAMS[name][param]
+    spec = make(cost)
+    elapsed = benchmark_kdf(spec, rounds)
+    while cost * 2 <= high:
+        next_spec = make(cost * 2)
+        next_elapsed = benchmark_kdf(next_spec, rounds)
+        if next_elapsed > target:
+            break
+        cost, spec, elapsed = cost * 2, next_spec, next_elapsed
+    return spec, elapsed
+
+
+def is_envelope(encrypted_text: str) -> bool:
+    """Return True if the blob uses a versioned vault-key envelope format (GCM or CBC)."""
+    return encrypted_text.startswith((ENVELOPE_VERSION + ":", CBC_ENVELOPE_VERSION + ":"))
+
+
+def is_authenticated(encrypted_text: str) -> bool:
+    """Return True if the blob is an AES-GCM envelope, which a wrong key cannot decrypt.
+
+    Legacy and CBC blobs only check their padding, so a wrong password now and
+    then "decrypts" one into garbage.
+    """
+    return encrypted_text.startswith(ENVELOPE_VERSION + ":")
+
 
+def _aes_cbc_encrypt(plain_text: str, key: bytes) -> bytes:
     iv = os.urandom(16)
     cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
     encryptor = cipher.encryptor()
@@ -34,30 +270,169 @@ def encrypt(plain_text: str, password: str) -> str:
     padded_data = padder.update(plain_text.encode()) + padder.finalize()
 
     encrypted = encryptor.update(padded_data) + encryptor.finalize()
+    return iv + encrypted
+
+
+def _aes_cbc_decrypt(iv: bytes, ciphertext: bytes, key: bytes) -> str:
+    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+    decryptor = cipher.decryptor()
+
+    decrypted_padded = decryptor.update(ciphertext) + decryptor.finalize()
+
+    unpadder = padding.PKCS7(128).unpadder()
+    decrypted = unpadder.update(decrypted_padded) + unpadder.finalize()
+
+    return decrypted.decode()
+
+
+def encrypt_with_key(plain_text: str, key: bytes, kdf: str = DEFAULT_KDF, aad: bytes = b"") -> str:
+    """Encrypt text into an AES-GCM envelope using an already-derived vault key.
+
+    aad must be given again, unchanged, to decrypt; see entry_aad.
+    """
+    nonce = os.urandom(GCM_NONCE_SIZE)
+    payload = base64.b64encode(nonce + AESGCM(key).encrypt(nonce, plain_text.encode(), aad)).decode()
+    return f"{ENVELOPE_VERSION}:{kdf}:{payload}"
+
+
+def decrypt_with_key(encrypted_text: str, key: bytes, aad: bytes = b"") -> str:
+    """Decrypt a versioned envelope (GCM or CBC) using an already-derived vault key.
+
+    Raises cryptography's InvalidTag if a GCM envelope was altered or aad
+    does not match; CBC envelopes carry no associated data.
+    """
+    # Nonce, IV and ciphertext are views into the decoded payload, not copies
+    data = memoryview(base64.b64decode(encrypted_text[encrypted_text.index(":", 3) + 1:]))
+    if encrypted_text.startswith(ENVELOPE_VERSION + ":"):
+        return AESGCM(key).decrypt(data[:GCM_NONCE_SIZE], data[GCM_NONCE_SIZE:], aad).decode()
+    return _aes_cbc_decrypt(data[:16], data[16:], key)
+
+
+def envelope_kdf(encrypted_text: str) -> str:
+    """Return the KDF spec recorded in an envelope header."""
+    return encrypted_text.split(":", 2)[1]
+
+
+def encrypt(plain_text: str, password: str, salt: str = None, aad: bytes = b"") -> str:
+    """Encrypt text with a key derived from the password.
+
+    With a vault ``salt`` the key comes from the keyring and the result is an
+    AES-GCM envelope authenticating ``aad``; without one a per-entry salt is
+    embedded (legacy AES-CBC format, which ignores aad).
+    """
+    if salt:
+        key = keyring.get_or_derive(password, base64.b64decode(salt), DEFAULT_KDF)
+        return encrypt_with_key(plain_text, key, DEFAULT_KDF, aad)
+
+    entry_salt = os.urandom(16)
+    key = derive_key(password, entry_salt)
 
     # Combine salt + iv + encrypted and base64 encode
-    encrypted_blob = salt + iv + encrypted
+    encrypted_blob = entry_salt + _aes_cbc_encrypt(plain_text, key)
     return base64.b64encode(encrypted_blob).decode()
 
-def decrypt(encrypted_text: str, password: str) -> str:
+def decrypt(encrypted_text: str, password: str, salt: str = None, aad: bytes = b"") -> str:
     """Decrypt the AES-encrypted base64 string using the master password."""
-    encrypted_data = base64.b64decode(encrypted_text)
+    if is_envelope(encrypted_text):
+        if not salt:
+            raise ValueError("Vault salt required to decrypt envelope")
+        key = keyring.get_or_derive(password, base64.b64decode(salt), envelope_kdf(encrypted_text))
+        return decrypt_with_key(encrypted_text, key, aad)
+
+    encrypted_data = memoryview(base64.b64decode(encrypted_text))
 
-    salt = encrypted_data[:16]
+    entry_salt = bytes(encrypted_data[:16])
     iv = encrypted_data[16:32]
     ciphertext = encrypted_data[32:]
 
-    key = derive_key(password, salt)
+    key = derive_key(password, entry_salt)
+    return _aes_cbc_decrypt(iv, ciphertext, key)
 
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
 
-    decrypted_padded = decryptor.update(ciphertext) + decryptor.finalize()
+_pools = {}
+_pools_lock = threading.Lock()
 
-    unpadder = padding.PKCS7(128).unpadder()
-    decrypted = unpadder.update(decrypted_padded) + unpadder.finalize()
 
-    return decrypted.decode()
+def _get_pool(kind: str, workers: int):
+    """Return a shared executor so repeated unlocks don't pay pool start-up."""
+    with _pools_lock:
+        pool = _pools.get((kind, workers))
+        if pool is None:
+            if kind == "process":
+                pool = ProcessPoolExecutor(max_workers=workers)
+            elif kind == "thread":
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decrypt")
+            else:
+                raise ValueError(f"Unknown executor: {kind}")
+            _pools[(kind, workers)] = pool
+        return pool
+
+
+def _decrypt_task(args):
+    """Decrypt one blob for decrypt_many; returns None instead of raising."""
+    encrypted_text, password, salt, keys, aad = args
+    try:
+        if is_envelope(encrypted_text) and envelope_kdf(encrypted_text) in keys:
+            return decrypt_with_key(encrypted_text, keys[envelope_kdf(encrypted_text)], aad)
+        return decrypt(encrypted_text, password, salt, aad)
+    except Exception:
+        return None
+
+
+def decrypt_many(encrypted_texts, password: str, salt: str = None, max_workers: int = None, executor: str = None, aads=None) -> list:
+    """Decrypt many blobs concurrently.
+
+    Results come back in input order; an entry that fails to decrypt (wrong
+    master password, corrupt, tampered or missing blob) is returned as None.
+    aads, if given, holds each blob's associated data in the same order.
+    """
+    encrypted_texts = list(encrypted_texts)
+    aads = list(aads) if aads is not None else [b""] * len(encrypted_texts)
+    workers = max_workers or DECRYPT_WORKERS
+    kind = executor or DECRYPT_EXECUTOR
+
+    # Vault-key envelopes share one key per KDF spec: derive each once here so
+    # workers (including separate processes) only do the AES step.
+    keys = {}
+    if salt:
+        for kdf in {envelope_kdf(t) for t in encrypted_texts if isinstance(t, str) and is_envelope(t)}:
+            try:
+                keys[kdf] = keyring.get_or_derive(password, base64.b64decode(salt), kdf)
+            except Exception:
+                pass
+
+    tasks = [(t, password, salt, keys, aad) for t, aad in zip(encrypted_texts, aads)]
+    if workers <= 1 or len(tasks) < DECRYPT_INLINE_THRESHOLD:
+        return [_decrypt_task(task) for task in tasks]
+
+    pool = _get_pool(kind, workers)
+    chunksize = max(1, len(tasks) // (workers * 4)) if kind == "process" else 1
+    return list(pool.map(_decrypt_task, tasks, chunksize=chunksize))
+
+
+def _encrypt_task(args):
+    plain_text, key, kdf, aad = args
+    return encrypt_with_key(plain_text, key, kdf, aad)
+
+
+def encrypt_many(plain_texts, password: str, salt: str, max_workers: int = None, executor: str = None, aads=None) -> list:
+    """Encrypt many strings into vault envelopes concurrently, in input order.
+
+    aads, if given, holds each string's associated data in the same order.
+    """
+    plain_texts = list(plain_texts)
+    aads = list(aads) if aads is not None else [b""] * len(plain_texts)
+    workers = max_workers or DECRYPT_WORKERS
+    kind = executor or DECRYPT_EXECUTOR
+
+    key = keyring.get_or_derive(password, base64.b64decode(salt), DEFAULT_KDF)
+    tasks = [(t, key, DEFAULT_KDF, aad) for t, aad in zip(plain_texts, aads)]
+    if workers <= 1 or len(tasks) < DECRYPT_INLINE_THRESHOLD:
+        return [_encrypt_task(task) for task in tasks]
+
+    pool = _get_pool(kind, workers)
+    chunksize = max(1, len(tasks) // (workers * 4)) if kind == "process" else 1
+    return list(pool.map(_encrypt_task, tasks, chunksize=chunksize))
 
 # === PASSWORD GENERATOR SECTION ===
 
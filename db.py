@@ -1,75 +1,399 @@
 # db.py
-import firebase_admin
-from firebase_admin import credentials, firestore
-from crypto_utils import encrypt, decrypt
+from firebase_client import firestore, get_db
+from crypto_utils import encrypt, encrypt_many, decrypt_many, generate_salt, needs_rehash, entry_aad, is_authenticated
+from search_index import entry_tokens, query_tokens, blind, index_doc_id, rank as search_rank
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
+import base64
+import json
+import os
+import threading
+import time
 
-# Initialize Firestore
-if not firebase_admin._apps:
-    cred = credentials.Certificate("firebase_config.json")
-    firebase_admin.initialize_app(cred)
+# Page sizes for cursor-based vault listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-db = firestore.client()
+# Firestore accepts at most 500 writes per batch or transaction
+MAX_BATCH_WRITES = 500
+
+# Read-through cache of vault documents as stored in Firestore, so passwords
+# stay ciphertext in it. VAULT_CACHE_URL selects the backend: "off" (default),
+# "redis://..." (shared between workers) or "memory". A memory cache is only
+# invalidated by writes in its own process, so it is for single-process
+# servers; gunicorn.conf.py turns it off when running several workers.
+VAULT_CACHE_URL = os.getenv("VAULT_CACHE_URL", "off")
+VAULT_CACHE_TTL = int(os.getenv("VAULT_CACHE_TTL", "60"))  # seconds
+VAULT_CACHE_MAX_VAULTS = int(os.getenv("VAULT_CACHE_MAX_VAULTS", "256"))
+VAULT_CACHE_MAX_DOCS = int(os.getenv("VAULT_CACHE_MAX_DOCS", "50000"))
+# Vaults larger than this are always paged from Firestore instead
+VAULT_CACHE_MAX_VAULT_DOCS = int(os.getenv("VAULT_CACHE_MAX_VAULT_DOCS", "5000"))
+
+
+class MemoryVaultCache:
+    """In-process vault document cache with TTL, LRU eviction and a total document limit.
+
+    Each vault carries a generation that invalidate() bumps; a reader passes
+    the generation it saw before querying Firestore to put(), so a result
+    read before a concurrent write is never stored.
+    """
+
+    def __init__(self, ttl: int = VAULT_CACHE_TTL, max_vaults: int = VAULT_CACHE_MAX_VAULTS, max_docs: int = VAULT_CACHE_MAX_DOCS):
+        self.ttl = ttl
+        self.max_vaults = max_vaults
+        self.max_docs = max_docs
+        self._vaults = OrderedDict()
+        self._generations = {}
+        self._doc_count = 0
+        self._lock = threading.Lock()
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def get(self, key):
+        """Return the cached {doc_id: data} for a vault, or None if missing/expired."""
+        with self._lock:
+            entry = self._vaults.get(key)
+            if entry is None:
+                return None
+            docs, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                return None
+            self._vaults.move_to_end(key)
+            return docs
+
+    def put(self, key, docs: dict, generation: int):
+        if len(docs) > self.max_docs:
+            return
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return
+            self._drop(key)
+            self._vaults[key] = (docs, time.monotonic() + self.ttl)
+            self._doc_count += len(docs)
+            while len(self._vaults) > self.max_vaults or self._doc_count > self.max_docs:
+                self._drop(next(iter(self._vaults)))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._drop(key)
+
+    def _drop(self, key):
+        entry = self._vaults.pop(key, None)
+        if entry is not None:
+            self._doc_count -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._vaults):
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._drop(key)
+
+    def __len__(self):
+        return len(self._vaults)
+
+
+def _encode_cache_value(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+def _decode_cache_value(obj):
+    if set(obj) == {"$dt"}:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+class RedisVaultCache:
+    """Vault document cache in Redis, shared by every worker process.
+
+    Documents live under a key that includes the vault's generation, so
+    invalidation is a single INCR and stale writers land on a key nobody
+    reads; old generations expire with the TTL. Redis errors count as misses.
+    """
+
+    def __init__(self, url: str, ttl: int = VAULT_CACHE_TTL, max_docs: int = VAULT_CACHE_MAX_VAULT_DOCS, prefix: str = "passager:vault:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.max_docs = max_docs
+        self.prefix = prefix
+
+    def _key(self, key, suffix: str) -> str:
+        return f"{self.prefix}{key[0]}:{key[1]}:{suffix}"
+
+    def generation(self, key):
+        try:
+            return int(self.client.get(self._key(key, "gen")) or 0)
+        except Exception as e:
+            print(f"[!] Vault cache unavailable: {e}")
+            return None
+
+    def get(self, key):
+        generation = self.generation(key)
+        if generation is None:
+            return None
+        try:
+            raw = self.client.get(self._key(key, f"docs:{generation}"))
+            return json.loads(raw, object_hook=_decode_cache_value) if raw else None
+        except Exception as e:
+            print(f"[!] Vault cache unavailable: {e}")
+            return None
+
+    def put(self, key, docs: dict, generation: int):
+        if generation is None or len(docs) > self.max_docs:
+            return
+        try:
+            self.client.set(self._key(key, f"docs:{generation}"), json.dumps(docs, default=_encode_cache_value), ex=self.ttl)
+        except Exception as e:
+            print(f"[!] Vault cache unavailable: {e}")
+
+    def invalidate(self, key):
+        try:
+            pipe = self.client.pipeline()
+            pipe.incr(self._key(key, "gen"))
+            pipe.expire(self._key(key, "gen"), max(self.ttl * 10, 86400))
+            pipe.execute()
+        except Exception as e:
+            # A failed invalidation must not leave a stale vault behind
+            print(f"[!] Failed to invalidate vault cache: {e}")
+            raise e
+
+
+def _create_vault_cache(url: str = VAULT_CACHE_URL):
+    if not url or url.lower() in ("off", "none", "0"):
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisVaultCache(url)
+    return MemoryVaultCache()
+
+vault_cache = _create_vault_cache()
+
+class _CachedDoc:
+    """Stand-in for a DocumentSnapshot rebuilt from cached data."""
+
+    exists = True
+
+    def __init__(self, doc_id: str, data: dict):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+def _cached_vault_docs(user_id: str, vault_id: str):
+    """Cached documents of a vault in ID order, or None on a miss."""
+    if vault_cache is None:
+        return None
+    docs = vault_cache.get((user_id, vault_id))
+    if docs is None:
+        return None
+    return [_CachedDoc(doc_id, data) for doc_id, data in docs.items()]
+
+def _cache_vault_docs(user_id: str, vault_id: str, password_docs, generation):
+    if vault_cache is not None and len(password_docs) <= VAULT_CACHE_MAX_VAULT_DOCS:
+        vault_cache.put((user_id, vault_id), {doc.id: doc.to_dict() for doc in password_docs}, generation)
+
+def _cache_generation(user_id: str, vault_id: str):
+    return vault_cache.generation((user_id, vault_id)) if vault_cache is not None else None
+
+def invalidate_vault_cache(user_id: str, vault_id: str):
+    """Drop a vault's cached documents; every write to a vault's passwords calls this."""
+    if vault_cache is not None:
+        vault_cache.invalidate((user_id, vault_id))
+
+# Vault KDF salts never change once written, so they are safe to cache per process.
+# A cached salt also means the vault exists and keeps a password_count counter.
+_vault_salts = {}
+
+def get_vault_salt(user_id: str, vault_id: str, create: bool = True):
+    """Return the vault's KDF salt, upgrading vaults that predate salts or counters."""
+    cache_key = (user_id, vault_id)
+    if cache_key in _vault_salts:
+        return _vault_salts[cache_key]
+
+    vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+    vault_doc = vault_ref.get()
+    vault_data = (vault_doc.to_dict() or {}) if vault_doc.exists else {}
+
+    if create and vault_doc.exists and "password_count" not in vault_data:
+        count_vault_passwords(user_id, vault_id)
+
+    @firestore.transactional
+    def _ensure_salt(transaction):
+        vault_doc = vault_ref.get(transaction=transaction)
+        if not vault_doc.exists:
+            raise ValueError("Vault not found")
+        salt = (vault_doc.to_dict() or {}).get("kdf_salt")
+        if not salt:
+            salt = generate_salt()
+            transaction.update(vault_ref, {"kdf_salt": salt})
+        return salt
+
+    salt = vault_data.get("kdf_salt")
+    if create and not salt:
+        salt = _ensure_salt(get_db().transaction())
+    if salt and (create or "password_count" in vault_data):
+        _vault_salts[cache_key] = salt
+    return salt
+
+def _get_snapshots(refs, transaction=None):
+    """Fetch several documents in one round trip, returned in the order given."""
+    snapshots = {snap.reference.path: snap for snap in get_db().get_all(refs, transaction=transaction)}
+    return [snapshots[ref.path] for ref in refs]
+
+def _counter_update(vault_doc, delta: int):
+    """Vault update adjusting password_count, if the vault already keeps a counter."""
+    if delta and vault_doc.exists and "password_count" in (vault_doc.to_dict() or {}):
+        return {"password_count": firestore.Increment(delta)}
+    return {}
+
+def _search_ref(user_id: str, vault_id: str, entry_id: str):
+    return get_db().collection("users").document(user_id).collection("search_index").document(index_doc_id(vault_id, entry_id))
+
+def _search_entry(user_id: str, vault_id: str, entry: dict):
+    """Search index document for an entry: blinded tokens only, never field text."""
+    return {
+        "vault_id": vault_id,
+        "entry_id": entry["platform"],
+        "tokens": entry_tokens(user_id, entry),
+        "updated_at": datetime.utcnow()
+    }
 
 def save_password(user_id: str, platform: str, username: str, password: str, master_password: str, vault_id: str = None, url: str = "", notes: str = ""):
     """Encrypt and save a password entry for a user in a specific vault."""
     try:
-        encrypted_pw = encrypt(password, master_password)
-        
         # If no vault_id provided, use default vault
         if not vault_id:
             vault_id = get_or_create_default_vault(user_id)
+
+        encrypted_pw = encrypt(password, master_password, get_vault_salt(user_id, vault_id), entry_aad(vault_id, platform))
             
-        doc_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords").document(platform)
-        
-        # Check if password already exists to preserve created_at
-        existing_doc = doc_ref.get()
-        existing_created_at = None
-        if existing_doc.exists:
-            existing_data = existing_doc.to_dict()
-            existing_created_at = existing_data.get('created_at')
-        
-        doc_ref.set({
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+        doc_ref = vault_ref.collection("passwords").document(platform)
+        now = datetime.utcnow()
+        entry = {
             "platform": platform,
             "username": username,
             "password": encrypted_pw,
             "url": url,
             "notes": notes,
-            "updated_at": datetime.utcnow(),
-            "created_at": existing_created_at or datetime.utcnow()
-        })
-        
-        # Update vault's last updated time
-        vault_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id)
-        vault_ref.update({"updated_at": datetime.utcnow()})
+            "updated_at": now
+        }
+
+        search_ref = _search_ref(user_id, vault_id, platform)
+        search_entry = _search_entry(user_id, vault_id, entry)
+
+        # One commit whether the entry is new or not: the transaction reads the
+        # entry, so the counter only moves for genuinely new entries, and the
+        # search index entry is written with it
+        @firestore.transactional
+        def _save(transaction):
+            if doc_ref.get(transaction=transaction).exists:
+                # Merge-set leaves created_at untouched
+                transaction.set(doc_ref, entry, merge=True)
+                transaction.update(vault_ref, {"updated_at": now})
+            else:
+                transaction.set(doc_ref, dict(entry, created_at=now))
+                transaction.update(vault_ref, {"updated_at": now, "password_count": firestore.Increment(1)})
+            transaction.set(search_ref, search_entry)
+
+        _save(get_db().transaction())
+        invalidate_vault_cache(user_id, vault_id)
         
         print(f"[✓] Password saved for {platform} in vault {vault_id}")
     except Exception as e:
         print(f"[!] Failed to save password: {e}")
         raise e
 
+def save_passwords_bulk(user_id: str, entries, master_password: str, vault_id: str = None, progress=None):
+    """Encrypt and save many password entries, committing up to 500 writes at a time.
+
+    Each entry is a dict with platform, username, password and optional
+    url/notes. progress, if given, is called as progress(saved, total) after
+    every commit. Returns the number of entries saved.
+    """
+    try:
+        if not vault_id:
+            vault_id = get_or_create_default_vault(user_id)
+
+        salt = get_vault_salt(user_id, vault_id)
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+
+        # One write per platform; a later duplicate in the input wins
+        unique_entries = list({entry["platform"]: entry for entry in entries}.values())
+        total = len(unique_entries)
+        saved = 0
+
+        @firestore.transactional
+        def _save_chunk(transaction, chunk):
+            doc_refs = [vault_ref.collection("passwords").document(entry["platform"]) for entry in chunk]
+            existing_docs = _get_snapshots(doc_refs, transaction)
+            now = datetime.utcnow()
+            new_count = 0
+            for doc_ref, existing_doc, entry in zip(doc_refs, existing_docs, chunk):
+                existing_created_at = existing_doc.to_dict().get('created_at') if existing_doc.exists else None
+                new_count += 0 if existing_doc.exists else 1
+                stored = {
+                    "platform": entry["platform"],
+                    "username": entry.get("username", ""),
+                    "password": entry["password"],
+                    "url": entry.get("url", ""),
+                    "notes": entry.get("notes", ""),
+                    "updated_at": now,
+                    "created_at": existing_created_at or now
+                }
+                transaction.set(doc_ref, stored)
+                transaction.set(_search_ref(user_id, vault_id, entry["platform"]), _search_entry(user_id, vault_id, stored))
+            vault_update = {"updated_at": now}
+            if new_count:
+                vault_update["password_count"] = firestore.Increment(new_count)
+            transaction.update(vault_ref, vault_update)
+
+        # Two writes per entry (password and search index), plus the vault document update
+        chunk_size = (MAX_BATCH_WRITES - 1) // 2
+        for start in range(0, total, chunk_size):
+            chunk = unique_entries[start:start + chunk_size]
+            encrypted = encrypt_many([entry["password"] for entry in chunk], master_password, salt,
+                                     aads=[entry_aad(vault_id, entry["platform"]) for entry in chunk])
+            chunk = [dict(entry, password=encrypted_pw) for entry, encrypted_pw in zip(chunk, encrypted)]
+            _save_chunk(get_db().transaction(), chunk)
+            invalidate_vault_cache(user_id, vault_id)
+            saved += len(chunk)
+            if progress:
+                progress(saved, total)
+
+        print(f"[✓] Saved {saved} passwords in vault {vault_id}")
+        return saved
+    except Exception as e:
+        print(f"[!] Failed to bulk save passwords: {e}")
+        raise e
+
 def fetch_passwords(user_id: str, master_password: str):
     """Retrieve and decrypt all passwords for a user."""
     try:
-        docs = db.collection("users").document(user_id).collection("passwords").stream()
+        docs = [doc.to_dict() for doc in get_db().collection("users").document(user_id).collection("passwords").stream()]
+        decrypted = decrypt_many([data.get("password") for data in docs], master_password)
         print("\n[🔐] Saved Passwords:")
         
         passwords = []
-        for doc in docs:
-            data = doc.to_dict()
-            try:
-                decrypted_pw = decrypt(data["password"], master_password)
+        for data, decrypted_pw in zip(docs, decrypted):
+            if decrypted_pw is not None:
                 password_entry = {
                     "platform": data['platform'],
-                    "username": data['username'],
+                    "username": data.get('username', 'N/A'),
                     "password": decrypted_pw,
                     "error": None
                 }
                 passwords.append(password_entry)
                 print(f"- Platform: {data['platform']}")
-                print(f"  Username: {data['username']}")
+                print(f"  Username: {password_entry['username']}")
                 print(f"  Password: {decrypted_pw}")
-            except Exception as decrypt_error:
+            else:
                 password_entry = {
                     "platform": data['platform'],
                     "username": data.get('username', 'N/A'),
@@ -105,7 +429,7 @@ def delete_password(user_id: str, platform: str, vault_id: str = None):
         # If no vault_id provided, try both old and new structure
         if not vault_id:
             # Try old structure first (backwards compatibility)
-            old_doc_ref = db.collection("users").document(user_id).collection("passwords").document(platform)
+            old_doc_ref = get_db().collection("users").document(user_id).collection("passwords").document(platform)
             if old_doc_ref.get().exists:
                 old_doc_ref.delete()
                 print(f"[✓] Deleted password for {platform} (old structure)")
@@ -114,12 +438,22 @@ def delete_password(user_id: str, platform: str, vault_id: str = None):
             # Try default vault
             vault_id = get_or_create_default_vault(user_id)
             
-        doc_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords").document(platform)
-        doc_ref.delete()
-        
-        # Update vault's last updated time
-        vault_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id)
-        vault_ref.update({"updated_at": datetime.utcnow()})
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+        doc_ref = vault_ref.collection("passwords").document(platform)
+
+        @firestore.transactional
+        def _delete(transaction):
+            existing_doc, vault_doc = _get_snapshots([doc_ref, vault_ref], transaction)
+            transaction.delete(doc_ref)
+            transaction.delete(_search_ref(user_id, vault_id, platform))
+
+            # Update vault's last updated time and password count
+            vault_update = {"updated_at": datetime.utcnow()}
+            vault_update.update(_counter_update(vault_doc, -1 if existing_doc.exists else 0))
+            transaction.update(vault_ref, vault_update)
+
+        _delete(get_db().transaction())
+        invalidate_vault_cache(user_id, vault_id)
         
         print(f"[✓] Deleted password for {platform} from vault {vault_id}")
     except Exception as e:
@@ -132,7 +466,10 @@ def get_or_create_default_vault(user_id: str):
     """Get or create a default vault for a user."""
     try:
         vault_id = "default"
-        vault_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id)
+        if (user_id, vault_id) in _vault_salts:
+            return vault_id
+
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
         vault_doc = vault_ref.get()
         
         if not vault_doc.exists:
@@ -141,6 +478,8 @@ def get_or_create_default_vault(user_id: str):
                 "id": vault_id,
                 "name": "My Vault",
                 "description": "Default password vault",
+                "kdf_salt": generate_salt(),
+                "password_count": 0,
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             })
@@ -163,11 +502,13 @@ def create_vault(user_id: str, name: str, description: str = ""):
         if any(v["name"].lower() == name.lower() for v in existing_vaults):
             raise ValueError("A vault with this name already exists")
         
-        vault_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id)
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
         vault_ref.set({
             "id": vault_id,
             "name": name,
             "description": description,
+            "kdf_salt": generate_salt(),
+            "password_count": 0,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow()
         })
@@ -181,18 +522,22 @@ def create_vault(user_id: str, name: str, description: str = ""):
 def get_vaults(user_id: str):
     """Get all vaults for a user."""
     try:
-        vaults_ref = db.collection("users").document(user_id).collection("vaults")
+        vaults_ref = get_db().collection("users").document(user_id).collection("vaults")
         vault_docs = vaults_ref.stream()
         
         vaults = []
         for doc in vault_docs:
             vault_data = doc.to_dict()
+            # Vaults being deleted are hidden until the job finishes
+            if vault_data.get("deletion"):
+                _resume_deletion(user_id, doc.id, vault_data["deletion"])
+                continue
             vault_data["id"] = doc.id
+            vault_data.pop("kdf_salt", None)
             
-            # Count passwords in this vault
-            passwords_ref = db.collection("users").document(user_id).collection("vaults").document(doc.id).collection("passwords")
-            password_count = len(list(passwords_ref.stream()))
-            vault_data["password_count"] = password_count
+            # Vaults created before counters existed fall back to an aggregation once
+            if "password_count" not in vault_data:
+                vault_data["password_count"] = count_vault_passwords(user_id, doc.id)
             
             vaults.append(vault_data)
         
@@ -203,106 +548,796 @@ def get_vaults(user_id: str):
         print(f"[!] Failed to get vaults: {e}")
         raise e
 
-def delete_vault(user_id: str, vault_id: str):
-    """Delete a vault and all its passwords."""
+def count_vault_passwords(user_id: str, vault_id: str):
+    """Count a vault's passwords with a server-side aggregation and store it as its counter."""
+    try:
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+        count = vault_ref.collection("passwords").count().get()[0][0].value
+
+        @firestore.transactional
+        def _store(transaction):
+            vault_doc = vault_ref.get(transaction=transaction)
+            if vault_doc.exists and "password_count" not in vault_doc.to_dict():
+                transaction.update(vault_ref, {"password_count": count})
+
+        _store(get_db().transaction())
+        return count
+    except Exception as e:
+        print(f"[!] Failed to count vault passwords: {e}")
+        raise e
+
+# Concurrent batch commits when deleting a vault's passwords
+DELETE_WORKERS = int(os.getenv("VAULT_DELETE_WORKERS", "4"))
+
+# A deletion with no progress for this long is assumed to have died with its worker
+DELETION_STALE_AFTER = 120
+
+# Vault deletions running in this process, keyed by (user_id, vault_id)
+_deletion_jobs = {}
+_deletion_jobs_lock = threading.Lock()
+
+def _delete_password_batch(vault_ref, refs, keeps_count: bool):
+    """Delete passwords with their search index entries and record the progress in one commit."""
+    user_id = vault_ref.parent.parent.id
+    batch = get_db().batch()
+    for ref in refs:
+        batch.delete(ref)
+        batch.delete(_search_ref(user_id, vault_ref.id, ref.id))
+    updates = {
+        "deletion.deleted": firestore.Increment(len(refs)),
+        "deletion.updated_at": firestore.SERVER_TIMESTAMP
+    }
+    if keeps_count:
+        # Keep the counter in step so an interrupted delete still lists correctly
+        updates["password_count"] = firestore.Increment(-len(refs))
+    batch.update(vault_ref, updates)
+    batch.commit()
+    return len(refs)
+
+def _run_vault_deletion(user_id: str, vault_id: str, progress=None):
+    """Delete a vault's passwords in concurrent batches, then the vault itself.
+
+    Safe to rerun after an interruption: the vault stays marked as deleting
+    until every password is gone, and each batch only touches what is left.
+    """
+    vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+    vault_doc = vault_ref.get()
+    if not vault_doc.exists:
+        return 0
+    vault_data = vault_doc.to_dict() or {}
+    keeps_count = "password_count" in vault_data
+    deleted = vault_data.get("deletion", {}).get("deleted", 0)
+
+    # list_documents only fetches references, so no password data is read
+    password_refs = vault_ref.collection("passwords").list_documents(page_size=MAX_BATCH_WRITES)
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+        futures = []
+        chunk = []
+        for ref in password_refs:
+            chunk.append(ref)
+            # Two deletes per password, and one write left for the vault document update
+            if len(chunk) >= (MAX_BATCH_WRITES - 1) // 2:
+                futures.append(pool.submit(_delete_password_batch, vault_ref, chunk, keeps_count))
+                chunk = []
+        if chunk:
+            futures.append(pool.submit(_delete_password_batch, vault_ref, chunk, keeps_count))
+
+        for future in as_completed(futures):
+            deleted += future.result()
+            if progress:
+                progress(deleted)
+
+    vault_ref.delete()
+    _vault_salts.pop((user_id, vault_id), None)
+    invalidate_vault_cache(user_id, vault_id)
+    return deleted
+
+def _deletion_worker(job: dict):
+    def report(deleted):
+        job["deleted"] = deleted
+
+    try:
+        _run_vault_deletion(job["user_id"], job["vault_id"], report)
+        job["status"] = "completed"
+        print(f"[✓] Deleted vault {job['vault_id']} and {job['deleted']} passwords")
+    except Exception as e:
+        # The vault stays marked as deleting so the job can be resumed
+        job["status"] = "failed"
+        job["error"] = str(e)
+        print(f"[!] Failed to delete vault: {e}")
+    finally:
+        job["finished_at"] = datetime.utcnow()
+
+def _start_deletion_job(user_id: str, vault_id: str, total: int = 0, deleted: int = 0):
+    """Start a background deletion unless one is already running for the vault."""
+    with _deletion_jobs_lock:
+        job = _deletion_jobs.get((user_id, vault_id))
+        if job and job["status"] == "running":
+            return job
+        job = {
+            "vault_id": vault_id,
+            "user_id": user_id,
+            "status": "running",
+            "total": total,
+            "deleted": deleted,
+            "started_at": datetime.utcnow(),
+            "finished_at": None,
+            "error": None
+        }
+        _deletion_jobs[(user_id, vault_id)] = job
+    threading.Thread(target=_deletion_worker, args=(job,), daemon=True).start()
+    return job
+
+def delete_vault(user_id: str, vault_id: str, background: bool = False, progress=None):
+    """Delete a vault and all its passwords.
+
+    With background=True the deletion runs on a worker thread and the job
+    status is returned straight away; poll it with get_vault_deletion_status.
+    Otherwise blocks until done, calling progress(deleted) after each batch.
+    """
     try:
         # Don't allow deleting default vault
         if vault_id == "default":
             raise ValueError("Cannot delete default vault")
-            
-        # Delete all passwords in the vault
-        passwords_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords")
-        password_docs = passwords_ref.stream()
-        for password_doc in password_docs:
-            password_doc.reference.delete()
-        
-        # Delete the vault
-        vault_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id)
-        vault_ref.delete()
-        
-        print(f"[✓] Deleted vault {vault_id} and all its passwords")
+
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+        vault_doc = vault_ref.get()
+        if not vault_doc.exists:
+            raise ValueError("Vault not found")
+        vault_data = vault_doc.to_dict() or {}
+
+        # Mark the vault first: it disappears from listings and can be resumed if interrupted
+        deletion = vault_data.get("deletion")
+        if not deletion:
+            total = vault_data.get("password_count")
+            if total is None:
+                total = vault_ref.collection("passwords").count().get()[0][0].value
+            deletion = {"started_at": datetime.utcnow(), "total": total, "deleted": 0}
+            vault_ref.update({"deletion": dict(deletion, updated_at=firestore.SERVER_TIMESTAMP)})
+
+        if background:
+            return _start_deletion_job(user_id, vault_id, deletion.get("total", 0), deletion.get("deleted", 0))
+
+        deleted = _run_vault_deletion(user_id, vault_id, progress)
+        print(f"[✓] Deleted vault {vault_id} and {deleted} passwords")
+        return {"vault_id": vault_id, "status": "completed", "total": deletion.get("total", 0), "deleted": deleted}
     except Exception as e:
         print(f"[!] Failed to delete vault: {e}")
         raise e
 
-def get_vault_passwords(user_id: str, vault_id: str, master_password: str):
-    """Get all passwords from a specific vault."""
+def get_vault_deletion_status(user_id: str, vault_id: str):
+    """Progress of a vault deletion, or None if the vault was never marked for deletion."""
+    job = _deletion_jobs.get((user_id, vault_id))
+    if job:
+        return dict(job)
+
+    # Not running here: fall back to the progress recorded on the vault
+    vault_doc = get_db().collection("users").document(user_id).collection("vaults").document(vault_id).get()
+    if not vault_doc.exists:
+        return None
+    deletion = (vault_doc.to_dict() or {}).get("deletion")
+    if not deletion:
+        return None
+    return {
+        "vault_id": vault_id,
+        "status": "interrupted" if _deletion_is_stale(deletion) else "running",
+        "total": deletion.get("total", 0),
+        "deleted": deletion.get("deleted", 0),
+        "started_at": deletion.get("started_at")
+    }
+
+def _deletion_is_stale(deletion: dict):
+    updated_at = deletion.get("updated_at")
+    return updated_at is None or time.time() - updated_at.timestamp() > DELETION_STALE_AFTER
+
+def _resume_deletion(user_id: str, vault_id: str, deletion: dict):
+    """Restart an interrupted deletion, leaving ones still progressing in another worker alone."""
+    job = _deletion_jobs.get((user_id, vault_id))
+    if (job and job["status"] == "running") or not _deletion_is_stale(deletion):
+        return job
+    return _start_deletion_job(user_id, vault_id, deletion.get("total", 0), deletion.get("deleted", 0))
+
+def resume_vault_deletions(user_id: str):
+    """Restart deletions of the user's vaults that were interrupted mid-way."""
     try:
-        passwords_ref = db.collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords")
-        password_docs = passwords_ref.stream()
-        
-        passwords = []
-        for doc in password_docs:
+        vaults_ref = get_db().collection("users").document(user_id).collection("vaults")
+        jobs = []
+        for doc in vaults_ref.stream():
+            deletion = (doc.to_dict() or {}).get("deletion")
+            if deletion:
+                job = _resume_deletion(user_id, doc.id, deletion)
+                if job:
+                    jobs.append(job)
+        return jobs
+    except Exception as e:
+        print(f"[!] Failed to resume vault deletions: {e}")
+        raise e
+
+def _metadata_entry(doc):
+    """Listing entry for a password document without decrypting it."""
+    data = doc.to_dict()
+    return {
+        "id": doc.id,
+        "platform": data['platform'],
+        "username": data.get('username', 'N/A'),
+        "url": data.get('url', ''),
+        "created_at": data.get('created_at'),
+        "updated_at": data.get('updated_at')
+    }
+
+# Re-encrypt entries read under an older KDF or format (CBC envelopes, legacy
+# per-entry salts) into the current envelope and DEFAULT_KDF, in the background
+KDF_REHASH_ON_READ = os.getenv("KDF_REHASH_ON_READ", "1") != "0"
+
+_rehash_jobs = set()
+_rehash_lock = threading.Lock()
+
+def _rehash_chunk(vault_ref, updates):
+    """Swap in re-encrypted blobs for (entry ID, old blob, new blob) in one transaction.
+
+    An entry whose blob changed since it was read is left alone.
+    """
+    refs = [vault_ref.collection("passwords").document(entry_id) for entry_id, _, _ in updates]
+
+    @firestore.transactional
+    def _apply(transaction):
+        written = 0
+        for snapshot, (_, old_blob, new_blob) in zip(_get_snapshots(refs, transaction), updates):
+            if snapshot.exists and (snapshot.to_dict() or {}).get("password") == old_blob:
+                transaction.update(snapshot.reference, {"password": new_blob})
+                written += 1
+        return written
+
+    return _apply(get_db().transaction())
+
+def _rehash_entries(user_id: str, vault_id: str, master_password: str, stale):
+    try:
+        salt = get_vault_salt(user_id, vault_id)
+        new_blobs = encrypt_many([plain for _, _, plain in stale], master_password, salt,
+                                 aads=[entry_aad(vault_id, entry_id) for entry_id, _, _ in stale])
+        updates = [(entry_id, old_blob, new_blob) for (entry_id, old_blob, _), new_blob in zip(stale, new_blobs)]
+
+        vault_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id)
+        rehashed = 0
+        for start in range(0, len(updates), MAX_BATCH_WRITES):
+            rehashed += _rehash_chunk(vault_ref, updates[start:start + MAX_BATCH_WRITES])
+        invalidate_vault_cache(user_id, vault_id)
+        print(f"[✓] Re-encrypted {rehashed} passwords in vault {vault_id} with the current KDF")
+    except Exception as e:
+        # Best effort: the entries stay readable and are retried on the next read
+        print(f"[!] Failed to re-encrypt passwords: {e}")
+    finally:
+        with _rehash_lock:
+            _rehash_jobs.discard((user_id, vault_id))
+
+def _start_rehash(user_id: str, vault_id: str, master_password: str, stale):
+    """Re-encrypt stale entries on a daemon thread, one job per vault at a time."""
+    with _rehash_lock:
+        if (user_id, vault_id) in _rehash_jobs:
+            return
+        _rehash_jobs.add((user_id, vault_id))
+    threading.Thread(target=_rehash_entries, args=(user_id, vault_id, master_password, stale), daemon=True).start()
+
+def _decrypt_vault_docs(user_id: str, vault_id: str, password_docs, master_password: str):
+    """Decrypt a list of password documents from one vault into API entries.
+
+    Entries not yet under the current KDF are queued for re-encryption. An
+    unauthenticated (legacy or CBC) entry is only re-encrypted once an
+    AES-GCM entry among the same documents has decrypted, which proves the
+    master password; otherwise garbage from a wrong password could be
+    re-encrypted over the real entry.
+    """
+    salt = get_vault_salt(user_id, vault_id, create=False)
+    blobs = [(doc.to_dict() or {}).get("password") for doc in password_docs]
+    decrypted = decrypt_many(blobs, master_password, salt, aads=[entry_aad(vault_id, doc.id) for doc in password_docs])
+
+    if KDF_REHASH_ON_READ:
+        proven = any(plain is not None and is_authenticated(blob) for blob, plain in zip(blobs, decrypted))
+        stale = [(doc.id, blob, plain) for doc, blob, plain in zip(password_docs, blobs, decrypted)
+                 if plain is not None and needs_rehash(blob) and (proven or is_authenticated(blob))]
+        if stale:
+            _start_rehash(user_id, vault_id, master_password, stale)
+
+    passwords = []
+    for doc, decrypted_pw in zip(password_docs, decrypted):
+        data = doc.to_dict()
+        if decrypted_pw is not None:
+            password_entry = {
+                "id": doc.id,
+                "platform": data['platform'],
+                "username": data.get('username', 'N/A'),
+                "password": decrypted_pw,
+                "url": data.get('url', ''),
+                "notes": data.get('notes', ''),
+                "created_at": data.get('created_at'),
+                "updated_at": data.get('updated_at'),
+                "error": None
+            }
+            passwords.append(password_entry)
+        else:
+            password_entry = {
+                "id": doc.id,
+                "platform": data['platform'],
+                "username": data.get('username', 'N/A'),
+                "password": None,
+                "url": data.get('url', ''),
+                "notes": data.get('notes', ''),
+                "created_at": data.get('created_at'),
+                "updated_at": data.get('updated_at'),
+                "error": "Incorrect master password"
+            }
+            passwords.append(password_entry)
+
+    return passwords
+
+def get_vault_passwords(user_id: str, vault_id: str, master_password: str = None, metadata_only: bool = False):
+    """Get all passwords from a specific vault.
+
+    With metadata_only the entries carry platform, username, url and
+    timestamps only, and nothing is decrypted; use get_password_entry to
+    reveal a single entry.
+    """
+    try:
+        password_docs = _cached_vault_docs(user_id, vault_id)
+        if password_docs is None:
+            generation = _cache_generation(user_id, vault_id)
+            passwords_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords")
+            password_docs = list(passwords_ref.stream())
+            _cache_vault_docs(user_id, vault_id, password_docs, generation)
+        if metadata_only:
+            return [_metadata_entry(doc) for doc in password_docs]
+        return _decrypt_vault_docs(user_id, vault_id, password_docs, master_password)
+    except Exception as e:
+        print(f"[!] Failed to get vault passwords: {e}")
+        raise e
+
+def _encode_cursor(doc_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": doc_id}).encode()).decode()
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_vault_passwords_page(user_id: str, vault_id: str, master_password: str = None, limit: int = DEFAULT_PAGE_SIZE, cursor: str = None, metadata_only: bool = False):
+    """Get one page of passwords from a vault, ordered by entry ID.
+
+    Returns {"passwords": [...], "next_cursor": str or None}; pass next_cursor
+    back in to fetch the following page. Only the page itself is decrypted.
+    """
+    try:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = _decode_cursor(cursor) if cursor else None
+
+        cached_docs = _cached_vault_docs(user_id, vault_id)
+        if cached_docs is not None:
+            # Cached documents are in ID order, the same order as the query below
+            password_docs = [doc for doc in cached_docs if after is None or doc.id > after][:limit + 1]
+        else:
+            generation = _cache_generation(user_id, vault_id)
+            passwords_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords")
+
+            # Fetch one extra document to learn whether another page exists
+            query = passwords_ref.order_by("__name__").limit(limit + 1)
+            if after:
+                query = query.start_after({"__name__": after})
+            password_docs = list(query.stream())
+
+            # A first page that holds the whole vault is the whole vault: keep it
+            if not after and len(password_docs) <= limit:
+                _cache_vault_docs(user_id, vault_id, password_docs, generation)
+
+        has_more = len(password_docs) > limit
+        password_docs = password_docs[:limit]
+        if metadata_only:
+            passwords = [_metadata_entry(doc) for doc in password_docs]
+        else:
+            passwords = _decrypt_vault_docs(user_id, vault_id, password_docs, master_password)
+        return {
+            "passwords": passwords,
+            "next_cursor": _encode_cursor(password_docs[-1].id) if has_more else None
+        }
+    except Exception as e:
+        print(f"[!] Failed to get vault passwords page: {e}")
+        raise e
+
+def iter_vault_passwords(user_id: str, vault_id: str, master_password: str = None, page_size: int = MAX_PAGE_SIZE, metadata_only: bool = False):
+    """Yield a vault's entries page by page, so only one page is held in memory."""
+    cursor = None
+    while True:
+        page = get_vault_passwords_page(user_id, vault_id, master_password, page_size, cursor, metadata_only)
+        yield from page["passwords"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return
+
+def get_password_entry(user_id: str, vault_id: str, platform: str, master_password: str):
+    """Get and decrypt a single password entry, or None if it does not exist.
+
+    Always read from Firestore, never the vault cache: this is the reveal and
+    copy path, and it must not return a password edited or deleted elsewhere.
+    """
+    try:
+        doc = get_db().collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords").document(platform).get()
+        if not doc.exists:
+            return None
+        return _decrypt_vault_docs(user_id, vault_id, [doc], master_password)[0]
+    except Exception as e:
+        print(f"[!] Failed to get password entry: {e}")
+        raise e
+
+# ===== SEARCH =====
+
+SEARCH_RESULT_LIMIT = 50
+
+# Vaults searched at once by search_all_vaults
+SEARCH_WORKERS = int(os.getenv("VAULT_SEARCH_WORKERS", "8"))
+
+# Users whose search index is known to cover entries saved before indexing existed
+_search_indexed_users = set()
+# Users whose index is being built on a background thread in this process
+_search_index_builds = set()
+_search_index_lock = threading.Lock()
+# A build another worker started this recently is left to finish
+SEARCH_INDEX_BUILD_TIMEOUT = 900  # seconds
+
+
+class SearchIndexBuilding(Exception):
+    """The user's search index is still being built; retry shortly."""
+
+def rebuild_search_index(user_id: str):
+    """(Re)index every entry in the user's vaults; works from stored fields, nothing is decrypted."""
+    try:
+        user_ref = get_db().collection("users").document(user_id)
+        indexed = 0
+        for vault_doc in user_ref.collection("vaults").stream():
+            if (vault_doc.to_dict() or {}).get("deletion"):
+                continue
+            passwords_ref = vault_doc.reference.collection("passwords")
+            after = None
+            while True:
+                query = passwords_ref.order_by("__name__").limit(MAX_BATCH_WRITES)
+                if after:
+                    query = query.start_after({"__name__": after})
+                docs = query.get()
+                if not docs:
+                    break
+                batch = get_db().batch()
+                for doc in docs:
+                    batch.set(_search_ref(user_id, vault_doc.id, doc.id),
+                              _search_entry(user_id, vault_doc.id, dict(doc.to_dict(), platform=doc.id)))
+                batch.commit()
+                indexed += len(docs)
+                after = docs[-1].id
+
+        user_ref.set({"search_index": {"built_at": datetime.utcnow(), "entries": indexed}}, merge=True)
+        _search_indexed_users.add(user_id)
+        print(f"[✓] Indexed {indexed} passwords for search for user {user_id}")
+        return indexed
+    except Exception as e:
+        print(f"[!] Failed to rebuild search index: {e}")
+        raise e
+
+def rebuild_all_search_indexes():
+    """Build every user's search index; for migrate.py, ahead of the first searches."""
+    summary = {"users": 0, "entries": 0, "failed": []}
+    for user_ref in get_db().collection("users").list_documents():
+        try:
+            summary["entries"] += rebuild_search_index(user_ref.id)
+            summary["users"] += 1
+        except Exception as e:
+            summary["failed"].append({"user_id": user_ref.id, "error": str(e)})
+    return summary
+
+def _build_search_index(user_id: str):
+    try:
+        rebuild_search_index(user_id)
+    except Exception:
+        # Already logged; clear the marker so the next search starts a new build
+        try:
+            get_db().collection("users").document(user_id).set({"search_index": {"started_at": None}}, merge=True)
+        except Exception:
+            pass
+    finally:
+        with _search_index_lock:
+            _search_index_builds.discard(user_id)
+
+def search_index_ready(user_id: str) -> bool:
+    """True once the user's search index covers every entry.
+
+    Otherwise a build is started on a daemon thread (unless one is already
+    running) and False is returned. The build never runs inside a request.
+    """
+    if user_id in _search_indexed_users:
+        return True
+    user_ref = get_db().collection("users").document(user_id)
+    user_doc = user_ref.get()
+    state = ((user_doc.to_dict() or {}).get("search_index") or {}) if user_doc.exists else {}
+    if state.get("built_at"):
+        _search_indexed_users.add(user_id)
+        return True
+
+    started_at = state.get("started_at")
+    if started_at and time.time() - started_at.timestamp() < SEARCH_INDEX_BUILD_TIMEOUT:
+        return False  # Another worker is building it
+    with _search_index_lock:
+        if user_id in _search_index_builds:
+            return False
+        _search_index_builds.add(user_id)
+    user_ref.set({"search_index": {"started_at": datetime.utcnow()}}, merge=True)
+    threading.Thread(target=_build_search_index, args=(user_id,), daemon=True).start()
+    return False
+
+def _ensure_search_index(user_id: str):
+    if not search_index_ready(user_id):
+        raise SearchIndexBuilding("Search index is being built")
+
+def search_passwords(user_id: str, query: str, vault_id: str = None, limit: int = SEARCH_RESULT_LIMIT):
+    """Find entries whose platform, username, URL or notes match query, across all vaults.
+
+    The query is blinded the same way as the index, so matching never needs
+    field text; only the matching entries' metadata is read and nothing is
+    decrypted. Each result is a metadata entry with its vault_id. Raises
+    SearchIndexBuilding while the user's index is first being built.
+    """
+    try:
+        tokens = blind(user_id, query_tokens(query))
+        if not tokens:
+            return []
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        _ensure_search_index(user_id)
+
+        # Firestore allows one array-contains per query: narrow with the most
+        # selective token, then require the rest here
+        candidates = get_db().collection("users").document(user_id).collection("search_index") \
+            .where("tokens", "array_contains", tokens[0])
+        if vault_id:
+            # Served by the (vault_id, tokens) composite index in firestore.indexes.json
+            candidates = candidates.where("vault_id", "==", vault_id)
+        required = set(tokens[1:])
+        matches = []
+        for doc in candidates.stream():
             data = doc.to_dict()
+            if required.issubset(data.get("tokens", [])):
+                matches.append((data["vault_id"], data["entry_id"]))
+                if len(matches) >= limit:
+                    break
+
+        users_ref = get_db().collection("users").document(user_id)
+        refs = [users_ref.collection("vaults").document(v).collection("passwords").document(e) for v, e in matches]
+        results = []
+        for (match_vault_id, _), doc in zip(matches, _get_snapshots(refs) if refs else []):
+            # An index entry can briefly outlive its password during a vault deletion
+            if doc.exists:
+                results.append(dict(_metadata_entry(doc), vault_id=match_vault_id))
+        return results
+    except SearchIndexBuilding:
+        raise
+    except Exception as e:
+        print(f"[!] Failed to search passwords: {e}")
+        raise e
+
+def search_all_vaults(user_id: str, query: str, limit: int = SEARCH_RESULT_LIMIT, max_workers: int = SEARCH_WORKERS):
+    """Search every vault of a user concurrently, yielding results as each vault answers.
+
+    Yields one dict per vault: {"vault_id", "vault_name", "results"}, with
+    "error" instead of results if that vault's search failed. Results are
+    metadata entries carrying their vault and a rank (see search_index.rank),
+    sorted best first; nothing is decrypted. At most max_workers vault
+    queries run at a time, and up to limit results come from each vault.
+    """
+    if not query_tokens(query):
+        return
+    # Once up front, so the workers do not all try to build a missing index
+    _ensure_search_index(user_id)
+    vaults = get_vaults(user_id)
+    if not vaults:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(vaults))))
+    try:
+        futures = {pool.submit(search_passwords, user_id, query, vault["id"], limit): vault for vault in vaults}
+        for future in as_completed(futures):
+            vault = futures[future]
+            chunk = {"vault_id": vault["id"], "vault_name": vault.get("name", "")}
             try:
-                decrypted_pw = decrypt(data["password"], master_password)
-                password_entry = {
-                    "id": doc.id,
-                    "platform": data['platform'],
-                    "username": data['username'],
-                    "password": decrypted_pw,
-                    "url": data.get('url', ''),
-                    "notes": data.get('notes', ''),
-                    "created_at": data.get('created_at'),
-                    "updated_at": data.get('updated_at'),
-                    "error": None
-                }
-                passwords.append(password_entry)
-            except Exception as decrypt_error:
-                password_entry = {
-                    "id": doc.id,
-                    "platform": data['platform'],
-                    "username": data.get('username', 'N/A'),
-                    "password": None,
-                    "url": data.get('url', ''),
-                    "notes": data.get('notes', ''),
-                    "created_at": data.get('created_at'),
-                    "updated_at": data.get('updated_at'),
-                    "error": "Incorrect master password"
-                }
-                passwords.append(password_entry)
-        
-        return passwords
+                results = future.result()
+            except Exception as e:
+                chunk["error"] = str(e)
+                yield chunk
+                continue
+            for entry in results:
+                entry["vault_name"] = chunk["vault_name"]
+                entry["rank"] = search_rank(entry, query)
+            results.sort(key=lambda entry: (entry["rank"], entry["platform"]))
+            chunk["results"] = results
+            yield chunk
+    finally:
+        # A caller that stops early (a closed stream) leaves nothing queued behind it
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def watch_vault_passwords(user_id: str, vault_id: str, master_password: str, on_change, on_error=None):
+    """Listen for changes to a vault's passwords instead of polling it.
+
+    on_change(added, modified, removed) is called from Firestore's listener
+    thread with decrypted entries for added and modified documents and the
+    IDs of removed ones; only changed documents are decrypted, and nothing
+    is when master_password is None (metadata entries are passed instead).
+    The first call delivers the whole vault as added; views that page rows
+    in themselves apply what falls in their loaded range and page the rest.
+    Failures while handling a change go to on_error(exception). Returns the
+    watch; call unsubscribe() on it to stop listening.
+    """
+    try:
+        passwords_ref = get_db().collection("users").document(user_id).collection("vaults").document(vault_id).collection("passwords")
+        state = {"initial": True}
+
+        def _entries(docs):
+            if not docs:
+                return []
+            if master_password is None:
+                return [_metadata_entry(doc) for doc in docs]
+            return _decrypt_vault_docs(user_id, vault_id, docs, master_password)
+
+        def _on_snapshot(docs, changes, read_time):
+            try:
+                changed = {"ADDED": [], "MODIFIED": [], "REMOVED": []}
+                for change in changes:
+                    changed[change.type.name].append(change.document)
+
+                # Changes made elsewhere also make this process's cached copy stale
+                if not state["initial"]:
+                    invalidate_vault_cache(user_id, vault_id)
+                state["initial"] = False
+
+                on_change(_entries(changed["ADDED"]), _entries(changed["MODIFIED"]), [doc.id for doc in changed["REMOVED"]])
+            except Exception as e:
+                print(f"[!] Failed to apply vault changes: {e}")
+                if on_error:
+                    on_error(e)
+
+        return passwords_ref.on_snapshot(_on_snapshot)
     except Exception as e:
-        print(f"[!] Failed to get vault passwords: {e}")
+        print(f"[!] Failed to watch vault passwords: {e}")
         raise e
 
-def migrate_existing_passwords(user_id: str):
-    """Migrate existing passwords from old structure to default vault."""
+# Legacy documents moved per commit: a set, a search index set and a delete each,
+# plus the vault and checkpoint updates
+MIGRATION_PAGE_SIZE = (MAX_BATCH_WRITES - 2) // 3
+
+# Users whose legacy collection was found empty, so the check is skipped for them
+_migrated_users = set()
+
+def _legacy_page(old_passwords_ref, after: str = None, page_size: int = MIGRATION_PAGE_SIZE):
+    query = old_passwords_ref.order_by("__name__")
+    if after:
+        query = query.start_after({"__name__": after})
+    return query.limit(page_size).get()
+
+def migrate_existing_passwords(user_id: str, dry_run: bool = False, page_size: int = MIGRATION_PAGE_SIZE):
+    """Migrate existing passwords from old structure to default vault.
+
+    Legacy documents are read a page at a time and each page is copied and
+    deleted in one transaction, together with a checkpoint on the user
+    document, so an interrupted run loses nothing and a rerun continues
+    after the last committed page. Entries already present in the vault are
+    kept and only the legacy copy is removed. With dry_run nothing is
+    written. Returns the number of passwords migrated (or found).
+    """
     try:
+        if user_id in _migrated_users:
+            return 0
+        page_size = min(page_size, MIGRATION_PAGE_SIZE)
+
+        user_ref = get_db().collection("users").document(user_id)
+        old_passwords_ref = user_ref.collection("passwords")
+        started = time.perf_counter()
+
         # Check if user has passwords in old structure
-        old_passwords_ref = db.collection("users").document(user_id).collection("passwords")
-        old_password_docs = list(old_passwords_ref.stream())
-        
-        if not old_password_docs:
-            print(f"[i] No old passwords to migrate for user {user_id}")
-            return
-            
+        first_page = _legacy_page(old_passwords_ref, page_size=page_size)
+        if not first_page:
+            _migrated_users.add(user_id)
+            return 0
+
+        if dry_run:
+            found, pages, page = 0, 0, first_page
+            while page:
+                found += len(page)
+                pages += 1
+                page = _legacy_page(old_passwords_ref, page[-1].id, page_size) if len(page) == page_size else []
+            print(f"[i] Dry run: {found} passwords in {pages} pages to migrate for user {user_id} "
+                  f"(scanned in {time.perf_counter() - started:.2f}s)")
+            return found
+
         # Get or create default vault
         default_vault_id = get_or_create_default_vault(user_id)
-        
+        vault_ref = user_ref.collection("vaults").document(default_vault_id)
+
+        # Continue after the last committed page of an interrupted run
+        user_doc = user_ref.get()
+        checkpoint = ((user_doc.to_dict() or {}).get("migration") or {}) if user_doc.exists else {}
+        migrated_count = checkpoint.get("migrated", 0) if not checkpoint.get("completed_at") else 0
+        page = first_page
+        if checkpoint.get("last_id") and not checkpoint.get("completed_at"):
+            page = _legacy_page(old_passwords_ref, checkpoint["last_id"], page_size) or first_page
+
+        @firestore.transactional
+        def _migrate_page(transaction, old_docs, migrated_before):
+            new_refs = [vault_ref.collection("passwords").document(doc.id) for doc in old_docs]
+            snapshots = _get_snapshots(new_refs + [vault_ref], transaction)
+            existing_docs, vault_doc = snapshots[:-1], snapshots[-1]
+            new_count = 0
+            for old_doc, new_ref, existing_doc in zip(old_docs, new_refs, existing_docs):
+                if not existing_doc.exists:
+                    password_data = old_doc.to_dict()
+                    # Add missing fields for new structure
+                    password_data.update({
+                        "url": password_data.get("url", ""),
+                        "notes": password_data.get("notes", ""),
+                        "created_at": password_data.get("created_at", datetime.utcnow())
+                    })
+                    transaction.set(new_ref, password_data)
+                    transaction.set(_search_ref(user_id, default_vault_id, old_doc.id),
+                                    _search_entry(user_id, default_vault_id, dict(password_data, platform=old_doc.id)))
+                    new_count += 1
+                transaction.delete(old_doc.reference)
+            vault_update = _counter_update(vault_doc, new_count)
+            if vault_update:
+                transaction.update(vault_ref, vault_update)
+            transaction.set(user_ref, {"migration": {
+                "last_id": old_docs[-1].id,
+                "migrated": migrated_before + len(old_docs),
+                "updated_at": datetime.utcnow(),
+                "completed_at": None
+            }}, merge=True)
+
         # Move passwords to default vault
-        migrated_count = 0
-        for doc in old_password_docs:
-            password_data = doc.to_dict()
-            
-            # Add missing fields for new structure
-            password_data.update({
-                "url": password_data.get("url", ""),
-                "notes": password_data.get("notes", ""),
-                "created_at": password_data.get("created_at", datetime.utcnow())
-            })
-            
-            # Create in new structure
-            new_doc_ref = db.collection("users").document(user_id).collection("vaults").document(default_vault_id).collection("passwords").document(doc.id)
-            new_doc_ref.set(password_data)
-            
-            # Delete from old structure
-            doc.reference.delete()
-            migrated_count += 1
-        
-        print(f"[✓] Migrated {migrated_count} passwords to default vault for user {user_id}")
+        while page:
+            _migrate_page(get_db().transaction(), page, migrated_count)
+            invalidate_vault_cache(user_id, default_vault_id)
+            migrated_count += len(page)
+            page = _legacy_page(old_passwords_ref, page[-1].id, page_size) if len(page) == page_size else []
+
+        user_ref.set({"migration": {"completed_at": datetime.utcnow()}}, merge=True)
+        _migrated_users.add(user_id)
+
+        print(f"[✓] Migrated {migrated_count} passwords to default vault for user {user_id} "
+              f"in {time.perf_counter() - started:.2f}s")
         return migrated_count
     except Exception as e:
         print(f"[!] Failed to migrate passwords: {e}")
         raise e
+
+def migrate_all_users(max_workers: int = 4, dry_run: bool = False, page_size: int = MIGRATION_PAGE_SIZE):
+    """Run the legacy migration for every user, at most max_workers at a time.
+
+    Failures are collected rather than stopping the run; rerunning picks up
+    from each user's checkpoint. Returns a summary with counts and timing.
+    """
+    started = time.perf_counter()
+    summary = {"users": 0, "migrated": 0, "failed": {}, "dry_run": dry_run}
+
+    def _collect(done):
+        for future in done:
+            user_id = pending.pop(future)
+            summary["users"] += 1
+            try:
+                summary["migrated"] += future.result()
+            except Exception as e:
+                summary["failed"][user_id] = str(e)
+
+    # Bound the in-flight futures too, so the user listing is consumed lazily
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for user_ref in get_db().collection("users").list_documents():
+            if len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                _collect(done)
+            pending[pool.submit(migrate_existing_passwords, user_ref.id, dry_run, page_size)] = user_ref.id
+        _collect(list(pending))
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    print(f"[✓] {'Dry run over' if dry_run else 'Migrated'} {summary['users']} users: "
+          f"{summary['migrated']} passwords, {len(summary['failed'])} failed, {summary['seconds']}s")
+    return summary
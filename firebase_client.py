@@ -0,0 +1,97 @@
+# firebase_client.py
+import importlib
+import os
+import threading
+
+# One lazily initialised Firebase app and Firestore client per process.
+# Importing firebase_admin and google.cloud.firestore costs most of a second,
+# so nothing is imported or read until the first call that needs Firebase.
+# CLI starts, imports in tests and tools that never touch Firestore stay fast
+# and work without credentials.
+#
+# gRPC channels do not survive fork: a client created before a fork is
+# dropped and rebuilt in the child. gunicorn.conf.py calls warm_up() in
+# post_fork so a worker's first request does not pay for it.
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "firebase_config.json")
+
+_app = None
+_db = None
+_pid = None
+_lock = threading.Lock()
+
+
+class _LazyModule:
+    """Imports a Firebase module on first attribute access, with the app initialised."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        get_app()
+        return getattr(importlib.import_module(self._name), attr)
+
+
+# Drop-in stand-ins for `from firebase_admin import auth, firestore`
+auth = _LazyModule("firebase_admin.auth")
+firestore = _LazyModule("firebase_admin.firestore")
+
+
+def _credential():
+    from firebase_admin import credentials
+
+    if os.getenv("FIRESTORE_EMULATOR_HOST") and not os.path.exists(FIREBASE_CREDENTIALS):
+        from google.auth.credentials import AnonymousCredentials
+
+        class EmulatorCredential(credentials.Base):
+            """The emulator accepts anonymous requests."""
+
+            def get_credential(self):
+                return AnonymousCredentials()
+
+        return EmulatorCredential(), {"projectId": os.getenv("GCLOUD_PROJECT", "passager-local")}
+    return credentials.Certificate(FIREBASE_CREDENTIALS), None
+
+
+def get_app():
+    """The default Firebase app, initialised on first use."""
+    global _app, _db, _pid
+    if _app is not None and _pid == os.getpid():
+        return _app
+    with _lock:
+        if _app is None or _pid != os.getpid():
+            import firebase_admin
+
+            if _pid is not None and _pid != os.getpid() and firebase_admin._apps:
+                # Forked after initialisation: start over with fresh channels
+                firebase_admin.delete_app(firebase_admin.get_app())
+                _db = None
+            if firebase_admin._apps:
+                _app = firebase_admin.get_app()
+            else:
+                try:
+                    cred, options = _credential()
+                    _app = firebase_admin.initialize_app(cred, options)
+                except Exception as e:
+                    print(f"[!] Failed to initialize Firebase: {e}")
+                    raise e
+            _pid = os.getpid()
+    return _app
+
+
+def get_db():
+    """The process's Firestore client, created on first use."""
+    global _db
+    app = get_app()
+    if _db is None:
+        with _lock:
+            if _db is None:
+                from firebase_admin import firestore as admin_firestore
+                _db = admin_firestore.client(app)
+    return _db
+
+
+def warm_up():
+    """Initialise the app and client and import the auth module ahead of the first request."""
+    get_db()
+    importlib.import_module("firebase_admin.auth")
+    print(f"[✓] Firebase client ready in process {os.getpid()}")
@@ -0,0 +1,125 @@
+# gui_workers.py
+import itertools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task's progress callback once the task has been superseded or cancelled."""
+
+
+class _WorkerSignals(QObject):
+    # Every signal carries (key, token) so the runner can drop stale deliveries
+    result = pyqtSignal(str, int, object)
+    error = pyqtSignal(str, int, object)
+    progress = pyqtSignal(str, int, object)
+    finished = pyqtSignal(str, int)
+
+
+class _Worker(QRunnable):
+    def __init__(self, key: str, token: int, fn, args, kwargs, with_progress: bool):
+        super().__init__()
+        self.key = key
+        self.token = token
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.with_progress = with_progress
+        self.cancelled = False
+        self.signals = _WorkerSignals()
+
+    def report(self, *values):
+        # Long tasks call this between steps, which is where cancellation takes effect
+        if self.cancelled:
+            raise TaskCancelled()
+        self.signals.progress.emit(self.key, self.token, values)
+
+    def run(self):
+        try:
+            if self.with_progress:
+                self.kwargs["progress"] = self.report
+            result = self.fn(*self.args, **self.kwargs)
+            if not self.cancelled:
+                self.signals.result.emit(self.key, self.token, result)
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.error.emit(self.key, self.token, e)
+        finally:
+            self.signals.finished.emit(self.key, self.token)
+
+
+class TaskRunner(QObject):
+    """Runs blocking Firestore, crypto and HTTP calls on a QThreadPool.
+
+    Tasks are named by key. Starting a task under a key that is still
+    running cancels the older one: its results are dropped and its progress
+    callback raises TaskCancelled, so only the newest request ever reaches
+    the UI. Callbacks run on the GUI thread.
+    """
+
+    def __init__(self, parent=None, pool: QThreadPool = None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._tokens = itertools.count(1)
+        self._tasks = {}
+
+    def run(self, key: str, fn, *args, on_result=None, on_error=None, on_progress=None, on_finished=None, **kwargs):
+        """Start fn(*args, **kwargs) in the pool; on_progress also passes it a progress= callback."""
+        self.cancel(key)
+        worker = _Worker(key, next(self._tokens), fn, args, kwargs, with_progress=on_progress is not None)
+        worker.signals.result.connect(self._on_result)
+        worker.signals.error.connect(self._on_error)
+        worker.signals.progress.connect(self._on_progress)
+        worker.signals.finished.connect(self._on_finished)
+        self._tasks[key] = (worker, {
+            "result": on_result, "error": on_error, "progress": on_progress, "finished": on_finished
+        })
+        self.pool.start(worker)
+        return worker.token
+
+    def cancel(self, key: str):
+        task = self._tasks.pop(key, None)
+        if task:
+            task[0].cancelled = True
+
+    def cancel_all(self):
+        for key in list(self._tasks):
+            self.cancel(key)
+
+    def is_running(self, key: str) -> bool:
+        return key in self._tasks
+
+    def _callback(self, key: str, token: int, name: str):
+        task = self._tasks.get(key)
+        if not task or task[0].token != token:
+            return None
+        return task[1][name]
+
+    @pyqtSlot(str, int, object)
+    def _on_result(self, key, token, result):
+        callback = self._callback(key, token, "result")
+        if callback:
+            callback(result)
+
+    @pyqtSlot(str, int, object)
+    def _on_error(self, key, token, error):
+        callback = self._callback(key, token, "error")
+        if callback:
+            callback(error)
+
+    @pyqtSlot(str, int, object)
+    def _on_progress(self, key, token, values):
+        callback = self._callback(key, token, "progress")
+        if callback:
+            callback(*values)
+
+    @pyqtSlot(str, int)
+    def _on_finished(self, key, token):
+        task = self._tasks.get(key)
+        if not task or task[0].token != token:
+            return
+        del self._tasks[key]
+        if task[1]["finished"]:
+            task[1]["finished"]()
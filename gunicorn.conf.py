@@ -0,0 +1,31 @@
+# gunicorn.conf.py
+import os
+
+# gunicorn app:app
+#
+# The app is loaded once in the master and forked into the workers, so
+# imports are paid once. Firebase is not initialised at import
+# (firebase_client.py); each worker builds its own client in post_fork,
+# before it accepts requests, because gRPC channels do not survive fork.
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5051")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = 60
+preload_app = True
+
+# A memory vault cache is per worker: a write in one worker would leave the
+# others serving the old vault until the TTL ran out. Share it through Redis
+# or not at all.
+if workers > 1 and os.getenv("VAULT_CACHE_URL", "off").lower() == "memory":
+    print("[!] VAULT_CACHE_URL=memory is per process; disabled for multiple workers (use redis://)")
+    os.environ["VAULT_CACHE_URL"] = "off"
+
+
+def post_fork(server, worker):
+    import firebase_client
+
+    try:
+        firebase_client.warm_up()
+    except Exception as e:
+        # The worker still serves; the client is retried on first use
+        server.log.warning(f"[!] Firebase warm-up failed in worker {worker.pid}: {e}")
@@ -0,0 +1,133 @@
+# http_client.py
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One pooled session per process for outbound REST calls (Firebase auth,
+# token refresh), so repeated calls reuse kept-alive TLS connections instead
+# of paying a new handshake each time.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # connections kept per host
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.2"))  # seconds, doubled per retry
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+
+# Transient statuses worth retrying; a request that reached the server and
+# failed on the credentials (400) is never retried. Only idempotent methods
+# are retried after the server saw the request: repeating a sign-up or a
+# failed sign-in could create a duplicate or count against the lockout.
+# A connection that could not be opened is retried for any method, since the
+# server never saw the request.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+LATENCY_SAMPLES = 1000
+
+
+class _Stats:
+    """Request counts and recent latencies, shared by every thread."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self._latencies = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            self._latencies.append(elapsed)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def latency_ms(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {}
+        pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 2)
+        return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(samples[-1] * 1000, 2)}
+
+
+stats = _Stats()
+
+
+class _CountingRetry(Retry):
+    """Retry policy that records each retry it allows."""
+
+    def increment(self, *args, **kwargs):
+        retry = super().increment(*args, **kwargs)
+        stats.record_retry()
+        return retry
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a default timeout and latency accounting."""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = super().request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            stats.record(time.perf_counter() - started, ok)
+
+
+def create_session(pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF,
+                   retry_methods=IDEMPOTENT_METHODS) -> PooledSession:
+    retry = _CountingRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(retry_methods),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+    session = PooledSession()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+session = create_session()
+# Exchanging a refresh token can be repeated safely, so its POSTs are retried too
+refresh_session = create_session(retry_methods=IDEMPOTENT_METHODS | {"POST"})
+
+
+def pool_stats() -> dict:
+    """Connection reuse, retry and latency figures for /api/health."""
+    opened = 0
+    served = 0
+    for adapter in set(session.adapters.values()) | set(refresh_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        # keys() is a snapshot; a pool evicted meanwhile is skipped
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                served += pool.num_requests
+    return {
+        "requests": stats.requests,
+        "errors": stats.errors,
+        "retries": stats.retries,
+        "connections_opened": opened,
+        # Every request that did not need a fresh connection was served by the pool
+        "pool_hits": max(0, served - opened),
+        "latency_ms": stats.latency_ms(),
+    }
@@ -0,0 +1,224 @@
+# importer.py
+import csv
+import io
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+from db import save_passwords_bulk, MAX_BATCH_WRITES
+
+# Column names used by common password managers (Chrome, Firefox, Bitwarden,
+# LastPass, 1Password, KeePass) mapped onto our entry fields.
+FIELD_ALIASES = {
+    "platform": ("platform", "name", "title", "service", "account"),
+    "username": ("username", "login_username", "user", "login", "email", "user name"),
+    "password": ("password", "login_password", "pass"),
+    "url": ("url", "login_uri", "uri", "website", "web site", "origin", "hostname"),
+    "notes": ("notes", "note", "extra", "comments", "comment"),
+}
+
+# Entries per commit: two writes each (password and search index entry),
+# and one left for the vault document update
+IMPORT_CHUNK_SIZE = (MAX_BATCH_WRITES - 1) // 2
+
+JSON_READ_SIZE = 64 * 1024
+
+# Firestore rejects these as document IDs, and a record carrying one would
+# fail its whole import batch
+RESERVED_PLATFORM = re.compile(r"\.|\.\.|__.*__", re.DOTALL)
+MAX_PLATFORM_BYTES = 1500
+
+
+def _platform_from_url(url: str) -> str:
+    host = urlparse(url if "://" in url else f"https://{url}").hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_entry(record: dict):
+    """Map one exported record onto our entry fields.
+
+    Returns None for records that are not objects, have no password or have
+    no platform usable as a Firestore document ID.
+    """
+    if not isinstance(record, dict):
+        return None
+    # Bitwarden JSON nests credentials under "login"
+    login = record.get("login")
+    if isinstance(login, dict):
+        uris = login.get("uris") or []
+        record = {k: v for k, v in record.items() if k != "login"}
+        record.update(username=login.get("username"), password=login.get("password"),
+                      url=uris[0].get("uri") if uris and isinstance(uris[0], dict) else None)
+
+    lowered = {str(k).strip().lower(): v for k, v in record.items() if k is not None}
+    entry = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = next((lowered[a] for a in aliases if lowered.get(a)), "")
+        entry[field] = str(value).strip() if value is not None else ""
+
+    if not entry["password"]:
+        return None
+    platform = entry["platform"] or _platform_from_url(entry["url"])
+    if not platform:
+        return None
+    # Platform is the Firestore document ID, which may not contain slashes
+    platform = platform.lower().replace("/", "_")
+    if RESERVED_PLATFORM.fullmatch(platform) or len(platform.encode()) > MAX_PLATFORM_BYTES:
+        return None
+    entry["platform"] = platform
+    return entry
+
+
+def iter_csv_records(stream):
+    """Yield one dict per CSV row without loading the file into memory."""
+    yield from csv.DictReader(stream)
+
+
+class _JsonStreamReader:
+    """Minimal incremental reader that decodes one JSON value at a time from a text stream."""
+
+    def __init__(self, stream, read_size: int = JSON_READ_SIZE):
+        self.stream = stream
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.stream.read(self.read_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self, skip: str = " \t\r\n"):
+        """Skip the given characters and return the next one, or "" at end of stream."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self.fill()
+
+    def seek_to(self, text: str) -> bool:
+        """Advance past the next occurrence of text."""
+        while True:
+            index = self.buffer.find(text, self.pos)
+            if index != -1:
+                self.pos = index + len(text)
+                return True
+            if self.eof:
+                return False
+            # Keep a tail in case the text straddles two reads
+            self.pos = max(self.pos, len(self.buffer) - len(text))
+            self.fill()
+
+    def decode(self):
+        while True:
+            try:
+                value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("Malformed JSON import file")
+                self.fill()
+
+
+def iter_json_records(stream, lines: bool = False, read_size: int = JSON_READ_SIZE):
+    """Yield records from a JSON export incrementally.
+
+    Accepts a top-level array or an object with an "items" array (Bitwarden),
+    or JSON Lines when lines is True. Only one record at a time is held
+    decoded in memory. Records are yielded whatever their type, so callers
+    can count the ones they skip. Raises ValueError if the array is not
+    closed, as in a truncated file.
+    """
+    reader = _JsonStreamReader(stream, read_size)
+    if not lines:
+        first = reader.peek()
+        if first == "[":
+            reader.pos += 1
+        elif not (first == "{" and reader.seek_to('"items"') and reader.seek_to("[")):
+            raise ValueError("Unsupported JSON export: expected a list of entries")
+
+    separators = " \t\r\n" if lines else " \t\r\n,"
+    while True:
+        next_char = reader.peek(separators)
+        if not lines and not next_char:
+            raise ValueError("Malformed JSON import file: the list of entries is not closed")
+        if not next_char or (not lines and next_char == "]"):
+            return
+        yield reader.decode()
+
+
+def iter_import_entries(stream, fmt: str):
+    """Yield normalized entries (None for skipped records) from a text stream in "csv", "json" or "jsonl" format."""
+    if fmt == "csv":
+        records = iter_csv_records(stream)
+    else:
+        records = iter_json_records(stream, lines=(fmt == "jsonl"))
+    for record in records:
+        yield normalize_entry(record)
+
+
+def detect_format(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext == ".json":
+        return "json"
+    if ext == ".jsonl":
+        return "jsonl"
+    raise ValueError("Unsupported import format. Use a .csv or .json file.")
+
+
+def import_entries(user_id: str, entries, master_password: str, vault_id: str = None, progress=None):
+    """Save a stream of normalized entries (None marks a skipped record) in batched commits.
+
+    progress, if given, is called as progress(imported, skipped) after every
+    commit. Returns {"imported": n, "skipped": m}.
+    """
+    imported = 0
+    skipped = 0
+    chunk = []
+
+    def flush():
+        nonlocal imported, chunk
+        if chunk:
+            imported += save_passwords_bulk(user_id, chunk, master_password, vault_id)
+            chunk = []
+            if progress:
+                progress(imported, skipped)
+
+    for entry in entries:
+        if entry is None:
+            skipped += 1
+            continue
+        chunk.append(entry)
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush()
+    flush()
+
+    print(f"[✓] Imported {imported} passwords ({skipped} skipped)")
+    return {"imported": imported, "skipped": skipped}
+
+
+def import_stream(user_id: str, stream, fmt: str, master_password: str, vault_id: str = None, progress=None):
+    """Import from an open binary or text stream in "csv", "json" or "jsonl" format."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return import_entries(user_id, iter_import_entries(stream, fmt), master_password, vault_id, progress)
+
+
+def import_file(user_id: str, path: str, master_password: str, vault_id: str = None, progress=None):
+    """Import a CSV or JSON export file from disk."""
+    try:
+        fmt = detect_format(path)
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return import_stream(user_id, f, fmt, master_password, vault_id, progress)
+    except Exception as e:
+        print(f"[!] Failed to import passwords: {e}")
+        raise e
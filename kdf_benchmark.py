@@ -0,0 +1,25 @@
+# kdf_benchmark.py
+import argparse
+
+from crypto_utils import calibrate_kdf, benchmark_kdf, DEFAULT_KDF, KDF_PARAMS, KDF_TARGET_MS
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate vault KDF costs to a target latency on this host.")
+    parser.add_argument("--kdf", choices=sorted(KDF_PARAMS), action="append",
+                        help="KDF to calibrate; repeat for several (default: all)")
+    parser.add_argument("--target-ms", type=int, default=KDF_TARGET_MS,
+                        help=f"time one key derivation may take (default: {KDF_TARGET_MS})")
+    parser.add_argument("--rounds", type=int, default=3, help="timed derivations per candidate, best kept")
+    args = parser.parse_args()
+
+    print(f"Current VAULT_KDF: {DEFAULT_KDF} ({benchmark_kdf(DEFAULT_KDF, args.rounds) * 1000:.0f} ms)")
+    for name in args.kdf or sorted(KDF_PARAMS):
+        try:
+            spec, elapsed = calibrate_kdf(name, args.target_ms, args.rounds)
+        except ImportError:
+            print(f"[!] {name}: not available, install argon2-cffi")
+            continue
+        print(f"[✓] {name}: VAULT_KDF={spec} ({elapsed * 1000:.0f} ms)")
+
+if __name__ == "__main__":
+    main()
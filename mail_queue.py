@@ -0,0 +1,331 @@
+# mail_queue.py
+import atexit
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Outgoing mail is written to a spool directory and sent by a background
+# worker over one reused SMTP connection, so requests never wait on SMTP.
+# Spooled messages survive restarts; failed sends are retried with backoff
+# and moved to <spool>/failed once MAIL_MAX_ATTEMPTS is reached, where they
+# are kept for MAIL_FAILED_TTL for inspection. Messages carry verification and
+# reset links, so the spool is readable by its owner only.
+#
+# For a local stand-in server:
+#   python -m aiosmtpd -n -l localhost:1025
+#   SMTP_HOST=localhost SMTP_PORT=1025 SMTP_SSL=0 python app.py
+# Without APP_PASSWORD the worker does not log in.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SSL = os.getenv("SMTP_SSL", "1") != "0"
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "0") != "0"  # only used when SMTP_SSL is off
+SMTP_TIMEOUT = 30
+SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+APP_PASSWORD = os.getenv("APP_PASSWORD")
+
+MAIL_SPOOL_DIR = os.getenv("MAIL_SPOOL_DIR", "mail_spool")
+MAIL_BATCH_SIZE = 20           # messages sent per pass over one connection
+MAIL_MAX_ATTEMPTS = 6
+MAIL_RETRY_BASE = 5            # seconds, doubled per failed attempt
+MAIL_RETRY_MAX = 900
+MAIL_IDLE_TIMEOUT = 60         # close the SMTP connection after this long unused
+MAIL_CLAIM_TIMEOUT = 300       # a claimed message not sent by then is returned to the queue
+MAIL_EXIT_FLUSH = 10           # seconds a short-lived process (CLI) waits at exit for its mail
+MAIL_FAILED_TTL = int(os.getenv("MAIL_FAILED_TTL", str(7 * 24 * 3600)))  # seconds
+MAIL_PRUNE_INTERVAL = 3600     # how often the worker looks for expired failed messages
+
+# Errors about one message, not the connection; other messages can still go out
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError, ValueError)
+
+
+class MailQueue:
+    """Durable outgoing mail queue with a single background sender.
+
+    Each message is one JSON file in <spool>/pending. A sender claims a file
+    by renaming it, so several processes sharing a spool never send the same
+    message twice.
+    """
+
+    def __init__(self, spool_dir: str = MAIL_SPOOL_DIR, host: str = SMTP_HOST, port: int = SMTP_PORT,
+                 use_ssl: bool = SMTP_SSL, username: str = SENDER_EMAIL, password: str = APP_PASSWORD, sender: str = SENDER_EMAIL):
+        self.pending_dir = os.path.join(spool_dir, "pending")
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self._smtp = None
+        self._last_used = 0
+        self._paused_until = 0  # set when the server itself is unreachable
+        self._pruned_at = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        os.makedirs(spool_dir, mode=0o700, exist_ok=True)
+        os.makedirs(self.pending_dir, mode=0o700, exist_ok=True)
+        os.makedirs(self.failed_dir, mode=0o700, exist_ok=True)
+
+    # ----- Producer side -----
+
+    def enqueue(self, to: str, subject: str, body: str) -> str:
+        """Spool a message and wake the sender; returns the message ID."""
+        message_id = f"{time.time():.6f}-{uuid.uuid4().hex}"
+        self._write(os.path.join(self.pending_dir, f"{message_id}.json"), {
+            "id": message_id,
+            "to": to,
+            "subject": subject,
+            "body": body,
+            "attempts": 0,
+            "next_attempt_at": 0,
+            "last_error": None,
+        })
+        self.start()
+        self._wake.set()
+        return message_id
+
+    def pending_count(self) -> int:
+        return sum(1 for name in os.listdir(self.pending_dir) if name.endswith(".json"))
+
+    # ----- Worker lifecycle -----
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._close()
+
+    def flush(self, timeout: float = 30) -> bool:
+        """Wait until no message is due; True if the queue drained in time."""
+        self.start()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self._idle.clear()
+            self._wake.set()
+            if self._idle.wait(max(0, deadline - time.time())) and not self._due():
+                return True
+        return False
+
+    # ----- Worker -----
+
+    def _run(self):
+        self._recover_claims()
+        while not self._stopping.is_set():
+            try:
+                self._send_due()
+            except Exception as e:
+                print(f"[!] Mail queue error: {e}")
+            self._idle.set()
+
+            if self._smtp and time.time() - self._last_used >= MAIL_IDLE_TIMEOUT:
+                self._close()
+            if time.time() - self._pruned_at >= MAIL_PRUNE_INTERVAL:
+                self._prune_failed()
+            self._wake.wait(self._next_wait())
+            self._wake.clear()
+
+    def _due(self):
+        """Pending message paths whose next attempt is due, oldest first."""
+        now = time.time()
+        if now < self._paused_until:
+            return []
+        due = []
+        for name in sorted(os.listdir(self.pending_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.pending_dir, name)
+            message = self._read(path)
+            if message and message.get("next_attempt_at", 0) <= now:
+                due.append(path)
+        return due
+
+    def _next_wait(self) -> float:
+        now = time.time()
+        waits = [MAIL_IDLE_TIMEOUT]
+        if now < self._paused_until:
+            return self._paused_until - now
+        for name in os.listdir(self.pending_dir):
+            if name.endswith(".json"):
+                message = self._read(os.path.join(self.pending_dir, name))
+                if message:
+                    waits.append(message.get("next_attempt_at", 0) - now)
+        return max(0.1, min(waits))
+
+    def _send_due(self):
+        for path in self._due()[:MAIL_BATCH_SIZE]:
+            claimed = f"{path}.{os.getpid()}.claimed"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # another sender took it
+            message = self._read(claimed)
+            if message is None:
+                os.remove(claimed)
+                continue
+            try:
+                self._deliver(message)
+                os.remove(claimed)
+                print(f"[✓] Email sent to {message['to']}")
+            except Exception as e:
+                self._retry_later(message, claimed, e)
+                if not isinstance(e, MESSAGE_ERRORS):
+                    # The server is down or refused the login: hold the whole
+                    # queue rather than spend every message's attempts on it
+                    self._paused_until = message.get("next_attempt_at", 0)
+                    return
+
+    def _deliver(self, message: dict):
+        email = EmailMessage()
+        email["Subject"] = message["subject"]
+        email["From"] = self.sender or self.username or "passager@localhost"
+        email["To"] = message["to"]
+        email.set_content(message["body"])
+
+        for attempt in range(2):
+            try:
+                self._connection().send_message(email)
+                self._last_used = time.time()
+                return
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped an idle connection: reconnect once
+                self._smtp = None
+                if attempt:
+                    raise
+
+    def _retry_later(self, message: dict, claimed: str, error: Exception):
+        message["attempts"] += 1
+        message["last_error"] = str(error)
+        # A refused recipient will not be accepted on a later attempt
+        permanent = isinstance(error, (smtplib.SMTPRecipientsRefused, ValueError))
+        if permanent or message["attempts"] >= MAIL_MAX_ATTEMPTS:
+            self._write(os.path.join(self.failed_dir, f"{message['id']}.json"), message)
+            os.remove(claimed)
+            print(f"[!] Giving up on email to {message['to']}: {error}")
+            return
+        message["next_attempt_at"] = time.time() + min(MAIL_RETRY_MAX, MAIL_RETRY_BASE * 2 ** (message["attempts"] - 1))
+        self._write(os.path.join(self.pending_dir, f"{message['id']}.json"), message)
+        os.remove(claimed)
+        if not isinstance(error, MESSAGE_ERRORS):
+            self._close()
+        print(f"[!] Failed to send email to {message['to']} (attempt {message['attempts']}): {error}")
+
+    def _recover_claims(self):
+        """Return messages claimed by a sender that died before finishing."""
+        now = time.time()
+        for name in os.listdir(self.pending_dir):
+            if name.endswith(".claimed"):
+                path = os.path.join(self.pending_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > MAIL_CLAIM_TIMEOUT:
+                        os.rename(path, path.split(".json.", 1)[0] + ".json")
+                except OSError:
+                    pass
+
+    def _prune_failed(self):
+        """Delete failed messages older than MAIL_FAILED_TTL; they hold bearer links."""
+        self._pruned_at = time.time()
+        for name in os.listdir(self.failed_dir):
+            path = os.path.join(self.failed_dir, name)
+            try:
+                if self._pruned_at - os.path.getmtime(path) > MAIL_FAILED_TTL:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    # ----- SMTP connection -----
+
+    def _connection(self):
+        if self._smtp is None:
+            if self.use_ssl:
+                smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT)
+            else:
+                smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+                if SMTP_STARTTLS:
+                    smtp.starttls()
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    # ----- Spool files -----
+
+    @staticmethod
+    def _write(path: str, message: dict):
+        # Write then rename, so a crash never leaves a half-written message.
+        # Created 0600 whatever the umask: messages carry bearer links.
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(message, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+_queue = None
+_queue_pid = None
+_queue_lock = threading.Lock()
+
+
+def get_mail_queue() -> MailQueue:
+    """The process-wide queue, created (with its spool directory) on first use.
+
+    A forked worker gets its own queue: threads do not survive fork, and the
+    parent's SMTP socket must not be shared.
+    """
+    global _queue, _queue_pid
+    with _queue_lock:
+        if _queue is None or _queue_pid != os.getpid():
+            _queue = MailQueue()
+            _queue_pid = os.getpid()
+        return _queue
+
+
+def send_mail(to: str, subject: str, body: str) -> str:
+    """Queue a plain-text email for background delivery; returns the message ID."""
+    return get_mail_queue().enqueue(to, subject, body)
+
+
+@atexit.register
+def _flush_at_exit():
+    # Anything still unsent stays spooled for the next run
+    if _queue is None or _queue_pid != os.getpid():
+        return
+    if _queue.pending_count():
+        _queue.flush(MAIL_EXIT_FLUSH)
+    _queue.stop(1)
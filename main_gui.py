@@ -1,10 +1,11 @@
 import sys
-import requests
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QLineEdit,
     QPushButton, QMessageBox, QLabel
 )
 from vault_window import VaultWindow
+from gui_workers import TaskRunner
+from http_client import session as http_session
 
 
 class LoginWindow(QWidget):
@@ -56,6 +57,30 @@ class LoginWindow(QWidget):
 
         self.setLayout(layout)
 
+        # Network calls run off the GUI thread
+        self.tasks = TaskRunner(self)
+
+    def post(self, key, path, payload, on_response):
+        """POST to the auth server in the background; on_response(status_code, data) runs on the GUI thread."""
+        def request():
+            response = http_session.post(f"http://localhost:5000{path}", json=payload, timeout=5)
+            return response.status_code, response.json()
+
+        buttons = (self.login_btn, self.signup_btn, self.resend_verification_btn)
+        for button in buttons:
+            button.setEnabled(False)
+
+        def on_finished():
+            for button in buttons:
+                button.setEnabled(True)
+
+        self.tasks.run(
+            key, request,
+            on_result=lambda result: on_response(*result),
+            on_error=lambda e: QMessageBox.critical(self, "Server Error", f"Could not connect to server:\n{str(e)}"),
+            on_finished=on_finished
+        )
+
     def check_password_strength(self):
         password = self.password_input.text()
 
@@ -99,28 +124,20 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter email, password, and master password.")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:5000/login",
-                json={"email": email, "password": password},
-                timeout=5
-            )
-            data = response.json()
-
-            if response.status_code == 200:
+        def on_response(status_code, data):
+            if status_code == 200:
                 QMessageBox.information(self, "Success", "Login successful!")
                 self.hide()
                 self.vault_window = VaultWindow(data["uid"], master_password)
                 self.vault_window.show()
 
-            elif response.status_code == 403:
+            elif status_code == 403:
                 QMessageBox.critical(self, "Account Locked", data["message"])
 
             else:
                 QMessageBox.warning(self, "Login Failed", data.get("message", "Login failed."))
 
-        except Exception as e:
-            QMessageBox.critical(self, "Server Error", f"Could not connect to server:\n{str(e)}")
+        self.post("login", "/login", {"email": email, "password": password}, on_response)
 
     def signup_user(self):
         email = self.email_input.text().strip()
@@ -131,15 +148,8 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Input Error", "Please enter email, password, and master password.")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:5000/signup",
-                json={"email": email, "password": password},
-                timeout=5
-            )
-            data = response.json()
-
-            if response.status_code == 200:
+        def on_response(status_code, data):
+            if status_code == 200:
                 QMessageBox.information(
                     self,
                     "Signup Successful",
@@ -152,8 +162,7 @@ class LoginWindow(QWidget):
             else:
                 QMessageBox.warning(self, "Signup Failed", data.get("message", "Signup failed."))
 
-        except Exception as e:
-            QMessageBox.critical(self, "Server Error", f"Could not connect to server:\n{str(e)}")
+        self.post("signup", "/signup", {"email": email, "password": password}, on_response)
 
     def resend_verification(self):
         email = self.email_input.text().strip()
@@ -162,21 +171,13 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Missing Email", "Please enter your email address.")
             return
 
-        try:
-            response = requests.post(
-                "http://localhost:5000/resend_verification",
-                json={"email": email},
-                timeout=5
-            )
-            data = response.json()
-
-            if response.status_code == 200:
+        def on_response(status_code, data):
+            if status_code == 200:
                 QMessageBox.information(self, "Email Sent", data["message"])
             else:
                 QMessageBox.warning(self, "Failed", data.get("message", "Failed to send email."))
 
-        except Exception as e:
-            QMessageBox.critical(self, "Server Error", f"Could not connect to server:\n{str(e)}")
+        self.post("resend_verification", "/resend_verification", {"email": email}, on_response)
 
 
 if __name__ == "__main__":
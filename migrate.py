@@ -0,0 +1,28 @@
+# migrate.py
+import argparse
+import json
+
+from db import migrate_all_users, migrate_existing_passwords, rebuild_all_search_indexes, rebuild_search_index, MIGRATION_PAGE_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Move passwords from the legacy structure into default vaults.")
+    parser.add_argument("--user", help="migrate a single user instead of every user")
+    parser.add_argument("--workers", type=int, default=4, help="users migrated concurrently (default: 4)")
+    parser.add_argument("--page-size", type=int, default=MIGRATION_PAGE_SIZE, help="legacy documents per commit")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be migrated and time the scan")
+    parser.add_argument("--search-index", action="store_true", help="build the search index instead, so first searches need not wait")
+    args = parser.parse_args()
+
+    if args.search_index:
+        if args.user:
+            rebuild_search_index(args.user)
+        else:
+            print(json.dumps(rebuild_all_search_indexes(), indent=2))
+    elif args.user:
+        migrate_existing_passwords(args.user, dry_run=args.dry_run, page_size=args.page_size)
+    else:
+        summary = migrate_all_users(max_workers=args.workers, dry_run=args.dry_run, page_size=args.page_size)
+        print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# password_table.py
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
+
+from db import get_vault_passwords_page, get_password_entry, MAX_PAGE_SIZE
+
+PASSWORD_COLUMNS = (
+    ("platform", "Platform"),
+    ("username", "Username"),
+    ("url", "URL"),
+    ("password", "Password"),
+    ("updated_at", "Updated"),
+)
+PASSWORD_COLUMN = 3
+PASSWORD_MASK = "•" * 12
+
+# Role carrying the raw value to sort on, so dates do not sort as text
+SORT_ROLE = Qt.UserRole + 1
+
+
+class PasswordTableModel(QAbstractTableModel):
+    """Vault entries for a QTableView, paged in from Firestore as the view scrolls.
+
+    Rows hold metadata only and stay in entry ID order. A password is
+    decrypted when its row is revealed or copied, one entry at a time, and
+    revealed passwords are kept only until the row is hidden or changes.
+    Blocking calls go through the given TaskRunner.
+    """
+
+    loaded = pyqtSignal(int)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, user_id: str, vault_id: str, master_password: str, tasks, page_size: int = MAX_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.vault_id = vault_id
+        self.master_password = master_password
+        self.tasks = tasks
+        self.page_size = page_size
+        self._rows = []
+        self._ids = []
+        self._revealed = {}
+        self._cursor = None
+        self._exhausted = False
+        self._fetching = False
+
+    # ----- Qt model interface -----
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(PASSWORD_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return PASSWORD_COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self._rows[index.row()]
+        field = PASSWORD_COLUMNS[index.column()][0]
+
+        if role == Qt.DisplayRole:
+            if field == "password":
+                return self._revealed.get(entry["id"], PASSWORD_MASK)
+            if field == "updated_at":
+                value = entry.get("updated_at")
+                return value.strftime("%Y-%m-%d %H:%M") if value else ""
+            return entry.get(field) or ""
+        if role == SORT_ROLE:
+            value = entry.get(field)
+            if field == "password":
+                return ""
+            if field == "updated_at":
+                return value.timestamp() if value else 0
+            return (value or "").lower()
+        if role == Qt.UserRole:
+            return entry["id"]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+        self._fetching = True
+        self.tasks.run(
+            "password_page", get_vault_passwords_page, self.user_id, self.vault_id,
+            limit=self.page_size, cursor=self._cursor, metadata_only=True,
+            on_result=self._append_page,
+            on_error=lambda e: self.load_failed.emit(str(e)),
+            on_finished=self._fetch_finished
+        )
+
+    # ----- Loading and live changes -----
+
+    def reload(self):
+        """Drop every row and start paging again from the first entry."""
+        self.tasks.cancel("password_page")
+        self.beginResetModel()
+        self._rows, self._ids = [], []
+        self._revealed.clear()
+        self._cursor = None
+        self._exhausted = False
+        self._fetching = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def _fetch_finished(self):
+        self._fetching = False
+
+    def _append_page(self, page):
+        # Entries a live update already inserted are not added twice
+        entries = [entry for entry in page["passwords"] if not self._contains(entry["id"])]
+        if entries:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+            self._rows.extend(entries)
+            self._ids.extend(entry["id"] for entry in entries)
+            self.endInsertRows()
+        self._cursor = page["next_cursor"]
+        self._exhausted = self._cursor is None
+        self.loaded.emit(len(self._rows))
+
+    def _contains(self, entry_id: str) -> bool:
+        row = bisect_left(self._ids, entry_id)
+        return row < len(self._ids) and self._ids[row] == entry_id
+
+    def apply_changes(self, added, modified, removed):
+        """Apply live updates (metadata entries and removed IDs) to the loaded rows.
+
+        Entries beyond the last loaded page are left for paging to pick up.
+        """
+        for entry in list(added) + list(modified):
+            entry_id = entry["id"]
+            row = bisect_left(self._ids, entry_id)
+            if row < len(self._ids) and self._ids[row] == entry_id:
+                self._rows[row] = entry
+                # The stored password may have changed under a revealed row
+                self._revealed.pop(entry_id, None)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(PASSWORD_COLUMNS) - 1))
+            elif row < len(self._ids) or self._exhausted:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._rows.insert(row, entry)
+                self._ids.insert(row, entry_id)
+                self.endInsertRows()
+
+        for entry_id in removed:
+            row = bisect_left(self._ids, entry_id)
+            if row < len(self._ids) and self._ids[row] == entry_id:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                del self._ids[row]
+                self._revealed.pop(entry_id, None)
+                self.endRemoveRows()
+
+    # ----- On-demand decryption -----
+
+    def entry(self, row: int) -> dict:
+        return self._rows[row]
+
+    def is_revealed(self, row: int) -> bool:
+        return self._rows[row]["id"] in self._revealed
+
+    def with_password(self, row: int, callback, on_error=None):
+        """Decrypt one row's password in the background and pass it to callback."""
+        entry_id = self._rows[row]["id"]
+        if entry_id in self._revealed:
+            callback(self._revealed[entry_id])
+            return
+
+        def on_entry(entry):
+            if entry is None:
+                message = "Entry no longer exists"
+            elif entry.get("error"):
+                message = entry["error"]
+            else:
+                callback(entry["password"])
+                return
+            if on_error:
+                on_error(message)
+
+        self.tasks.run(
+            f"decrypt:{entry_id}", get_password_entry, self.user_id, self.vault_id, entry_id, self.master_password,
+            on_result=on_entry,
+            on_error=lambda e: on_error(str(e)) if on_error else None
+        )
+
+    def reveal(self, row: int, on_error=None):
+        entry_id = self._rows[row]["id"]
+
+        def show(password):
+            self._revealed[entry_id] = password
+            if self._contains(entry_id):
+                row_now = bisect_left(self._ids, entry_id)
+                index = self.index(row_now, PASSWORD_COLUMN)
+                self.dataChanged.emit(index, index)
+
+        self.with_password(row, show, on_error)
+
+    def hide(self, row: int):
+        if self._revealed.pop(self._rows[row]["id"], None) is not None:
+            index = self.index(row, PASSWORD_COLUMN)
+            self.dataChanged.emit(index, index)
+
+
+class PasswordFilterProxyModel(QSortFilterProxyModel):
+    """Sorts on raw values and filters on platform, username and URL."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        pattern = self.filterRegExp().pattern()
+        if not pattern:
+            return True
+        entry = self.sourceModel().entry(source_row)
+        needle = pattern.lower()
+        return any(needle in (entry.get(field) or "").lower() for field in ("platform", "username", "url"))
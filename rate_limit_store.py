@@ -0,0 +1,147 @@
+# rate_limit_store.py
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+# Where rate limits and login lockouts live: "memory://" (default, per
+# process) or "redis://..." so every worker and node shares the same counts.
+RATE_LIMIT_STORAGE_URL = os.getenv("RATE_LIMIT_STORAGE_URL", "memory://")
+
+# Flask-Limiter strategy: a moving window counts every hit in the last period,
+# so a burst straddling a window boundary cannot double the limit
+RATE_LIMIT_STRATEGY = "moving-window"
+
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", "900"))  # seconds
+LOGIN_LOCKOUT_SECONDS = int(os.getenv("LOGIN_LOCKOUT_SECONDS", "300"))
+
+# Memory backend: accounts tracked before expired ones are swept
+LOCKOUT_MAX_TRACKED = 100_000
+
+
+def _account_key(email: str) -> str:
+    # Store a digest, not the address, in shared storage and keys
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class MemoryLockoutStore:
+    """Per-process login failure counts over a sliding window, with lockouts.
+
+    Failures older than the window are dropped as accounts are touched, and
+    idle accounts are swept once LOCKOUT_MAX_TRACKED are tracked.
+    """
+
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES, window: int = LOGIN_FAILURE_WINDOW, lockout: int = LOGIN_LOCKOUT_SECONDS, max_tracked: int = LOCKOUT_MAX_TRACKED):
+        self.max_failures = max_failures
+        self.window = window
+        self.lockout = lockout
+        self.max_tracked = max_tracked
+        self._failures = {}  # account -> deque of failure times
+        self._locked = {}    # account -> locked until (epoch seconds)
+        self._lock = threading.Lock()
+
+    def is_locked_out(self, email: str):
+        """Return (True, locked_until) while the account is locked, else (False, None)."""
+        account = _account_key(email)
+        with self._lock:
+            until = self._locked.get(account)
+            if until is None:
+                return False, None
+            if time.time() >= until:
+                del self._locked[account]
+                return False, None
+            return True, datetime.fromtimestamp(until)
+
+    def record_failure(self, email: str):
+        """Count a failed login; returns locked_until if this failure locked the account."""
+        account = _account_key(email)
+        now = time.time()
+        with self._lock:
+            failures = self._failures.setdefault(account, deque())
+            failures.append(now)
+            while failures and failures[0] <= now - self.window:
+                failures.popleft()
+            if len(failures) >= self.max_failures:
+                # Counting starts over once the lockout ends
+                del self._failures[account]
+                self._locked[account] = now + self.lockout
+                return datetime.fromtimestamp(now + self.lockout)
+            if len(self._failures) + len(self._locked) > self.max_tracked:
+                self._sweep(now)
+            return None
+
+    def reset(self, email: str):
+        account = _account_key(email)
+        with self._lock:
+            self._failures.pop(account, None)
+            self._locked.pop(account, None)
+
+    def _sweep(self, now: float):
+        for account in [a for a, f in self._failures.items() if f[-1] <= now - self.window]:
+            del self._failures[account]
+        for account in [a for a, until in self._locked.items() if until <= now]:
+            del self._locked[account]
+
+    def __len__(self):
+        return len(self._failures) + len(self._locked)
+
+
+class RedisLockoutStore:
+    """Login failure counts and lockouts in Redis, shared by every worker and node.
+
+    Failures are members of a sorted set scored by time; trimming, adding and
+    counting run in one MULTI/EXEC, so concurrent workers always see a
+    consistent count. Every key carries a TTL, so idle accounts expire.
+    """
+
+    def __init__(self, url: str, max_failures: int = LOGIN_MAX_FAILURES, window: int = LOGIN_FAILURE_WINDOW, lockout: int = LOGIN_LOCKOUT_SECONDS, prefix: str = "passager:lockout:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.max_failures = max_failures
+        self.window = window
+        self.lockout = lockout
+        self.prefix = prefix
+
+    def _key(self, email: str, suffix: str) -> str:
+        return f"{self.prefix}{_account_key(email)}:{suffix}"
+
+    def is_locked_out(self, email: str):
+        until = self.client.get(self._key(email, "until"))
+        if until is None:
+            return False, None
+        until = float(until)
+        if time.time() >= until:
+            return False, None
+        return True, datetime.fromtimestamp(until)
+
+    def record_failure(self, email: str):
+        failures_key = self._key(email, "failures")
+        now = time.time()
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zremrangebyscore(failures_key, 0, now - self.window)
+        pipe.zadd(failures_key, {f"{now}:{uuid.uuid4().hex}": now})
+        pipe.zcard(failures_key)
+        pipe.expire(failures_key, self.window)
+        count = pipe.execute()[2]
+        if count < self.max_failures:
+            return None
+
+        until = now + self.lockout
+        pipe = self.client.pipeline(transaction=True)
+        pipe.set(self._key(email, "until"), until, ex=self.lockout)
+        pipe.delete(failures_key)
+        pipe.execute()
+        return datetime.fromtimestamp(until)
+
+    def reset(self, email: str):
+        self.client.delete(self._key(email, "failures"), self._key(email, "until"))
+
+
+def create_lockout_store(url: str = RATE_LIMIT_STORAGE_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisLockoutStore(url)
+    return MemoryLockoutStore()
@@ -0,0 +1,136 @@
+# search_index.py
+import base64
+import hashlib
+import hmac
+import os
+import re
+
+# Entry fields that are searchable. Passwords are never indexed.
+SEARCH_FIELDS = ("platform", "username", "url", "notes")
+
+# Blinding key: SEARCH_INDEX_KEY (base64) if set, otherwise a key file created on first use.
+# Every server instance must use the same key or existing index entries stop matching.
+# The key file lives outside the source tree so it cannot be committed with it;
+# a search_index.key left in the working directory by older versions is still used.
+SEARCH_INDEX_KEY_FILE = os.getenv("SEARCH_INDEX_KEY_FILE", os.path.join(os.path.expanduser("~"), ".passager", "search_index.key"))
+LEGACY_KEY_FILE = "search_index.key"
+
+MAX_TOKENS_PER_ENTRY = 1000
+MAX_QUERY_LENGTH = 100
+TOKEN_BYTES = 12
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+_key = None
+
+
+def load_index_key() -> bytes:
+    """Return the search blinding key, creating the key file if there is none yet."""
+    global _key
+    if _key is not None:
+        return _key
+
+    env_key = os.getenv("SEARCH_INDEX_KEY")
+    if env_key:
+        _key = base64.b64decode(env_key)
+        return _key
+
+    key_file = SEARCH_INDEX_KEY_FILE
+    if not os.getenv("SEARCH_INDEX_KEY_FILE") and not os.path.exists(key_file) and os.path.exists(LEGACY_KEY_FILE):
+        print(f"[!] Using {LEGACY_KEY_FILE} from the working directory; move it to {key_file}")
+        key_file = LEGACY_KEY_FILE
+
+    try:
+        os.makedirs(os.path.dirname(key_file) or ".", mode=0o700, exist_ok=True)
+        # O_EXCL so concurrent workers cannot each write a different key
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32))
+        print(f"[🔑] Search index key generated and saved to {key_file}")
+    except FileExistsError:
+        pass
+    with open(key_file, "rb") as f:
+        _key = f.read()
+    return _key
+
+
+def words(text: str):
+    return _WORD_RE.findall((text or "").lower())
+
+
+def plain_tokens(text: str):
+    """Index terms for text: 1- and 2-letter word prefixes, and every trigram of each word."""
+    tokens = set()
+    for word in words(text):
+        tokens.add("p:" + word[:1])
+        if len(word) >= 2:
+            tokens.add("p:" + word[:2])
+        for i in range(len(word) - 2):
+            tokens.add("t:" + word[i:i + 3])
+    return tokens
+
+
+def query_tokens(query: str):
+    """Terms an entry must all contain to match the query, most selective first.
+
+    Words of three letters or more match anywhere inside a word; shorter
+    ones match the start of a word.
+    """
+    tokens = []
+    # Trigrams of the longest word narrow the candidates best; short prefixes least
+    for word in sorted(set(words(query[:MAX_QUERY_LENGTH])), key=len, reverse=True):
+        if len(word) < 3:
+            tokens.append("p:" + word)
+        else:
+            tokens.extend("t:" + word[i:i + 3] for i in range(len(word) - 2))
+    return list(dict.fromkeys(tokens))
+
+
+def blind(user_id: str, tokens) -> list:
+    """HMAC each term under the index key and the user ID, keeping their order.
+
+    Stored tokens reveal no text, and the same word yields different tokens
+    for different users.
+    """
+    key = load_index_key()
+    prefix = user_id.encode() + b"\0"
+    return [
+        base64.urlsafe_b64encode(hmac.new(key, prefix + token.encode(), hashlib.sha256).digest()[:TOKEN_BYTES]).decode()
+        for token in tokens
+    ]
+
+
+def rank(entry: dict, query: str) -> int:
+    """Relevance of a matching entry to query, lower is better.
+
+    0 the platform is the query, 1 every word starts a platform word,
+    2 every word is inside the platform, 3 inside platform, username or URL,
+    4 anything else (a match in the notes).
+    """
+    query_words = words(query[:MAX_QUERY_LENGTH])
+    platform_words = words(entry.get("platform", ""))
+    if query_words == platform_words:
+        return 0
+    if all(any(p.startswith(w) for p in platform_words) for w in query_words):
+        return 1
+    if all(any(w in p for p in platform_words) for w in query_words):
+        return 2
+    visible = platform_words + words(entry.get("username", "")) + words(entry.get("url", ""))
+    if all(any(w in v for v in visible) for w in query_words):
+        return 3
+    return 4
+
+
+def entry_tokens(user_id: str, entry: dict) -> list:
+    """Blinded index tokens for an entry's searchable fields, at most MAX_TOKENS_PER_ENTRY."""
+    tokens = set()
+    for field in SEARCH_FIELDS[:-1]:
+        tokens |= plain_tokens(entry.get(field, ""))
+    # Long notes are the only unbounded field; they get whatever room is left
+    notes = sorted(plain_tokens(entry.get("notes", "")) - tokens)
+    tokens.update(notes[:max(0, MAX_TOKENS_PER_ENTRY - len(tokens))])
+    return blind(user_id, sorted(tokens))
+
+
+def index_doc_id(vault_id: str, entry_id: str) -> str:
+    return f"{vault_id}__{entry_id}"
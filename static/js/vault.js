@@ -5,6 +5,16 @@ let currentVaultId = null;
 let allVaults = [];
 let currentVaultPasswords = [];
 let currentPasswordId = null;
+let currentVaultCursor = null;
+let isLoadingMorePasswords = false;
+let passwordListObserver = null;
+let revealedPasswords = new Map();  // platform -> decrypted entry, for the open vault only
+let passwordRows = new Map();       // entry id -> { row, signature }, for keyed re-rendering
+let remoteSearch = { query: '', results: [] };  // server matches not yet paged in
+let globalSearch = { controller: null, results: [] };  // password matches across every vault
+
+const PASSWORD_PAGE_SIZE = 50;
+const GLOBAL_SEARCH_MIN_LENGTH = 2;
 
 // ===== INITIALIZATION =====
 document.addEventListener('DOMContentLoaded', function() {
@@ -30,11 +40,31 @@ function initializeEventListeners() {
     const vaultSearchInput = document.getElementById('search-input');
     if (vaultSearchInput) {
         vaultSearchInput.addEventListener('input', debounce(filterVaults, 300));
+        vaultSearchInput.addEventListener('input', debounce(searchAllVaults, 300));
     }
     
     const passwordSearchInput = document.getElementById('password-search-input');
     if (passwordSearchInput) {
-        passwordSearchInput.addEventListener('input', debounce(filterPasswords, 300));
+        // The local index answers within a frame; the server only covers pages not loaded yet
+        passwordSearchInput.addEventListener('input', filterPasswords);
+        passwordSearchInput.addEventListener('input', debounce(searchUnloadedPasswords, 300));
+    }
+    
+    // Row actions are delegated: rows carry their platform in data-* attributes
+    // set through the DOM, never in inline handler strings built from vault data
+    const passwordList = document.getElementById('password-list');
+    if (passwordList) {
+        passwordList.addEventListener('click', handlePasswordRowClick);
+    }
+    
+    const globalSearchResults = document.getElementById('global-search-results');
+    if (globalSearchResults) {
+        globalSearchResults.addEventListener('click', function(e) {
+            const row = e.target.closest('tr.global-search-result');
+            if (row) {
+                openGlobalSearchResult(row.dataset.vaultId, row.dataset.platform);
+            }
+        });
     }
     
     document.addEventListener('keydown', function(e) {
@@ -188,6 +218,124 @@ function filterVaults() {
     renderVaults(filtered);
 }
 
+// ===== GLOBAL SEARCH =====
+// Password matches from every vault, streamed as NDJSON by /api/search/stream
+// as each vault answers. Results are metadata only; nothing is decrypted until
+// a result is opened in its vault.
+
+async function searchAllVaults() {
+    const query = document.getElementById('search-input').value.trim();
+    
+    // A newer query replaces any search still streaming
+    if (globalSearch.controller) globalSearch.controller.abort();
+    globalSearch = { controller: null, results: [] };
+    
+    if (query.length < GLOBAL_SEARCH_MIN_LENGTH) {
+        renderGlobalSearch(null);
+        return;
+    }
+    
+    const controller = new AbortController();
+    globalSearch.controller = controller;
+    let searched = 0;
+    renderGlobalSearch('Searching...');
+    
+    try {
+        const response = await fetch(`/api/search/stream?q=${encodeURIComponent(query)}`, {
+            method: 'GET',
+            signal: controller.signal
+        });
+        if (response.status === 503) {
+            // The search index is still being built: say so and try again,
+            // unless a newer query has taken over by then
+            const data = await response.json();
+            renderGlobalSearch(data.message);
+            const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 10;
+            setTimeout(() => {
+                if (globalSearch.controller === controller) searchAllVaults();
+            }, retryAfter * 1000);
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`Search failed (${response.status})`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const message = JSON.parse(line);
+                if (message.type === 'error') {
+                    throw new Error(message.message);
+                }
+                if (message.type === 'vault') {
+                    searched++;
+                    mergeGlobalResults(message.results || []);
+                }
+            }
+            renderGlobalSearch(`Searching... ${searched} of ${allVaults.length} vaults`);
+        }
+        renderGlobalSearch(globalSearch.results.length ? null : 'No passwords found');
+    } catch (error) {
+        if (error.name === 'AbortError') return;
+        console.error('Error searching vaults:', error);
+        renderGlobalSearch('Search failed');
+    }
+}
+
+// Results arrive ranked per vault; keep the merged list ranked across vaults
+function mergeGlobalResults(results) {
+    const merged = globalSearch.results.concat(results);
+    merged.sort((a, b) => a.rank - b.rank || a.platform.localeCompare(b.platform));
+    globalSearch.results = merged;
+}
+
+function renderGlobalSearch(status) {
+    const container = document.getElementById('global-search');
+    const tbody = document.getElementById('global-search-results');
+    if (!container || !tbody) return;
+    
+    if (status === null && globalSearch.results.length === 0) {
+        container.style.display = 'none';
+        tbody.textContent = '';
+        return;
+    }
+    
+    container.style.display = 'block';
+    document.getElementById('global-search-status').textContent = status || '';
+    tbody.innerHTML = globalSearch.results.map(result => `
+        <tr class="global-search-result">
+            <td>
+                <div style="display: flex; align-items: center; gap: 12px;">
+                    ${getFaviconForService(result.platform)}
+                    <span>${escapeHtml(result.platform)}</span>
+                </div>
+            </td>
+            <td>${escapeHtml(result.username || 'No username')}</td>
+            <td>${escapeHtml(result.vault_name || '')}</td>
+        </tr>
+    `).join('');
+    Array.from(tbody.rows).forEach((row, i) => {
+        row.dataset.vaultId = globalSearch.results[i].vault_id;
+        row.dataset.platform = globalSearch.results[i].platform;
+    });
+}
+
+async function openGlobalSearchResult(vaultId, platform) {
+    // Opening the vault filters it down to the chosen entry
+    document.getElementById('password-search-input').value = platform;
+    await openVault(vaultId);
+    searchUnloadedPasswords();
+}
+
 function openCreateVaultModal() {
     const modal = document.getElementById('create-vault-modal');
     if (modal) {
@@ -268,7 +416,8 @@ async function deleteVault(vaultId) {
     showLoading(true);
     
     try {
-        const response = await fetch(`/api/vaults/${vaultId}`, {
+        // Deletion runs server-side in the background; the vault is hidden straight away
+        const response = await fetch(`/api/vaults/${vaultId}?background=1`, {
             method: 'DELETE',
             headers: {
                 'Content-Type': 'application/json',
@@ -278,7 +427,10 @@ async function deleteVault(vaultId) {
         const data = await response.json();
         
         if (data.status === 'success') {
-            showNotification(`Vault "${vault.name}" deleted successfully`, 'success');
+            showNotification(
+                response.status === 202 ? `Deleting vault "${vault.name}"...` : `Vault "${vault.name}" deleted successfully`,
+                'success'
+            );
             await loadVaults();
         } else {
             showNotification(data.message || 'Failed to delete vault', 'error');
@@ -298,6 +450,10 @@ function showVaultGrid() {
     document.getElementById('vault-main').style.display = 'block';
     currentVaultId = null;
     currentVaultPasswords = [];
+    currentVaultCursor = null;
+    revealedPasswords.clear();
+    resetPasswordList();
+    document.getElementById('password-search-input').value = '';
 }
 
 async function openVault(vaultId) {
@@ -315,11 +471,37 @@ async function openVault(vaultId) {
     await loadVaultPasswords(vaultId);
 }
 
+function vaultPasswordsUrl(vaultId, cursor = null) {
+    // Listings are metadata-only; passwords are decrypted one at a time on reveal
+    let url = `/api/vaults/${vaultId}/passwords?metadata_only=1&limit=${PASSWORD_PAGE_SIZE}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    return url;
+}
+
+function resetPasswordList() {
+    passwordSearchIndex.clear();
+    passwordRows.clear();
+    remoteSearch = { query: '', results: [] };
+    const tbody = document.getElementById('password-list');
+    if (tbody) tbody.textContent = '';
+}
+
+function isVaultDetailOpen() {
+    const detail = document.getElementById('vault-detail');
+    return !!detail && detail.style.display === 'block';
+}
+
 async function loadVaultPasswords(vaultId) {
     showLoading(true);
+    currentVaultCursor = null;
+    revealedPasswords.clear();
+    resetPasswordList();
     
     try {
-        const response = await fetch(`/api/vaults/${vaultId}/passwords?master_password=${encodeURIComponent(masterPassword)}`, {
+        // Only the first page is fetched up front; the rest loads on scroll
+        const response = await fetch(vaultPasswordsUrl(vaultId), {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json',
@@ -330,7 +512,10 @@ async function loadVaultPasswords(vaultId) {
         
         if (data.status === 'success') {
             currentVaultPasswords = data.passwords || [];
-            renderVaultPasswords(currentVaultPasswords);
+            currentVaultCursor = data.next_cursor || null;
+            passwordSearchIndex.addAll(currentVaultPasswords);
+            filterPasswords();
+            observePasswordListEnd();
         } else {
             showNotification(data.message || 'Failed to load passwords', 'error');
             currentVaultPasswords = [];
@@ -346,6 +531,138 @@ async function loadVaultPasswords(vaultId) {
     }
 }
 
+async function loadMoreVaultPasswords() {
+    if (!currentVaultCursor || isLoadingMorePasswords || !currentVaultId) {
+        return;
+    }
+    
+    const vaultId = currentVaultId;
+    isLoadingMorePasswords = true;
+    
+    try {
+        const response = await fetch(vaultPasswordsUrl(vaultId, currentVaultCursor), {
+            method: 'GET',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+        
+        const data = await response.json();
+        
+        // Ignore pages that arrive after the user switched vaults
+        if (vaultId !== currentVaultId) return;
+        
+        if (data.status === 'success') {
+            const page = data.passwords || [];
+            currentVaultPasswords = currentVaultPasswords.concat(page);
+            currentVaultCursor = data.next_cursor || null;
+            passwordSearchIndex.addAll(page);
+            filterPasswords();
+            // Re-observing re-checks the sentinel, so short pages keep filling the view
+            observePasswordListEnd();
+        } else {
+            currentVaultCursor = null;
+            showNotification(data.message || 'Failed to load more passwords', 'error');
+        }
+    } catch (error) {
+        console.error('Error loading more vault passwords:', error);
+        showNotification('Failed to load more passwords', 'error');
+    } finally {
+        isLoadingMorePasswords = false;
+    }
+}
+
+function observePasswordListEnd() {
+    const sentinel = document.getElementById('password-list-sentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) return;
+    
+    if (!passwordListObserver) {
+        passwordListObserver = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreVaultPasswords();
+            }
+        }, { rootMargin: '300px' });
+    }
+    passwordListObserver.disconnect();
+    passwordListObserver.observe(sentinel);
+}
+
+function passwordRowHtml(password) {
+    // Add null checks for password fields
+    const platformText = password.platform || 'Unknown Service';
+    const maskedPassword = '•'.repeat(12);
+    const favicon = getFaviconForService(platformText);
+    const safeId = platformText.replace(/[^a-zA-Z0-9]/g, '_');
+    
+    return `
+        <tr>
+            <td>
+                <div style="display: flex; align-items: center; gap: 12px;">
+                    ${favicon}
+                    <span>${escapeHtml(platformText)}</span>
+                </div>
+            </td>
+            <td>${escapeHtml(password.username || 'No username')}</td>
+            <td>
+                <div class="password-cell">
+                    <span id="password-display-${safeId}" class="password-display">${maskedPassword}</span>
+                    <div class="password-actions">
+                        <button class="btn-icon eye-btn" data-action="toggle" data-safe-id="${safeId}" title="Show/Hide Password">
+                            <i class="fas fa-eye" id="eye-${safeId}"></i>
+                        </button>
+                    </div>
+                </div>
+            </td>
+            <td class="actions">
+                <button class="btn-icon copy-btn" data-action="copy" title="Copy Password">
+                    <i class="fas fa-copy"></i>
+                </button>
+                <button class="btn-icon edit-btn" data-action="edit" title="Edit">
+                    <i class="fas fa-edit"></i>
+                </button>
+                <button class="btn-icon delete-btn" data-action="delete" title="Delete">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </td>
+        </tr>
+    `;
+}
+
+function passwordRowSignature(password) {
+    return [password.platform, password.username, password.url, password.updated_at].join('\u0000');
+}
+
+function createPasswordRow(password) {
+    const template = document.createElement('template');
+    template.innerHTML = passwordRowHtml(password).trim();
+    const row = template.content.firstElementChild;
+    row.dataset.id = password.id;
+    row.dataset.platform = password.platform || 'Unknown Service';
+    return row;
+}
+
+function handlePasswordRowClick(e) {
+    const button = e.target.closest('button[data-action]');
+    const row = button && button.closest('tr');
+    if (!row || row.dataset.platform === undefined) return;
+    
+    const platform = row.dataset.platform;
+    switch (button.dataset.action) {
+        case 'toggle':
+            togglePasswordView(platform, button.dataset.safeId);
+            break;
+        case 'copy':
+            copyPassword(platform);
+            break;
+        case 'edit':
+            editPassword(platform, currentVaultId);
+            break;
+        case 'delete':
+            deletePasswordPrompt(platform, currentVaultId);
+            break;
+    }
+}
+
 function renderVaultPasswords(passwords) {
     const tbody = document.getElementById('password-list');
     const table = document.querySelector('.vault-table-container');
@@ -360,67 +677,229 @@ function renderVaultPasswords(passwords) {
     if (table) table.style.display = 'block';
     if (empty) empty.style.display = 'none';
     
-    if (tbody) {
-        tbody.innerHTML = passwords.map(password => {
-            // Add null checks for password fields
-            const passwordText = password.password || '';
-            const platformText = password.platform || 'Unknown Service';
-            const maskedPassword = '•'.repeat(Math.min(passwordText.length, 12));
-            const favicon = getFaviconForService(platformText);
-            const safeId = platformText.replace(/[^a-zA-Z0-9]/g, '_');
-            
-            return `
-                <tr>
-                    <td>
-                        <div style="display: flex; align-items: center; gap: 12px;">
-                            ${favicon}
-                            <span>${escapeHtml(platformText)}</span>
-                        </div>
-                    </td>
-                    <td>${escapeHtml(password.username || 'No username')}</td>
-                    <td>
-                        <div class="password-cell">
-                            <span id="password-display-${safeId}" class="password-display">${maskedPassword}</span>
-                            <div class="password-actions">
-                                <button class="btn-icon eye-btn" onclick="togglePasswordView('${platformText.replace(/'/g, "\\'")}', '${passwordText.replace(/'/g, "\\'")}', '${safeId}')" title="Show/Hide Password">
-                                    <i class="fas fa-eye" id="eye-${safeId}"></i>
-                                </button>
-                            </div>
-                        </div>
-                    </td>
-                    <td class="actions">
-                        <button class="btn-icon copy-btn" onclick="copyToClipboard('${passwordText.replace(/'/g, "\\'")}', 'Password copied!')" title="Copy Password">
-                            <i class="fas fa-copy"></i>
-                        </button>
-                        <button class="btn-icon edit-btn" onclick="editPassword('${platformText.replace(/'/g, "\\'")}', '${currentVaultId}')" title="Edit">
-                            <i class="fas fa-edit"></i>
-                        </button>
-                        <button class="btn-icon delete-btn" onclick="deletePasswordPrompt('${platformText.replace(/'/g, "\\'")}', '${currentVaultId}')" title="Delete">
-                            <i class="fas fa-trash"></i>
-                        </button>
-                    </td>
-                </tr>
-            `;
-        }).join('');
+    if (!tbody) return;
+    
+    // Keyed reconciliation: rows are reused by entry id and only new or
+    // changed entries build DOM; everything before `cursor` is already in place
+    let cursor = tbody.firstElementChild;
+    for (const password of passwords) {
+        const signature = passwordRowSignature(password);
+        let cached = passwordRows.get(password.id);
+        if (cached && cached.signature !== signature) {
+            if (cached.row === cursor) cursor = cursor.nextElementSibling;
+            cached.row.remove();
+            cached = null;
+        }
+        if (!cached) {
+            cached = { row: createPasswordRow(password), signature };
+            passwordRows.set(password.id, cached);
+        }
+        if (cached.row === cursor) {
+            cursor = cursor.nextElementSibling;
+        } else {
+            tbody.insertBefore(cached.row, cursor);
+        }
+    }
+    // Rows filtered out stay cached, detached, for when the filter changes again
+    while (cursor) {
+        const next = cursor.nextElementSibling;
+        cursor.remove();
+        cursor = next;
     }
 }
 
 function filterPasswords() {
-    const searchTerm = document.getElementById('password-search-input').value.toLowerCase();
+    const searchTerm = document.getElementById('password-search-input').value;
+    const filtered = passwordSearchIndex.search(searchTerm, currentVaultPasswords);
     
-    if (!searchTerm) {
+    if (filtered === null) {
         renderVaultPasswords(currentVaultPasswords);
         return;
     }
     
-    const filtered = currentVaultPasswords.filter(password => 
-        password.platform.toLowerCase().includes(searchTerm) ||
-        (password.username && password.username.toLowerCase().includes(searchTerm))
-    );
-    
+    if (remoteSearch.query === searchTerm) {
+        // Server matches from pages that have not been loaded yet
+        filtered.push(...remoteSearch.results.filter(result => !passwordSearchIndex.has(result.id)));
+    }
     renderVaultPasswords(filtered);
 }
 
+async function searchUnloadedPasswords() {
+    const input = document.getElementById('password-search-input');
+    const query = input.value;
+    const vaultId = currentVaultId;
+    
+    // Everything is loaded: the local index already has the full answer
+    if (!query.trim() || !currentVaultCursor || !vaultId) return;
+    
+    try {
+        const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&vault_id=${encodeURIComponent(vaultId)}`, {
+            method: 'GET',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        });
+        const data = await response.json();
+        
+        // Drop answers to a query the user has since changed
+        if (vaultId !== currentVaultId || query !== input.value || data.status !== 'success') return;
+        remoteSearch = { query, results: data.results || [] };
+        filterPasswords();
+    } catch (error) {
+        console.error('Error searching passwords:', error);
+    }
+}
+
+// ===== PASSWORD SEARCH INDEX =====
+// Prefix and trigram postings over the loaded entries of the open vault, kept
+// up to date as pages load and entries are saved or deleted, so filtering
+// never rescans the whole list.
+
+const SEARCH_INDEX_FIELDS = ['platform', 'username', 'url'];
+
+function searchWords(text) {
+    return (text || '').toLowerCase().split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+}
+
+function searchTerms(text) {
+    const terms = new Set();
+    for (const word of searchWords(text)) {
+        terms.add('p:' + word.slice(0, 1));
+        if (word.length >= 2) terms.add('p:' + word.slice(0, 2));
+        for (let i = 0; i + 3 <= word.length; i++) {
+            terms.add('t:' + word.slice(i, i + 3));
+        }
+    }
+    return terms;
+}
+
+// Lowercased searchable text, kept on the entry itself so confirming a match
+// needs no lookup; a symbol keeps it out of JSON and field loops
+const SEARCH_TEXT = Symbol('searchText');
+
+class PasswordSearchIndex {
+    constructor() {
+        this.clear();
+    }
+
+    clear() {
+        this.postings = new Map();   // term -> Set of entry ids
+        this.entryTerms = new Map(); // entry id -> terms, so removal is incremental
+        this.entries = new Map();    // entry id -> entry
+    }
+
+    add(entry) {
+        this.remove(entry.id);
+        const text = SEARCH_INDEX_FIELDS.map(field => entry[field] || '').join('\n');
+        const terms = searchTerms(text);
+        for (const term of terms) {
+            let ids = this.postings.get(term);
+            if (!ids) {
+                ids = new Set();
+                this.postings.set(term, ids);
+            }
+            ids.add(entry.id);
+        }
+        entry[SEARCH_TEXT] = text.toLowerCase();
+        this.entryTerms.set(entry.id, terms);
+        this.entries.set(entry.id, entry);
+    }
+
+    addAll(entries) {
+        entries.forEach(entry => this.add(entry));
+    }
+
+    has(id) {
+        return this.entries.has(id);
+    }
+
+    remove(id) {
+        const terms = this.entryTerms.get(id);
+        if (!terms) return;
+        for (const term of terms) {
+            const ids = this.postings.get(term);
+            ids.delete(id);
+            if (ids.size === 0) this.postings.delete(term);
+        }
+        this.entryTerms.delete(id);
+        this.entries.delete(id);
+    }
+
+    // Returns the matching entries of the given list (sorted by id, like the
+    // loaded list), or null when every entry matches, including an empty query
+    search(query, entries) {
+        const words = searchWords(query);
+        const total = this.entries.size;
+        let lists = [];
+        for (const word of words) {
+            const terms = word.length < 3
+                ? ['p:' + word]
+                : Array.from({ length: word.length - 2 }, (_, i) => 't:' + word.slice(i, i + 3));
+            for (const term of terms) {
+                const ids = this.postings.get(term);
+                if (!ids) return [];
+                lists.push(ids);
+            }
+        }
+        // Terms every entry has cannot narrow anything down
+        lists = lists.filter(ids => ids.size < total);
+        // A word of exactly three letters is its own trigram; longer ones are
+        // confirmed against the text, since trigrams alone do not have to be adjacent
+        const confirm = words.filter(word => word.length > 3);
+
+        if (lists.length === 0 && confirm.length === 0) return null;
+        lists.sort((a, b) => a.size - b.size);
+
+        // A broad query is cheaper to answer by testing each entry's text in
+        // list order than by walking postings that cover most of the vault
+        if (!lists.length || lists[0].size > total / 4) {
+            const tests = words.map(word => {
+                if (word.length >= 3) return text => text.includes(word);
+                const wordStart = new RegExp('(?:^|[^\\p{L}\\p{N}])' + word, 'u');
+                return text => wordStart.test(text);
+            });
+            return entries.filter(entry => tests.every(test => test(entry[SEARCH_TEXT])));
+        }
+
+        const rest = lists.slice(1);
+        const matches = [];
+        for (const id of lists[0]) {
+            if (!rest.every(ids => ids.has(id))) continue;
+            const entry = this.entries.get(id);
+            if (confirm.every(word => entry[SEARCH_TEXT].includes(word))) matches.push(entry);
+        }
+        return matches.sort((a, b) => (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+    }
+}
+
+const passwordSearchIndex = new PasswordSearchIndex();
+
+// Insert or replace an entry in the loaded list, which is kept in entry ID order
+// like the API pages. Entries beyond the last loaded page are left for paging.
+function upsertLoadedPassword(entry) {
+    let lo = 0;
+    let hi = currentVaultPasswords.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (currentVaultPasswords[mid].id < entry.id) lo = mid + 1;
+        else hi = mid;
+    }
+    if (lo < currentVaultPasswords.length && currentVaultPasswords[lo].id === entry.id) {
+        currentVaultPasswords[lo] = entry;
+    } else if (lo < currentVaultPasswords.length || !currentVaultCursor) {
+        currentVaultPasswords.splice(lo, 0, entry);
+    } else {
+        return;
+    }
+    passwordSearchIndex.add(entry);
+}
+
+function removeLoadedPassword(id) {
+    currentVaultPasswords = currentVaultPasswords.filter(p => p.id !== id);
+    passwordSearchIndex.remove(id);
+    passwordRows.delete(id);
+}
+
 // ===== PASSWORD MANAGEMENT =====
 
 function openAddPasswordModal(vaultId = null) {
@@ -486,10 +965,24 @@ async function savePassword() {
         const data = await response.json();
         
         if (data.status === 'success') {
+            const id = platform.toLowerCase();
+            revealedPasswords.delete(id);
             showNotification(`Password for ${platform} saved successfully!`, 'success');
             closePasswordModal();
             
-            await loadVaultPasswords(currentVaultId);
+            // Update the open list and its index in place instead of reloading the vault
+            if (isVaultDetailOpen()) {
+                const existing = currentVaultPasswords.find(p => p.id === id);
+                upsertLoadedPassword({
+                    id: id,
+                    platform: id,
+                    username: username,
+                    url: url,
+                    created_at: existing ? existing.created_at : new Date().toISOString(),
+                    updated_at: new Date().toISOString()
+                });
+                filterPasswords();
+            }
             await loadVaults();
         } else {
             showNotification(data.message || 'Failed to save password', 'error');
@@ -502,11 +995,13 @@ async function savePassword() {
     }
 }
 
-function editPassword(platform, vaultId) {
-    const password = currentVaultPasswords.find(p => p.platform === platform);
-    if (!password) return;
+async function editPassword(platform, vaultId) {
+    const known = p => p.platform === platform;
+    if (!currentVaultPasswords.some(known) && !remoteSearch.results.some(known)) return;
     
     currentVaultId = vaultId;
+    const password = await revealPassword(platform);
+    if (!password) return;
     
     document.getElementById('service-name').value = password.platform;
     document.getElementById('username').value = password.username || '';
@@ -553,10 +1048,13 @@ async function confirmDelete() {
         const data = await response.json();
         
         if (data.status === 'success') {
-            showNotification(`Password for ${currentPasswordId} deleted successfully`, 'success');
+            const id = currentPasswordId;
+            showNotification(`Password for ${id} deleted successfully`, 'success');
             closeConfirmDeleteModal();
             
-            await loadVaultPasswords(currentVaultId);
+            revealedPasswords.delete(id);
+            removeLoadedPassword(id);
+            filterPasswords();
             await loadVaults();
         } else {
             showNotification(data.message || 'Failed to delete password', 'error');
@@ -702,17 +1200,55 @@ function copyToClipboard(text, successMessage = 'Copied to clipboard!') {
     });
 }
 
-function togglePasswordView(platform, actualPassword, safeId) {
+async function revealPassword(platform) {
+    if (revealedPasswords.has(platform)) {
+        return revealedPasswords.get(platform);
+    }
+    
+    try {
+        const response = await fetch(`/api/vaults/${currentVaultId}/passwords/${encodeURIComponent(platform)}/reveal`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                master_password: masterPassword
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (data.status === 'success') {
+            revealedPasswords.set(platform, data.password);
+            return data.password;
+        }
+        showNotification(data.message || 'Failed to reveal password', 'error');
+    } catch (error) {
+        console.error('Error revealing password:', error);
+        showNotification('Failed to reveal password', 'error');
+    }
+    return null;
+}
+
+async function copyPassword(platform) {
+    const entry = await revealPassword(platform);
+    if (entry) {
+        copyToClipboard(entry.password, 'Password copied!');
+    }
+}
+
+async function togglePasswordView(platform, safeId) {
     const passwordDisplay = document.getElementById(`password-display-${safeId}`);
     const eyeIcon = document.getElementById(`eye-${safeId}`);
     
     if (passwordDisplay && eyeIcon) {
         if (eyeIcon.classList.contains('fa-eye')) {
-            passwordDisplay.textContent = actualPassword;
+            const entry = await revealPassword(platform);
+            if (!entry) return;
+            passwordDisplay.textContent = entry.password;
             eyeIcon.className = 'fas fa-eye-slash';
         } else {
-            const maskedPassword = '•'.repeat(Math.min(actualPassword.length, 12));
-            passwordDisplay.textContent = maskedPassword;
+            passwordDisplay.textContent = '•'.repeat(12);
             eyeIcon.className = 'fas fa-eye';
         }
     }
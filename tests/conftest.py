@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# The modules under test live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+# test_crypto_envelopes.py
+import base64
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+import crypto_utils
+from crypto_utils import (decrypt, decrypt_many, decrypt_with_key, derive_vault_key, encrypt, encrypt_many,
+                          entry_aad, generate_salt, is_authenticated, is_envelope, needs_rehash,
+                          _aes_cbc_encrypt)
+
+MASTER_PASSWORD = "correct horse battery staple"
+# Cheapest accepted scrypt cost, so the suite does not spend its time in the KDF
+FAST_KDF = "scrypt.n1024.r8.p1"
+
+
+@pytest.fixture(autouse=True)
+def fast_kdf(monkeypatch):
+    monkeypatch.setattr(crypto_utils, "DEFAULT_KDF", FAST_KDF)
+
+
+@pytest.fixture
+def salt():
+    return generate_salt()
+
+
+def _cbc_envelope(plain: str, salt: str) -> str:
+    """A v2 blob as written before envelopes moved to AES-GCM."""
+    key = derive_vault_key(MASTER_PASSWORD, base64.b64decode(salt), FAST_KDF)
+    return f"v2:{FAST_KDF}:" + base64.b64encode(_aes_cbc_encrypt(plain, key)).decode()
+
+
+def test_legacy_per_entry_salt_round_trip():
+    blob = encrypt("legacy secret", MASTER_PASSWORD)
+    assert not is_envelope(blob)
+    assert not is_authenticated(blob)
+    assert needs_rehash(blob)
+    assert decrypt(blob, MASTER_PASSWORD) == "legacy secret"
+
+
+def test_cbc_envelope_still_decrypts(salt):
+    blob = _cbc_envelope("cbc secret", salt)
+    assert is_envelope(blob)
+    assert not is_authenticated(blob)
+    assert needs_rehash(blob)
+    # CBC envelopes carry no associated data, so any aad is ignored
+    assert decrypt(blob, MASTER_PASSWORD, salt, entry_aad("vault", "entry")) == "cbc secret"
+
+
+def test_gcm_envelope_round_trip(salt):
+    aad = entry_aad("vault-1", "github")
+    blob = encrypt("gcm secret", MASTER_PASSWORD, salt, aad)
+    assert blob.startswith(f"v3:{FAST_KDF}:")
+    assert is_authenticated(blob)
+    assert not needs_rehash(blob)
+    assert decrypt(blob, MASTER_PASSWORD, salt, aad) == "gcm secret"
+
+
+def test_gcm_envelope_rejects_swapped_aad(salt):
+    blob = encrypt("gcm secret", MASTER_PASSWORD, salt, entry_aad("vault-1", "github"))
+    with pytest.raises(InvalidTag):
+        decrypt(blob, MASTER_PASSWORD, salt, entry_aad("github", "vault-1"))
+    with pytest.raises(InvalidTag):
+        decrypt(blob, MASTER_PASSWORD, salt, entry_aad("vault-2", "github"))
+
+
+def test_gcm_envelope_rejects_tampering(salt):
+    aad = entry_aad("vault-1", "github")
+    blob = encrypt("gcm secret", MASTER_PASSWORD, salt, aad)
+    prefix, payload = blob.rsplit(":", 1)
+    data = bytearray(base64.b64decode(payload))
+    data[-1] ^= 1
+    key = derive_vault_key(MASTER_PASSWORD, base64.b64decode(salt), FAST_KDF)
+    with pytest.raises(InvalidTag):
+        decrypt_with_key(f"{prefix}:{base64.b64encode(bytes(data)).decode()}", key, aad)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_decrypt_many_mixed_formats(salt, executor):
+    plains = [f"secret-{i}" for i in range(12)]
+    aads = [entry_aad("vault-1", f"entry-{i}") for i in range(12)]
+    blobs = encrypt_many(plains[:8], MASTER_PASSWORD, salt, aads=aads[:8])
+    blobs += [_cbc_envelope(plains[8], salt), _cbc_envelope(plains[9], salt)]
+    blobs += [encrypt(plains[10], MASTER_PASSWORD), encrypt(plains[11], MASTER_PASSWORD)]
+
+    results = decrypt_many(blobs, MASTER_PASSWORD, salt, max_workers=2, executor=executor, aads=aads)
+    assert results == plains
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_decrypt_many_returns_none_for_failures(salt, executor):
+    aads = [entry_aad("vault-1", f"entry-{i}") for i in range(10)]
+    blobs = encrypt_many([f"secret-{i}" for i in range(10)], MASTER_PASSWORD, salt, aads=aads)
+    # Entry 0's blob moved under entry 1's ID, and a corrupt blob
+    blobs[1] = blobs[0]
+    blobs[2] = "v3:" + FAST_KDF + ":bm90IGEgYmxvYg=="
+
+    results = decrypt_many(blobs, MASTER_PASSWORD, salt, max_workers=2, executor=executor, aads=aads)
+    assert results[0] == "secret-0"
+    assert results[1] is None
+    assert results[2] is None
+    assert results[3:] == [f"secret-{i}" for i in range(3, 10)]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_encrypt_many_matches_inline_path(salt, executor):
+    plains = [f"secret-{i}" for i in range(20)]
+    aads = [entry_aad("vault-1", f"entry-{i}") for i in range(20)]
+    pooled = encrypt_many(plains, MASTER_PASSWORD, salt, max_workers=2, executor=executor, aads=aads)
+    # One worker takes the inline path; both must read back the same
+    assert decrypt_many(pooled, MASTER_PASSWORD, salt, max_workers=1, aads=aads) == plains
+    assert decrypt_many(pooled, MASTER_PASSWORD, salt, max_workers=2, executor=executor, aads=aads) == plains
+
+
+def test_decrypt_many_wrong_password(salt):
+    blobs = encrypt_many(["a", "b"], MASTER_PASSWORD, salt)
+    assert decrypt_many(blobs, "wrong password", salt) == [None, None]
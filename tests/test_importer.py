@@ -0,0 +1,97 @@
+# test_importer.py
+import io
+import json
+
+import pytest
+
+import importer
+from importer import import_stream, iter_json_records, normalize_entry
+
+RECORDS = [{"name": f"site{i}", "username": f"user{i}", "password": f"pw{i}"} for i in range(5)]
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    saved = []
+
+    def save_passwords_bulk(user_id, entries, master_password, vault_id=None):
+        saved.extend(entries)
+        return len(entries)
+
+    monkeypatch.setattr(importer, "save_passwords_bulk", save_passwords_bulk)
+    return saved
+
+
+@pytest.mark.parametrize("read_size", [1, 7, importer.JSON_READ_SIZE])
+def test_reads_array_across_buffer_boundaries(read_size):
+    records = list(iter_json_records(io.StringIO(json.dumps(RECORDS)), read_size=read_size))
+    assert records == RECORDS
+
+
+def test_reads_bitwarden_items():
+    export = {"encrypted": False, "folders": [{"name": "[x]"}], "items": [
+        {"name": "GitHub", "login": {"username": "octo", "password": "pw", "uris": [{"uri": "https://github.com"}]}},
+    ]}
+    records = list(iter_json_records(io.StringIO(json.dumps(export)), read_size=4))
+    assert [normalize_entry(r) for r in records] == [
+        {"platform": "github", "username": "octo", "password": "pw", "url": "https://github.com", "notes": ""},
+    ]
+
+
+def test_reads_json_lines():
+    text = "\n".join(json.dumps(r) for r in RECORDS) + "\n"
+    assert list(iter_json_records(io.StringIO(text), lines=True, read_size=5)) == RECORDS
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(RECORDS)[:-1],                       # closing ] missing
+    json.dumps(RECORDS)[:-1] + ",",                 # cut after a separator
+    json.dumps(RECORDS)[:40],                       # cut inside a record
+    json.dumps({"items": RECORDS})[:-2],            # Bitwarden items not closed
+])
+def test_truncated_array_raises(text):
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.StringIO(text), read_size=16))
+
+
+def test_rejects_unsupported_top_level():
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.StringIO('{"entries": []}')))
+
+
+def test_non_object_records_are_counted_as_skipped(saved):
+    text = json.dumps([RECORDS[0], "stray", 42, None, [1, 2], RECORDS[1]])
+    result = import_stream("user", io.StringIO(text), "json", "master")
+    assert result == {"imported": 2, "skipped": 4}
+    assert [e["platform"] for e in saved] == ["site0", "site1"]
+
+
+def test_normalize_maps_aliases_and_url_platform():
+    assert normalize_entry({"Title": "Mail", "Login": "me", "Pass": "pw", "Website": "mail.example.com"}) == {
+        "platform": "mail", "username": "me", "password": "pw", "url": "mail.example.com", "notes": ""}
+    assert normalize_entry({"url": "https://www.example.com/login", "password": "pw"})["platform"] == "example.com"
+    assert normalize_entry({"name": "A/B Testing", "password": "pw"})["platform"] == "a_b testing"
+
+
+@pytest.mark.parametrize("record", [
+    {"name": "site", "password": ""},
+    {"name": "", "url": "", "password": "pw"},
+    "not a record",
+])
+def test_normalize_skips_unusable_records(record):
+    assert normalize_entry(record) is None
+
+
+@pytest.mark.parametrize("platform", [".", "..", "__name__", "__proto__", "x" * 1501])
+def test_normalize_rejects_reserved_document_ids(platform):
+    assert normalize_entry({"name": platform, "password": "pw"}) is None
+
+
+@pytest.mark.parametrize("platform", ["...", "_x_", "__x", "site.com"])
+def test_normalize_keeps_ids_firestore_allows(platform):
+    assert normalize_entry({"name": platform, "password": "pw"})["platform"] == platform
+
+
+def test_csv_import_counts_skipped_rows(saved):
+    text = "name,username,password\nsite,me,pw\n..,me,pw\nother,me,\n"
+    assert import_stream("user", io.StringIO(text), "csv", "master") == {"imported": 1, "skipped": 2}
@@ -0,0 +1,188 @@
+# test_mail_queue.py
+import json
+import os
+import socket
+import stat
+import socketserver
+import threading
+import time
+
+import pytest
+
+import mail_queue
+from mail_queue import MailQueue
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.send_message; refuses recipients starting with "bad"."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost stand-in")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                if "<bad" in line:
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(line.split(":", 1)[1].strip(" <>"))
+                    self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.received.extend(recipients)
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.received = []
+        self.connections = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def port():
+    return _free_port()
+
+
+@pytest.fixture
+def queue(tmp_path, port):
+    q = MailQueue(str(tmp_path), host="127.0.0.1", port=port, use_ssl=False,
+                  username=None, password=None, sender="vault@localhost")
+    yield q
+    q.stop(2)
+
+
+def test_delivers_spooled_messages_over_one_connection(queue, port):
+    server = _SMTPServer(port)
+    try:
+        for i in range(3):
+            queue.enqueue(f"user{i}@example.com", "Verify", "link")
+        assert _wait_for(lambda: len(server.received) == 3)
+        assert sorted(server.received) == [f"user{i}@example.com" for i in range(3)]
+        assert server.connections == 1
+        assert queue.pending_count() == 0
+    finally:
+        server.close()
+
+
+def test_message_survives_refused_connection_and_is_retried(queue, port, monkeypatch):
+    monkeypatch.setattr(mail_queue, "MAIL_RETRY_BASE", 0.2)
+    queue.enqueue("user@example.com", "Verify", "link")
+
+    # Nothing listens yet: the attempt is recorded in the spool file
+    def attempts():
+        spooled = [n for n in os.listdir(queue.pending_dir) if n.endswith(".json")]
+        if not spooled:
+            return 0
+        with open(os.path.join(queue.pending_dir, spooled[0]), encoding="utf-8") as f:
+            return json.load(f)["attempts"]
+
+    assert _wait_for(lambda: attempts() >= 1)
+    assert queue.pending_count() == 1
+
+    server = _SMTPServer(port)
+    try:
+        assert _wait_for(lambda: server.received == ["user@example.com"])
+        assert queue.pending_count() == 0
+    finally:
+        server.close()
+
+
+def test_spool_left_by_another_process_is_delivered(tmp_path, port, monkeypatch):
+    monkeypatch.setattr(mail_queue, "MAIL_RETRY_BASE", 0.2)
+    server = _SMTPServer(port)
+    first = MailQueue(str(tmp_path), host="127.0.0.1", port=_free_port(), use_ssl=False, username=None, password=None)
+    second = MailQueue(str(tmp_path), host="127.0.0.1", port=port, use_ssl=False, username=None, password=None)
+    try:
+        # The first queue cannot reach its server, so the message stays spooled
+        first.enqueue("user@example.com", "Verify", "link")
+        assert _wait_for(lambda: first._paused_until > 0)
+        first.stop(2)
+
+        second.start()
+        assert _wait_for(lambda: server.received == ["user@example.com"])
+    finally:
+        first.stop(2)
+        second.stop(2)
+        server.close()
+
+
+def test_refused_recipient_moves_to_failed(queue, port):
+    server = _SMTPServer(port)
+    try:
+        queue.enqueue("bad@example.com", "Verify", "link")
+        queue.enqueue("good@example.com", "Verify", "link")
+        assert _wait_for(lambda: server.received == ["good@example.com"])
+        assert _wait_for(lambda: len(os.listdir(queue.failed_dir)) == 1)
+        assert queue.pending_count() == 0
+    finally:
+        server.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_spool_files_are_private(tmp_path, port):
+    old_umask = os.umask(0o022)
+    try:
+        q = MailQueue(str(tmp_path / "spool"), host="127.0.0.1", port=port, use_ssl=False, username=None, password=None)
+        q._write(os.path.join(q.pending_dir, "message.json"), {"to": "user@example.com"})
+    finally:
+        os.umask(old_umask)
+    assert stat.S_IMODE(os.stat(os.path.join(q.pending_dir, "message.json")).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(q.failed_dir).st_mode) == 0o700
+
+
+def test_expired_failed_messages_are_pruned(queue):
+    old = os.path.join(queue.failed_dir, "old.json")
+    recent = os.path.join(queue.failed_dir, "recent.json")
+    for path in (old, recent):
+        queue._write(path, {"to": "user@example.com"})
+    expired = time.time() - mail_queue.MAIL_FAILED_TTL - 60
+    os.utime(old, (expired, expired))
+
+    queue._prune_failed()
+    assert os.listdir(queue.failed_dir) == ["recent.json"]
@@ -0,0 +1,121 @@
+# test_rate_limit_store.py
+import os
+import uuid
+
+import pytest
+
+import rate_limit_store
+from rate_limit_store import MemoryLockoutStore, RedisLockoutStore, create_lockout_store, RATE_LIMIT_STRATEGY
+
+# The shared-store tests need a Redis server; they use this database and skip without one
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+class _Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit_store, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def redis_url():
+    redis = pytest.importorskip("redis")
+    try:
+        redis.Redis.from_url(TEST_REDIS_URL, socket_connect_timeout=0.5).ping()
+    except Exception:
+        pytest.skip(f"No Redis server at {TEST_REDIS_URL}")
+    return TEST_REDIS_URL
+
+
+def test_locks_out_after_max_failures(clock):
+    store = MemoryLockoutStore(max_failures=3, window=60, lockout=300)
+    assert store.record_failure("user@example.com") is None
+    assert store.record_failure("user@example.com") is None
+    locked_until = store.record_failure("user@example.com")
+    assert locked_until is not None
+    assert locked_until.timestamp() == pytest.approx(clock.now + 300)
+    assert store.is_locked_out("user@example.com")[0]
+    # Addresses are matched case-insensitively
+    assert store.is_locked_out(" User@Example.com")[0]
+    assert not store.is_locked_out("other@example.com")[0]
+
+
+def test_failures_expire_after_window(clock):
+    store = MemoryLockoutStore(max_failures=3, window=60, lockout=300)
+    store.record_failure("user@example.com")
+    store.record_failure("user@example.com")
+    clock.now += 61
+    assert store.record_failure("user@example.com") is None
+    assert not store.is_locked_out("user@example.com")[0]
+
+
+def test_lockout_ends_and_counting_starts_over(clock):
+    store = MemoryLockoutStore(max_failures=2, window=60, lockout=300)
+    store.record_failure("user@example.com")
+    store.record_failure("user@example.com")
+    clock.now += 301
+    assert not store.is_locked_out("user@example.com")[0]
+    assert store.record_failure("user@example.com") is None
+
+
+def test_reset_clears_failures_and_lockout(clock):
+    store = MemoryLockoutStore(max_failures=2, window=60, lockout=300)
+    store.record_failure("user@example.com")
+    store.record_failure("user@example.com")
+    store.reset("user@example.com")
+    assert not store.is_locked_out("user@example.com")[0]
+    assert store.record_failure("user@example.com") is None
+
+
+def test_idle_accounts_are_swept(clock):
+    store = MemoryLockoutStore(max_failures=5, window=60, lockout=300, max_tracked=10)
+    for i in range(10):
+        store.record_failure(f"user{i}@example.com")
+    clock.now += 61
+    store.record_failure("late@example.com")
+    assert len(store) == 1
+
+
+def test_memory_url_creates_memory_store():
+    assert isinstance(create_lockout_store("memory://"), MemoryLockoutStore)
+
+
+def test_redis_clients_share_lockout(redis_url):
+    prefix = f"passager:test:{uuid.uuid4().hex}:"
+    first = RedisLockoutStore(redis_url, max_failures=3, window=60, lockout=300, prefix=prefix)
+    second = RedisLockoutStore(redis_url, max_failures=3, window=60, lockout=300, prefix=prefix)
+    try:
+        assert first.record_failure("user@example.com") is None
+        assert second.record_failure("user@example.com") is None
+        assert first.record_failure("user@example.com") is not None
+        assert second.is_locked_out("user@example.com")[0]
+        second.reset("user@example.com")
+        assert not first.is_locked_out("user@example.com")[0]
+    finally:
+        first.reset("user@example.com")
+
+
+def test_redis_rate_limit_storages_share_counts(redis_url):
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import MovingWindowRateLimiter
+
+    assert RATE_LIMIT_STRATEGY == "moving-window"
+    limit = parse("3 per minute")
+    key = uuid.uuid4().hex
+    first = MovingWindowRateLimiter(storage_from_string(redis_url))
+    second = MovingWindowRateLimiter(storage_from_string(redis_url))
+    assert first.hit(limit, key)
+    assert second.hit(limit, key)
+    assert first.hit(limit, key)
+    # The fourth hit is refused whichever client makes it
+    assert not second.hit(limit, key)
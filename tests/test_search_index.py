@@ -0,0 +1,91 @@
+# test_search_index.py
+import base64
+
+import pytest
+
+import search_index
+from search_index import blind, entry_tokens, plain_tokens, query_tokens, rank
+
+KEY = b"k" * 32
+OTHER_KEY = b"o" * 32
+
+
+@pytest.fixture(autouse=True)
+def index_key(monkeypatch):
+    monkeypatch.setattr(search_index, "_key", KEY)
+
+
+def test_plain_tokens_prefixes_and_trigrams():
+    assert plain_tokens("GitHub") == {"p:g", "p:gi", "t:git", "t:ith", "t:thu", "t:hub"}
+    # Short words only give prefixes; punctuation splits words
+    assert plain_tokens("x.io") == {"p:x", "p:i", "p:io"}
+    assert plain_tokens("") == set()
+    assert plain_tokens(None) == set()
+
+
+def test_query_tokens_longest_word_first():
+    assert query_tokens("go github") == ["t:git", "t:ith", "t:thu", "t:hub", "p:go"]
+    assert query_tokens("Hub HUB") == ["t:hub"]
+
+
+def test_query_tokens_are_a_subset_of_matching_entry():
+    entry = plain_tokens("my-github-account")
+    for query in ("git", "hub", "gi", "acc", "thub acco"):
+        assert set(query_tokens(query)) <= entry
+    assert not set(query_tokens("gitlab")) <= entry
+
+
+def test_query_is_truncated():
+    assert query_tokens("a" * 1000) == query_tokens("a" * search_index.MAX_QUERY_LENGTH)
+
+
+def test_blind_is_deterministic_per_key(monkeypatch):
+    tokens = ["t:git", "p:g"]
+    first = blind("user-1", tokens)
+    assert first == blind("user-1", tokens)
+    assert len(set(first)) == 2
+    assert all("git" not in token for token in first)
+
+    # Order is kept, so selectivity ordering survives blinding
+    assert blind("user-1", tokens[::-1]) == first[::-1]
+
+    monkeypatch.setattr(search_index, "_key", OTHER_KEY)
+    assert set(blind("user-1", tokens)).isdisjoint(first)
+
+
+def test_blind_differs_across_users():
+    assert set(blind("user-1", ["t:git"])).isdisjoint(blind("user-2", ["t:git"]))
+
+
+def test_key_from_environment(monkeypatch):
+    monkeypatch.setattr(search_index, "_key", None)
+    monkeypatch.setenv("SEARCH_INDEX_KEY", base64.b64encode(OTHER_KEY).decode())
+    assert search_index.load_index_key() == OTHER_KEY
+
+
+def test_entry_tokens_skip_passwords_and_cap_notes():
+    entry = {"platform": "github", "username": "octo", "password": "hunter2", "url": "", "notes": ""}
+    tokens = set(entry_tokens("user-1", entry))
+    assert set(blind("user-1", ["t:git", "t:oct"])) <= tokens
+    assert set(blind("user-1", ["t:hun"])).isdisjoint(tokens)
+
+    notes = " ".join(f"word{i:05d}" for i in range(2000))
+    assert len(entry_tokens("user-1", dict(entry, notes=notes))) == search_index.MAX_TOKENS_PER_ENTRY
+
+
+def test_rank_orders_by_where_the_query_matches():
+    entries = [
+        {"platform": "notes only", "notes": "github backup codes"},
+        {"platform": "work mail", "username": "github-bot"},
+        {"platform": "mygithub"},
+        {"platform": "github enterprise"},
+        {"platform": "github"},
+    ]
+    assert [rank(e, "github") for e in entries] == [4, 3, 2, 1, 0]
+    assert sorted(entries, key=lambda e: rank(e, "github"))[0]["platform"] == "github"
+
+
+def test_rank_needs_every_word():
+    assert rank({"platform": "github enterprise"}, "git ent") == 1
+    assert rank({"platform": "github"}, "git ent") == 4
+    assert rank({"platform": "GitHub"}, "GITHUB") == 0
@@ -0,0 +1,139 @@
+# test_vault_archive.py
+import io
+
+import pytest
+
+import vault_archive
+from vault_archive import ExportError, export_vault_stream, export_vault_to_file, iter_archive_entries
+
+MASTER_PASSWORD = "correct horse battery staple"
+# Cheapest accepted scrypt cost, so the suite does not spend its time in the KDF
+FAST_KDF = "scrypt.n1024.r8.p1"
+
+
+def _entries(count):
+    return [{"platform": f"site{i}", "username": f"user{i}", "password": f"pw{i}", "url": "", "notes": "",
+             "error": None} for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def fast_kdf(monkeypatch):
+    monkeypatch.setattr(vault_archive, "DEFAULT_KDF", FAST_KDF)
+    monkeypatch.setattr(vault_archive, "ARCHIVE_KDFS", frozenset([FAST_KDF]))
+
+
+@pytest.fixture
+def vault(monkeypatch):
+    """Entries the archive reads instead of Firestore; replace the list to change them."""
+    vault = {"entries": _entries(5)}
+    monkeypatch.setattr(vault_archive, "iter_vault_passwords",
+                        lambda user_id, vault_id, master_password: iter(vault["entries"]))
+    return vault
+
+
+def _export(passphrase=None, chunk_size=2):
+    return list(export_vault_stream("user", "vault", MASTER_PASSWORD, passphrase, chunk_size))
+
+
+def _import(lines, passphrase=MASTER_PASSWORD):
+    return list(iter_archive_entries(io.StringIO("".join(lines)), passphrase))
+
+
+def _exported(entries):
+    return [{field: e[field] for field in vault_archive.EXPORT_FIELDS} for e in entries]
+
+
+def test_round_trip(vault):
+    lines = _export()
+    # Header, then five entries in chunks of two
+    assert len(lines) == 4
+    assert _import(lines) == _exported(vault["entries"])
+
+
+def test_round_trip_with_passphrase(vault):
+    lines = _export(passphrase="archive passphrase")
+    assert _import(lines, "archive passphrase") == _exported(vault["entries"])
+    with pytest.raises(ValueError, match="wrong passphrase"):
+        _import(lines, MASTER_PASSWORD)
+
+
+def test_empty_vault_round_trip(vault):
+    vault["entries"] = []
+    assert _import(_export()) == []
+
+
+def test_round_trip_through_file(vault, tmp_path):
+    path = tmp_path / "passwords.vault"
+    assert export_vault_to_file("user", "vault", MASTER_PASSWORD, str(path)) == 5
+    with open(path, "rb") as f:
+        assert list(iter_archive_entries(f, MASTER_PASSWORD)) == _exported(vault["entries"])
+
+
+def test_wrong_passphrase(vault):
+    with pytest.raises(ValueError, match="wrong passphrase"):
+        _import(_export(), "not the passphrase")
+
+
+def test_truncated_archive(vault):
+    lines = _export()
+    with pytest.raises(ValueError, match="truncated"):
+        _import(lines[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        _import(lines[:1])
+
+
+def test_dropped_chunk(vault):
+    lines = _export()
+    with pytest.raises(ValueError):
+        _import(lines[:1] + lines[2:])
+
+
+def test_reordered_chunks(vault):
+    header, first, second, final = _export()
+    with pytest.raises(ValueError):
+        _import([header, second, first, final])
+
+
+def test_chunk_spliced_from_another_archive(vault):
+    header, first, second, final = _export()
+    _, other_first, _, _ = _export()
+    with pytest.raises(ValueError):
+        _import([header, other_first, second, final])
+
+
+def test_error_chunk_aborts_export_and_import(vault):
+    vault["entries"][3] = dict(vault["entries"][3], password=None, error="Incorrect master password")
+    lines = []
+    with pytest.raises(ExportError) as excinfo:
+        for line in export_vault_stream("user", "vault", MASTER_PASSWORD, chunk_size=2):
+            lines.append(line)
+    assert excinfo.value.skipped == 1
+    # The partial archive ends with an error chunk and is never accepted
+    with pytest.raises(ValueError, match="incomplete"):
+        _import(lines)
+
+
+def test_error_chunk_leaves_no_file(vault, tmp_path):
+    vault["entries"][3] = dict(vault["entries"][3], password=None, error="Incorrect master password")
+    path = tmp_path / "passwords.vault"
+    with pytest.raises(ExportError):
+        export_vault_to_file("user", "vault", MASTER_PASSWORD, str(path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_wrong_master_password_fails_before_header(vault):
+    vault["entries"] = [dict(e, password=None, error="Incorrect master password") for e in vault["entries"]]
+    with pytest.raises(ValueError, match="wrong master password"):
+        export_vault_stream("user", "vault", MASTER_PASSWORD)
+
+
+def test_rejects_kdf_outside_allowlist(vault, monkeypatch):
+    lines = _export()
+    monkeypatch.setattr(vault_archive, "ARCHIVE_KDFS", frozenset(["scrypt.n32768.r8.p1"]))
+    with pytest.raises(ValueError, match="Unsupported archive KDF"):
+        _import(lines)
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError, match="Not a supported vault archive"):
+        _import(["platform,username,password\n"])
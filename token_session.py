@@ -0,0 +1,219 @@
+# token_session.py
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from requests import RequestException
+
+from firebase_client import auth
+from http_client import session as _http, refresh_session as _refresh_http
+
+# Firebase ID-token sessions. Signing in returns an ID token (valid for an
+# hour) and a refresh token. The ID token is verified locally against
+# Google's public keys; firebase_admin caches them for as long as Google's
+# Cache-Control allows, so a verification costs no network hop. A token
+# close to expiry is refreshed on a background thread while the current one
+# keeps serving requests.
+#
+# Web sessions live in Flask's signed cookie, which the browser can read.
+# The refresh token never expires on its own, so it is sealed with AES-GCM
+# under a key derived from the app secret before it goes into the cookie
+# (seal_session_tokens). The ID token is stored as is: it expires within an
+# hour. Logging out revokes the user's refresh tokens (revoke), which signs
+# out the user's other sessions too.
+
+FIREBASE_API_KEY = os.getenv("FIREBASE_API_KEY")
+SIGN_IN_URL = "https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword"
+REFRESH_URL = "https://securetoken.googleapis.com/v1/token"
+
+# Refresh this long before the ID token expires
+TOKEN_REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "300"))  # seconds
+
+# Tokens refreshed in the background, keyed by a digest of the refresh token
+# they replace, waiting to be picked up by the session's next request.
+# Entries nobody picks up are dropped after REFRESHED_TTL.
+REFRESHED_TTL = 3600
+_refreshed = {}
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+class TokenError(Exception):
+    """Sign-in failed, or a token is invalid, expired or revoked."""
+
+
+class TokenServiceError(Exception):
+    """Google could not be reached to verify or refresh a token.
+
+    Says nothing about the token itself, so the session is kept.
+    """
+
+
+def _require_api_key():
+    if not FIREBASE_API_KEY:
+        raise TokenError("FIREBASE_API_KEY is not set")
+
+
+def _tokens(id_token: str, refresh_token: str, expires_in) -> dict:
+    return {
+        "id_token": id_token,
+        "refresh_token": refresh_token,
+        "expires_at": time.time() + int(expires_in),
+    }
+
+
+def sign_in(email: str, password: str) -> dict:
+    """Sign in with email and password.
+
+    Returns {"uid", "email_verified", "id_token", "refresh_token", "expires_at"}.
+    Raises TokenError for wrong credentials, TokenServiceError when Google
+    could not be reached or answered with an error of its own.
+    """
+    _require_api_key()
+    try:
+        response = _http.post(SIGN_IN_URL, params={"key": FIREBASE_API_KEY},
+                              json={"email": email, "password": password, "returnSecureToken": True})
+    except RequestException as e:
+        raise TokenServiceError(f"Sign-in failed: {e}")
+    if response.status_code != 200:
+        try:
+            message = response.json().get("error", {}).get("message", "")
+        except (ValueError, AttributeError):
+            message = ""
+        # 400 carries INVALID_PASSWORD, EMAIL_NOT_FOUND and the like
+        if response.status_code in (400, 401, 403):
+            raise TokenError(f"Sign-in rejected: {message or response.status_code}")
+        raise TokenServiceError(f"Sign-in failed: {message or response.status_code}")
+
+    data = response.json()
+    # The sign-in response has no emailVerified field; the ID token's claims do
+    claims = verify_id_token(data["idToken"])
+    return dict(
+        _tokens(data["idToken"], data["refreshToken"], data.get("expiresIn", 3600)),
+        uid=claims["uid"],
+        email_verified=bool(claims.get("email_verified")),
+    )
+
+
+def refresh(refresh_token: str) -> dict:
+    """Exchange a refresh token for a new ID token (and possibly a new refresh token)."""
+    _require_api_key()
+    try:
+        response = _refresh_http.post(REFRESH_URL, params={"key": FIREBASE_API_KEY},
+                                      data={"grant_type": "refresh_token", "refresh_token": refresh_token})
+    except RequestException as e:
+        raise TokenServiceError(f"Token refresh failed: {e}")
+    # 400 means the refresh token is invalid, expired or revoked
+    if response.status_code in (400, 401, 403):
+        raise TokenError(f"Token refresh rejected: {response.status_code}")
+    if response.status_code != 200:
+        raise TokenServiceError(f"Token refresh failed: {response.status_code}")
+    data = response.json()
+    return _tokens(data["id_token"], data["refresh_token"], data.get("expires_in", 3600))
+
+
+def verify_id_token(id_token: str) -> dict:
+    """Verify an ID token's signature, audience and expiry locally; returns its claims."""
+    try:
+        return auth.verify_id_token(id_token)
+    except (auth.InvalidIdTokenError, auth.UserDisabledError) as e:
+        # Covers ExpiredIdTokenError and RevokedIdTokenError, its subclasses
+        raise TokenError(f"Invalid ID token: {e}")
+    except Exception as e:
+        # CertificateFetchError and the like: the keys were unavailable, not the token bad
+        raise TokenServiceError(f"Could not verify ID token: {e}")
+
+
+def _refresh_key(refresh_token: str) -> str:
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+def _refresh_in_background(refresh_token: str):
+    key = _refresh_key(refresh_token)
+    try:
+        tokens = refresh(refresh_token)
+        now = time.time()
+        with _refresh_lock:
+            for stale in [k for k, (_, at) in _refreshed.items() if at < now - REFRESHED_TTL]:
+                del _refreshed[stale]
+            _refreshed[key] = (tokens, now)
+    except Exception as e:
+        print(f"[!] Failed to refresh ID token: {e}")
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(key)
+
+
+def _schedule_refresh(refresh_token: str):
+    key = _refresh_key(refresh_token)
+    with _refresh_lock:
+        if key in _refreshing or key in _refreshed:
+            return
+        _refreshing.add(key)
+    threading.Thread(target=_refresh_in_background, args=(refresh_token,), daemon=True).start()
+
+
+def current_tokens(tokens: dict):
+    """Validate a stored session's tokens and return (uid, tokens to store).
+
+    The returned tokens differ from the ones passed in when a background
+    refresh has completed. Only a session idle past its ID token's expiry
+    refreshes in the caller's thread. Raises TokenError when the session is
+    no longer valid, and TokenServiceError when Google cannot be reached.
+    """
+    refresh_token = tokens.get("refresh_token")
+    if not tokens.get("id_token") or not refresh_token:
+        raise TokenError("No token session")
+
+    with _refresh_lock:
+        fresh = _refreshed.pop(_refresh_key(refresh_token), None)
+    if fresh:
+        tokens = fresh[0]
+
+    remaining = tokens.get("expires_at", 0) - time.time()
+    if remaining <= 0:
+        tokens = refresh(tokens["refresh_token"])
+    elif remaining <= TOKEN_REFRESH_MARGIN:
+        _schedule_refresh(tokens["refresh_token"])
+
+    claims = verify_id_token(tokens["id_token"])
+    return claims["uid"], tokens
+
+
+def _seal_key(secret) -> bytes:
+    if isinstance(secret, str):
+        secret = secret.encode()
+    return hmac.new(secret, b"passager session refresh token", hashlib.sha256).digest()
+
+
+def seal_session_tokens(tokens: dict, secret) -> dict:
+    """Copy of tokens safe to keep in a cookie: the refresh token is encrypted."""
+    nonce = os.urandom(12)
+    sealed = AESGCM(_seal_key(secret)).encrypt(nonce, tokens["refresh_token"].encode(), None)
+    return dict(tokens, refresh_token=base64.urlsafe_b64encode(nonce + sealed).decode())
+
+
+def open_session_tokens(tokens: dict, secret) -> dict:
+    """Reverse of seal_session_tokens; raises TokenError for a missing or unreadable session."""
+    if not tokens or not tokens.get("refresh_token"):
+        raise TokenError("No token session")
+    try:
+        raw = base64.urlsafe_b64decode(tokens["refresh_token"])
+        refresh_token = AESGCM(_seal_key(secret)).decrypt(raw[:12], raw[12:], None).decode()
+    except Exception:
+        # Sealed under another SECRET_KEY, or stored before sealing
+        raise TokenError("Unreadable token session")
+    return dict(tokens, refresh_token=refresh_token)
+
+
+def revoke(uid: str):
+    """Revoke every refresh token of the user, ending sessions on all devices."""
+    try:
+        auth.revoke_refresh_tokens(uid)
+    except Exception as e:
+        print(f"[!] Failed to revoke refresh tokens: {e}")
+        raise e
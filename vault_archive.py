@@ -0,0 +1,180 @@
+# vault_archive.py
+import base64
+import io
+import itertools
+import json
+import os
+from datetime import datetime
+
+from crypto_utils import DEFAULT_KDF, derive_vault_key, encrypt_with_key, decrypt_with_key, generate_salt
+from db import iter_vault_passwords
+from importer import import_entries
+
+# Archive layout, one record per line so it can be written and read incrementally:
+#   line 1   JSON header: format, version, KDF spec and the archive's own salt
+#   line 2.. encrypted chunks, each a JSON object {"seq", "entries", "final"}
+# The final flag and contiguous seq numbers let the reader detect truncation.
+# Each chunk authenticates the archive salt and its seq as associated data, so
+# chunks cannot be reordered or spliced in from another archive.
+# An export that hits entries it cannot decrypt ends with an error chunk in
+# place of the final one, so the archive can never be imported as complete.
+ARCHIVE_FORMAT = "passager-archive"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".vault"
+ARCHIVE_CHUNK_SIZE = 100
+# KDF specs an archive header may name. The header comes from an uploaded
+# file, and parse_kdf alone still allows gigabyte-sized derivations, so only
+# the specs this deployment writes (and the stock default) are derived.
+# ARCHIVE_KDFS adds comma-separated specs, e.g. a previous VAULT_KDF.
+ARCHIVE_KDFS = frozenset([DEFAULT_KDF, "scrypt.n32768.r8.p1"] +
+                         [kdf.strip() for kdf in os.getenv("ARCHIVE_KDFS", "").split(",") if kdf.strip()])
+
+EXPORT_FIELDS = ("platform", "username", "password", "url", "notes")
+
+
+class ExportError(Exception):
+    """Entries could not be decrypted, so the archive would be incomplete."""
+
+    def __init__(self, skipped: int):
+        self.skipped = skipped
+        super().__init__(f"{skipped} entries could not be decrypted; export aborted")
+
+
+def _archive_key(passphrase: str, header: dict) -> bytes:
+    if header.get("kdf") not in ARCHIVE_KDFS:
+        raise ValueError(f"Unsupported archive KDF: {header.get('kdf')}")
+    return derive_vault_key(passphrase, base64.b64decode(header["salt"]), header["kdf"])
+
+
+def _chunk_aad(header: dict, seq: int) -> bytes:
+    return f"{header['salt']}\0{seq}".encode()
+
+
+def _iter_archive_lines(user_id: str, vault_id: str, master_password: str, passphrase: str = None, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """Yield (line, entry_count) pairs making up an encrypted archive.
+
+    Raises ValueError before the header if the first entry does not decrypt
+    (the master password is wrong), and ExportError after an error chunk if
+    later entries do not.
+    """
+    entries = iter_vault_passwords(user_id, vault_id, master_password)
+    first = next(entries, None)
+    if first is not None and first.get("error"):
+        raise ValueError("Could not decrypt the vault: wrong master password")
+
+    header = {
+        "format": ARCHIVE_FORMAT,
+        "version": ARCHIVE_VERSION,
+        "kdf": DEFAULT_KDF,
+        "salt": generate_salt(),
+        "created_at": datetime.utcnow().isoformat() + "Z"
+    }
+    key = _archive_key(passphrase or master_password, header)
+    yield json.dumps(header) + "\n", 0
+
+    seq = 0
+    chunk = []
+    skipped = 0
+    for entry in itertools.chain([first] if first is not None else [], entries):
+        if entry.get("error"):
+            skipped += 1
+            continue
+        chunk.append({field: entry.get(field, "") for field in EXPORT_FIELDS})
+        if len(chunk) >= chunk_size:
+            yield encrypt_with_key(json.dumps({"seq": seq, "entries": chunk, "final": False}), key, header["kdf"], _chunk_aad(header, seq)) + "\n", len(chunk)
+            seq += 1
+            chunk = []
+
+    if skipped:
+        error = f"{skipped} entries could not be decrypted"
+        yield encrypt_with_key(json.dumps({"seq": seq, "entries": chunk, "final": False, "error": error}), key, header["kdf"], _chunk_aad(header, seq)) + "\n", len(chunk)
+        print(f"[!] Export of vault {vault_id} aborted: {error}")
+        raise ExportError(skipped)
+    yield encrypt_with_key(json.dumps({"seq": seq, "entries": chunk, "final": True}), key, header["kdf"], _chunk_aad(header, seq)) + "\n", len(chunk)
+
+
+def export_vault_stream(user_id: str, vault_id: str, master_password: str, passphrase: str = None, chunk_size: int = ARCHIVE_CHUNK_SIZE):
+    """Yield the lines of an encrypted archive for a vault.
+
+    Entries are read page by page and written out chunk by chunk, so memory
+    stays flat however large the vault is. The archive is encrypted with
+    passphrase, defaulting to the master password. The master password is
+    checked on the first entry before this returns, so a caller can still
+    answer with an error instead of a download.
+    """
+    lines = _iter_archive_lines(user_id, vault_id, master_password, passphrase, chunk_size)
+    header, _ = next(lines)
+    return itertools.chain([header], (line for line, _ in lines))
+
+
+def export_vault_to_file(user_id: str, vault_id: str, master_password: str, path: str, passphrase: str = None, progress=None):
+    """Write an encrypted archive to disk incrementally; returns the entry count.
+
+    progress, if given, is called as progress(count) after every chunk.
+    """
+    count = 0
+    tmp_path = path + ".part"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for line, entries in _iter_archive_lines(user_id, vault_id, master_password, passphrase):
+                f.write(line)
+                count += entries
+                if progress:
+                    progress(count)
+        # Only a complete archive replaces the destination
+        os.replace(tmp_path, path)
+        print(f"[✓] Exported {count} passwords to {path}")
+        return count
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"[!] Failed to export vault: {e}")
+        raise e
+
+
+def iter_archive_entries(stream, passphrase: str):
+    """Yield decrypted entries from an archive stream, one chunk at a time."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8")
+
+    try:
+        header = json.loads(stream.readline() or "{}")
+    except json.JSONDecodeError:
+        header = {}
+    if header.get("format") != ARCHIVE_FORMAT or header.get("version") != ARCHIVE_VERSION:
+        raise ValueError("Not a supported vault archive")
+    key = _archive_key(passphrase, header)
+
+    expected_seq = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chunk = json.loads(decrypt_with_key(line, key, _chunk_aad(header, expected_seq)))
+        except Exception:
+            raise ValueError("Could not decrypt archive: wrong passphrase or corrupt file")
+        if chunk.get("seq") != expected_seq:
+            raise ValueError("Archive chunks are missing or out of order")
+        if chunk.get("error"):
+            raise ValueError(f"Archive is incomplete: {chunk['error']}")
+        expected_seq += 1
+        yield from chunk.get("entries", [])
+        if chunk.get("final"):
+            return
+    raise ValueError("Archive is truncated")
+
+
+def import_archive(user_id: str, stream, master_password: str, vault_id: str = None, passphrase: str = None, progress=None):
+    """Stream an archive back into a vault through the batched importer."""
+    return import_entries(user_id, iter_archive_entries(stream, passphrase or master_password), master_password, vault_id, progress)
+
+
+def import_archive_file(user_id: str, path: str, master_password: str, vault_id: str = None, passphrase: str = None, progress=None):
+    """Import an encrypted archive from disk."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return import_archive(user_id, f, master_password, vault_id, passphrase, progress)
+    except Exception as e:
+        print(f"[!] Failed to import archive: {e}")
+        raise e
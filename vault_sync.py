@@ -0,0 +1,48 @@
+# vault_sync.py
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from db import watch_vault_passwords
+
+
+class VaultSync(QObject):
+    """Delivers live changes to one vault's passwords as Qt signals.
+
+    The Firestore listener runs on its own thread; emitting signals from it
+    queues the updates onto the GUI thread, so slots may touch widgets.
+    """
+
+    # Lists of entries as returned by get_vault_passwords; metadata only
+    # (nothing decrypted) when no master password is given
+    entries_added = pyqtSignal(list)
+    entries_modified = pyqtSignal(list)
+    # List of entry IDs
+    entries_removed = pyqtSignal(list)
+    sync_error = pyqtSignal(str)
+
+    def __init__(self, user_id: str, vault_id: str, master_password: str = None, parent=None):
+        super().__init__(parent)
+        self.user_id = user_id
+        self.vault_id = vault_id
+        self.master_password = master_password
+        self._watch = None
+
+    def start(self):
+        if self._watch is None:
+            self._watch = watch_vault_passwords(self.user_id, self.vault_id, self.master_password,
+                                                self._on_change, lambda e: self.sync_error.emit(str(e)))
+
+    def stop(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def is_running(self) -> bool:
+        return self._watch is not None
+
+    def _on_change(self, added, modified, removed):
+        if added:
+            self.entries_added.emit(added)
+        if modified:
+            self.entries_modified.emit(modified)
+        if removed:
+            self.entries_removed.emit(removed)
@@ -1,12 +1,17 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, 
-    QTextEdit, QMessageBox, QLabel, QCheckBox, QSpinBox, QGroupBox
+    QTableView, QHeaderView, QAbstractItemView, QMessageBox, QLabel, QCheckBox, QSpinBox, QGroupBox,
+    QFileDialog, QProgressDialog
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
-from db import save_password, fetch_passwords_for_gui, delete_password
+from db import save_password, delete_password, get_or_create_default_vault
 from crypto_utils import generate_password
-import json
+from importer import import_file
+from vault_archive import export_vault_to_file, import_archive_file, ARCHIVE_EXTENSION
+from vault_sync import VaultSync
+from gui_workers import TaskRunner
+from password_table import PasswordTableModel, PasswordFilterProxyModel
 import pyperclip  # For copying passwords to clipboard
 
 class VaultWindow(QWidget):
@@ -14,6 +19,12 @@ class VaultWindow(QWidget):
         super().__init__()
         self.user_id = user_id
         self.master_password = master_password
+        # Rows are paged in by the model and kept current by the live vault listener
+        self.password_model = None
+        self.vault_sync = None
+        self.refresh_timer = None
+        # Blocking Firestore and crypto calls run here, off the GUI thread
+        self.tasks = TaskRunner(self)
         self.setWindowTitle(f"🔐 Password Vault - User: {self.user_id[:8]}...")
         self.setGeometry(500, 200, 800, 600)
         self.setStyleSheet("""
@@ -44,10 +55,10 @@ class VaultWindow(QWidget):
             QLineEdit:focus {
                 border-color: #4CAF50;
             }
-            QTextEdit {
+            QTableView {
                 border: 2px solid #ddd;
                 border-radius: 4px;
-                font-family: 'Courier New', monospace;
+                background-color: white;
                 font-size: 11px;
             }
             QGroupBox {
@@ -166,6 +177,14 @@ class VaultWindow(QWidget):
         self.view_btn.clicked.connect(self.view_passwords)
         manage_button_layout.addWidget(self.view_btn)
 
+        self.reveal_btn = QPushButton("👁️ Show/Hide")
+        self.reveal_btn.clicked.connect(self.toggle_selected_password)
+        manage_button_layout.addWidget(self.reveal_btn)
+
+        self.copy_btn = QPushButton("📋 Copy")
+        self.copy_btn.clicked.connect(self.copy_selected_password)
+        manage_button_layout.addWidget(self.copy_btn)
+
         self.delete_btn = QPushButton("🗑️ Delete Selected")
         self.delete_btn.clicked.connect(self.handle_delete_password)
         manage_button_layout.addWidget(self.delete_btn)
@@ -174,15 +193,33 @@ class VaultWindow(QWidget):
         self.export_btn.clicked.connect(self.export_passwords)
         manage_button_layout.addWidget(self.export_btn)
 
+        self.import_btn = QPushButton("📥 Import Passwords")
+        self.import_btn.clicked.connect(self.import_passwords)
+        manage_button_layout.addWidget(self.import_btn)
+
         manage_button_layout.addStretch()
         manage_layout.addLayout(manage_button_layout)
 
-        # Results area
-        self.result_area = QTextEdit()
-        self.result_area.setReadOnly(True)
-        self.result_area.setPlaceholderText("Your passwords will appear here...")
-        self.result_area.setMinimumHeight(250)
-        manage_layout.addWidget(self.result_area)
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by platform, username or URL")
+        manage_layout.addWidget(self.filter_input)
+
+        # Password table: fixed row heights keep scrolling cheap however many rows are loaded
+        self.password_view = QTableView()
+        self.password_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.password_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.password_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.password_view.setSortingEnabled(True)
+        self.password_view.verticalHeader().setVisible(False)
+        self.password_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.password_view.verticalHeader().setDefaultSectionSize(24)
+        self.password_view.horizontalHeader().setStretchLastSection(True)
+        self.password_view.doubleClicked.connect(lambda index: self.toggle_selected_password())
+        self.password_view.setMinimumHeight(250)
+        manage_layout.addWidget(self.password_view)
+
+        self.password_proxy = PasswordFilterProxyModel(self)
+        self.filter_input.textChanged.connect(self.password_proxy.setFilterFixedString)
 
         manage_group.setLayout(manage_layout)
         main_layout.addWidget(manage_group)
@@ -194,11 +231,6 @@ class VaultWindow(QWidget):
 
         self.setLayout(main_layout)
 
-        # Auto-refresh timer
-        self.refresh_timer = QTimer()
-        self.refresh_timer.timeout.connect(self.auto_refresh)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
-
     def toggle_password_visibility(self, state):
         if state == Qt.Checked:
             self.password_input.setEchoMode(QLineEdit.Normal)
@@ -249,59 +281,128 @@ class VaultWindow(QWidget):
             QMessageBox.warning(self, "Missing Fields", "Please fill in all fields.")
             return
 
-        try:
-            save_password(self.user_id, platform, username, password, self.master_password)
+        def on_saved(_):
             QMessageBox.information(self, "Success", f"Password for '{platform}' saved successfully!")
             self.clear_form()
-            self.view_passwords()  # Refresh the view
+            self.refresh_if_not_live()
             self.set_status(f"Password saved for {platform}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save password: {e}")
+
+        self.save_btn.setEnabled(False)
+        self.set_status(f"Saving password for {platform}...")
+        self.tasks.run(
+            f"save:{platform}", save_password, self.user_id, platform, username, password, self.master_password,
+            on_result=on_saved,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to save password: {e}"),
+            on_finished=lambda: self.save_btn.setEnabled(True)
+        )
 
     def load_passwords_on_start(self):
         """Load passwords when the window opens"""
-        QTimer.singleShot(500, self.view_passwords)
+        QTimer.singleShot(500, self.start_live_updates)
+
+    def start_live_updates(self):
+        """Follow the vault with a Firestore listener; falls back to polling if it cannot start"""
+        self.set_status("Connecting to vault...")
+        self.tasks.run(
+            "vault", get_or_create_default_vault, self.user_id,
+            on_result=self.on_vault_ready,
+            on_error=self.on_passwords_failed
+        )
+
+    def on_vault_ready(self, vault_id):
+        self.password_model = PasswordTableModel(self.user_id, vault_id, self.master_password, self.tasks, parent=self)
+        self.password_model.loaded.connect(lambda count: self.set_status(f"Loaded {count} passwords"))
+        self.password_model.load_failed.connect(self.on_passwords_failed)
+        self.password_proxy.setSourceModel(self.password_model)
+        self.password_view.setModel(self.password_proxy)
 
-    def view_passwords(self):
         try:
-            self.result_area.clear()
-            passwords = fetch_passwords_for_gui(self.user_id, self.master_password)
+            # The listener follows the whole vault in metadata-only mode, so edits and
+            # deletes made elsewhere reach loaded rows; unloaded rows arrive by paging
+            self.vault_sync = VaultSync(self.user_id, vault_id, None, self)
+            self.vault_sync.entries_added.connect(self.on_entries_changed)
+            self.vault_sync.entries_modified.connect(self.on_entries_changed)
+            self.vault_sync.entries_removed.connect(self.on_entries_removed)
+            self.vault_sync.sync_error.connect(self.on_sync_error)
+            self.vault_sync.start()
+            self.set_status("Live updates on")
+        except Exception as e:
+            self.start_polling(e)
+        self.password_model.fetchMore()
 
-            if not passwords:
-                self.result_area.setText("No passwords found.\n\nGet started by adding your first password above! 🚀")
-                self.set_status("No passwords found")
-                return
+    def start_polling(self, error):
+        print(f"[!] Live updates unavailable, polling instead: {error}")
+        self.vault_sync = None
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self.auto_refresh)
+        self.refresh_timer.start(30000)  # Refresh every 30 seconds
 
-            output = f"🔐 Your Saved Passwords ({len(passwords)} total)\n"
-            output += "=" * 60 + "\n\n"
-            
-            for i, p in enumerate(passwords, 1):
-                if p.get("error"):
-                    output += f"❌ {i}. Platform: {p['platform']}\n"
-                    output += f"   Error: {p['error']}\n"
-                    output += f"   Username: {p.get('username', 'N/A')}\n"
-                else:
-                    output += f"🌐 {i}. Platform: {p['platform'].title()}\n"
-                    output += f"   👤 Username: {p['username']}\n"
-                    output += f"   🔑 Password: {p['password']}\n"
-                    output += f"   📋 [Click to copy: {p['password']}]\n"
-                
-                output += "-" * 50 + "\n\n"
+    def refresh_if_not_live(self):
+        """Listener-driven views update themselves; only a polled view needs a reload"""
+        if not (self.vault_sync and self.vault_sync.is_running()):
+            self.view_passwords()
 
-            output += f"\n💡 Tip: To delete a password, enter the platform name above and click 'Delete Selected'"
-            self.result_area.setText(output)
-            self.set_status(f"Loaded {len(passwords)} passwords")
+    def on_entries_changed(self, entries):
+        self.password_model.apply_changes(entries, [], [])
 
-        except Exception as e:
-            error_msg = f"Error loading passwords: {str(e)}"
-            QMessageBox.critical(self, "Error", error_msg)
-            self.result_area.setText(error_msg)
-            self.set_status("Error loading passwords")
+    def on_entries_removed(self, entry_ids):
+        self.password_model.apply_changes([], [], entry_ids)
+
+    def on_sync_error(self, message):
+        self.set_status(f"Live update failed: {message}")
+
+    def view_passwords(self):
+        if self.password_model is None:
+            self.start_live_updates()
+            return
+        self.set_status("Loading passwords...")
+        self.password_model.reload()
+
+    def on_passwords_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Error loading passwords: {str(error)}")
+        self.set_status("Error loading passwords")
+
+    def selected_row(self):
+        """Source-model row of the selected table row, or None"""
+        if self.password_model is None:
+            return None
+        rows = self.password_view.selectionModel().selectedRows() if self.password_view.selectionModel() else []
+        if not rows:
+            return None
+        return self.password_proxy.mapToSource(rows[0]).row()
+
+    def toggle_selected_password(self):
+        row = self.selected_row()
+        if row is None:
+            self.set_status("Select a password first")
+            return
+        if self.password_model.is_revealed(row):
+            self.password_model.hide(row)
+        else:
+            self.password_model.reveal(row, on_error=lambda message: self.set_status(f"Could not decrypt: {message}"))
+
+    def copy_selected_password(self):
+        row = self.selected_row()
+        if row is None:
+            self.set_status("Select a password first")
+            return
+        platform = self.password_model.entry(row)["platform"]
+
+        def copy(password):
+            try:
+                pyperclip.copy(password)
+                self.set_status(f"Password for {platform} copied to clipboard")
+            except Exception as e:
+                QMessageBox.warning(self, "Copy Failed", f"Could not copy to clipboard: {e}")
+
+        self.password_model.with_password(row, copy, on_error=lambda message: self.set_status(f"Could not decrypt: {message}"))
 
     def handle_delete_password(self):
         platform = self.platform_input.text().strip().lower()
+        if not platform and self.selected_row() is not None:
+            platform = self.password_model.entry(self.selected_row())["id"]
         if not platform:
-            QMessageBox.warning(self, "Missing Platform", "Enter the platform name to delete.")
+            QMessageBox.warning(self, "Missing Platform", "Select a password or enter the platform name to delete.")
             return
 
         reply = QMessageBox.question(
@@ -312,39 +413,89 @@ class VaultWindow(QWidget):
         )
 
         if reply == QMessageBox.Yes:
-            try:
-                delete_password(self.user_id, platform)
+            def on_deleted(_):
                 QMessageBox.information(self, "Success", f"Password for '{platform}' deleted successfully.")
                 self.platform_input.clear()
-                self.view_passwords()  # Refresh the view
+                self.refresh_if_not_live()
                 self.set_status(f"Password deleted for {platform}")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Delete failed: {e}")
+
+            self.delete_btn.setEnabled(False)
+            self.tasks.run(
+                f"delete:{platform}", delete_password, self.user_id, platform,
+                on_result=on_deleted,
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Delete failed: {e}"),
+                on_finished=lambda: self.delete_btn.setEnabled(True)
+            )
 
     def export_passwords(self):
-        """Export passwords to a JSON file"""
-        try:
-            passwords = fetch_passwords_for_gui(self.user_id, self.master_password)
-            if not passwords:
-                QMessageBox.information(self, "No Data", "No passwords to export.")
+        """Export passwords to an encrypted archive, streamed to disk chunk by chunk"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Passwords", f"passwords_export{ARCHIVE_EXTENSION}",
+            f"Encrypted Vault Archive (*{ARCHIVE_EXTENSION})"
+        )
+        if not file_path:
+            return
+
+        def export(progress):
+            vault_id = get_or_create_default_vault(self.user_id)
+            return export_vault_to_file(self.user_id, vault_id, self.master_password, file_path, progress=progress)
+
+        def on_exported(count):
+            if not count:
+                QMessageBox.information(self, "No Data", "No passwords were exported.")
                 return
+            QMessageBox.information(
+                self, "Export Success",
+                f"{count} passwords exported to:\n{file_path}\n\nThe archive is encrypted with your master password."
+            )
+            self.set_status(f"Exported {count} passwords")
+
+        self.export_btn.setEnabled(False)
+        self.tasks.run(
+            "export", export,
+            on_result=on_exported,
+            on_progress=lambda count: self.set_status(f"Exported {count} passwords..."),
+            on_error=lambda e: QMessageBox.critical(self, "Export Error", f"Failed to export passwords: {e}"),
+            on_finished=lambda: self.export_btn.setEnabled(True)
+        )
 
-            from PyQt5.QtWidgets import QFileDialog
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, "Export Passwords", "passwords_export.json", "JSON Files (*.json)"
+    def import_passwords(self):
+        """Import passwords from another password manager's CSV/JSON export"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import Passwords", "",
+            f"Password Exports (*.csv *.json *.jsonl *{ARCHIVE_EXTENSION})"
+        )
+        if not file_path:
+            return
+
+        # Cancelling stops the import between batches; batches already saved stay saved
+        progress_dialog = QProgressDialog("Importing passwords...", "Cancel", 0, 0, self)
+        progress_dialog.setWindowTitle("Import")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.canceled.connect(lambda: self.tasks.cancel("import"))
+        progress_dialog.show()
+
+        def import_passwords_file(progress):
+            if file_path.endswith(ARCHIVE_EXTENSION):
+                return import_archive_file(self.user_id, file_path, self.master_password, progress=progress)
+            return import_file(self.user_id, file_path, self.master_password, progress=progress)
+
+        def on_imported(result):
+            QMessageBox.information(
+                self, "Import Complete",
+                f"Imported {result['imported']} passwords.\nSkipped {result['skipped']} entries without a password or a usable name."
             )
-            
-            if file_path:
-                # Remove any error entries before export
-                clean_passwords = [p for p in passwords if not p.get("error")]
-                
-                with open(file_path, 'w') as f:
-                    json.dump(clean_passwords, f, indent=2)
-                
-                QMessageBox.information(self, "Export Success", f"Passwords exported to:\n{file_path}")
-                self.set_status(f"Exported {len(clean_passwords)} passwords")
-        except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Failed to export passwords: {e}")
+            self.refresh_if_not_live()
+            self.set_status(f"Imported {result['imported']} passwords")
+
+        self.tasks.run(
+            "import", import_passwords_file,
+            on_result=on_imported,
+            on_progress=lambda imported, skipped: progress_dialog.setLabelText(
+                f"Imported {imported} passwords ({skipped} skipped)..."),
+            on_error=lambda e: QMessageBox.critical(self, "Import Error", f"Failed to import passwords: {e}"),
+            on_finished=progress_dialog.close
+        )
 
     def auto_refresh(self):
         """Auto-refresh passwords periodically"""
@@ -353,7 +504,6 @@ class VaultWindow(QWidget):
 
     def closeEvent(self, event):
         """Handle window close event"""
-        self.refresh_timer.stop()
         reply = QMessageBox.question(
             self, "Confirm Exit",
             "Are you sure you want to exit the Password Vault?",
@@ -362,6 +512,11 @@ class VaultWindow(QWidget):
         )
         
         if reply == QMessageBox.Yes:
+            self.tasks.cancel_all()
+            if self.vault_sync:
+                self.vault_sync.stop()
+            if self.refresh_timer:
+                self.refresh_timer.stop()
             event.accept()
         else:
             event.ignore()
\ No newline at end of file